@@ -0,0 +1,437 @@
+"""Offline benchmarks for the congress dashboard.
+
+Times data loading, every create_* builder in figures.py and every Dash callback
+in callbacks.py over a fixed mix of inputs, records the serialized response size
+of each, and compares the results against benchmarks/baseline.json.
+
+Timings are compared relative to a fixed calibration workload timed in the same
+process, and payload sizes as they are, so a baseline recorded on one machine
+can be checked on another. The bundled CSV is synthetic stand-in data (see
+benchmarks/README.md) unless --bundle has replaced it with the real dataset.
+
+    python benchmarks/run_benchmarks.py --bundle            # copy the current snapshot into benchmarks/data
+    python benchmarks/run_benchmarks.py --bundle --synthetic  # or generate a synthetic one offline
+    python benchmarks/run_benchmarks.py                     # run at 1x, compare to the baseline
+    python benchmarks/run_benchmarks.py --scales 1 10 100   # also run on synthetic 10x/100x datasets
+    python benchmarks/run_benchmarks.py --update-baseline   # store the results as the new baseline
+
+CONGRESS_QUERY_BACKEND and the other dashboard settings pass through to the runs.
+
+Each scale runs in its own process against a private snapshot directory, so the
+dashboard modules load exactly as they do in a server worker.
+"""
+import argparse
+import contextvars
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PACKAGE_DIR = os.path.join(ROOT, 'congress_dashboard')
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BUNDLED_CSV = os.path.join(BENCH_DIR, 'data', 'data_aging_congress.csv')
+BASELINE_FILE = os.path.join(BENCH_DIR, 'baseline.json')
+
+# A result regresses when its time relative to the calibration workload grows by
+# this ratio (plus a slack, in seconds, for sub-millisecond timings) or its payload
+# grows by this ratio
+TIME_TOLERANCE = 1.5
+TIME_SLACK = 0.005
+SIZE_TOLERANCE = 1.1
+CALIBRATION_ROWS = 500000
+
+
+# ---------------------------------------------------------------------------
+# datasets
+
+def bundle_snapshot():
+    # Copy the dashboard's local snapshot (or a fresh download) into benchmarks/data
+    sys.path[:0] = [ROOT, PACKAGE_DIR]
+    os.chdir(PACKAGE_DIR)
+    os.environ.setdefault('CONGRESS_REFRESH_INTERVAL', '0')
+    from congress_dashboard import data_loader
+    if not os.path.exists(data_loader.SNAPSHOT_FILE):
+        data_loader.refresh_snapshot()
+    import pandas as pd
+    os.makedirs(os.path.dirname(BUNDLED_CSV), exist_ok=True)
+    pd.read_parquet(data_loader.SNAPSHOT_FILE).to_csv(BUNDLED_CSV, index=False)
+    print(f'bundled {BUNDLED_CSV}')
+
+
+SYNTHETIC_MEMBERS = 7500
+STATES = ['AL', 'AZ', 'CA', 'CO', 'FL', 'GA', 'IL', 'MA', 'MI', 'NC', 'NJ', 'NY', 'OH', 'PA',
+          'TX', 'VA', 'WA', 'WI']
+GENERATIONS = [(1822, 'Progressive'), (1843, 'Missionary'), (1860, 'Lost'), (1883, 'Greatest'),
+               (1901, 'Greatest'), (1928, 'Silent'), (1946, 'Boomers'), (1965, 'Gen X'),
+               (1981, 'Millennial'), (1997, 'Gen Z')]
+
+
+def synthesize_bundle():
+    # Deterministic stand-in for the upstream CSV with the same columns, for when it
+    # cannot be downloaded: 66th-118th congress, members serving several sessions,
+    # some moving from the House to the Senate or switching party, and a few
+    # apostrophe surnames ("O'LAST0025, First0025")
+    import numpy as np
+    import pandas as pd
+    rng = np.random.default_rng(14)
+    rows = []
+    for i in range(SYNTHETIC_MEMBERS):
+        surname = f"O'LAST{i:04d}" if i % 25 == 0 else f'LAST{i:04d}'
+        first = int(rng.integers(66, 119))
+        terms = int(min(rng.geometric(0.25), 119 - first))
+        birthday = pd.Timestamp(1789 + 2 * (first - 1), 1, 3) - pd.Timedelta(
+            days=int(rng.integers(27 * 365, 70 * 365)))
+        generation = GENERATIONS[max(np.searchsorted([y for y, _ in GENERATIONS],
+                                                     birthday.year, side='right') - 1, 0)][1]
+        state = STATES[int(rng.integers(len(STATES)))]
+        party = int(rng.choice([100, 200], p=[0.52, 0.48])) if rng.random() < 0.97 else 328
+        # about one row in five is a Senate row, as upstream
+        draw = rng.random()
+        senate_from = 0 if draw < 0.15 else terms if draw < 0.9 else int(rng.integers(1, terms + 1))
+        switch_at = int(rng.integers(1, terms)) if terms > 1 and rng.random() < 0.03 else None
+        chamber_sessions = 0
+        for k in range(terms):
+            congress = first + k
+            chamber = 'Senate' if k >= senate_from else 'House'
+            chamber_sessions = 1 if k == senate_from else chamber_sessions + 1
+            if switch_at is not None and k == switch_at:
+                party = 300 - party if party in (100, 200) else 100
+            start_date = pd.Timestamp(1789 + 2 * (congress - 1), 1, 3)
+            age_days = (start_date - birthday).days
+            rows.append({'congress': congress, 'start_date': start_date.date().isoformat(),
+                         'chamber': chamber, 'state_abbrev': state, 'party_code': party,
+                         'bioname': f'{surname}, First{i:04d}', 'bioguide_id': f'S{i:06d}',
+                         'birthday': birthday.date().isoformat(), 'cmltv_cong': k + 1,
+                         'cmltv_chamber': chamber_sessions, 'age_days': age_days,
+                         'age_years': round(age_days / 365.25, 4), 'generation': generation})
+    data = pd.DataFrame(rows).sort_values(['congress', 'chamber', 'state_abbrev', 'bioname'],
+                                          ignore_index=True)
+    os.makedirs(os.path.dirname(BUNDLED_CSV), exist_ok=True)
+    data.to_csv(BUNDLED_CSV, index=False)
+    print(f'bundled {BUNDLED_CSV} ({len(data)} synthetic rows)')
+
+
+def synthetic_csv(scale, directory):
+    # The bundled rows repeated `scale` times as distinct members with jittered ages
+    import numpy as np
+    import pandas as pd
+    path = os.path.join(directory, f'congress_x{scale}.csv')
+    if scale == 1:
+        return BUNDLED_CSV
+    base = pd.read_csv(BUNDLED_CSV)
+    rng = np.random.default_rng(scale)
+    copies = []
+    for k in range(scale):
+        copy = base.copy()
+        copy['bioguide_id'] = copy['bioguide_id'].astype(str) + f'-{k}'
+        copy['bioname'] = copy['bioname'].astype(str) + f' {k}'
+        jitter = rng.normal(0, 0.5, len(copy))
+        copy['age_years'] = (copy['age_years'] + jitter).round(4)
+        copy['age_days'] = (copy['age_years'] * 365.25).round().astype('int64')
+        copies.append(copy)
+    pd.concat(copies, ignore_index=True).to_csv(path, index=False)
+    return path
+
+
+# ---------------------------------------------------------------------------
+# worker: runs inside a fresh process for one dataset
+
+def payload_size(result):
+    # bytes a callback would send to the browser; for a frame, its in-memory size
+    import pandas as pd
+    from plotly.io.json import to_json_plotly
+    if isinstance(result, pd.DataFrame):
+        return int(result.memory_usage(deep=True).sum())
+    return len(to_json_plotly(result).encode())
+
+
+def time_call(func, args, repeat, before=None):
+    timings = []
+    result = None
+    for _ in range(repeat):
+        if before is not None:
+            before()
+        start = time.perf_counter()
+        result = func(*args)
+        timings.append(time.perf_counter() - start)
+    return {'seconds': statistics.median(timings), 'min_seconds': min(timings),
+            'bytes': payload_size(result)}
+
+
+def calibration_seconds(repeat):
+    # A fixed pandas/numpy/json workload, independent of the dashboard code; results
+    # are stored as multiples of its time so they carry over between machines
+    import numpy as np
+    import pandas as pd
+    rng = np.random.default_rng(0)
+    frame = pd.DataFrame({'key': rng.integers(0, 1000, CALIBRATION_ROWS),
+                          'value': rng.random(CALIBRATION_ROWS)})
+
+    def workload():
+        frame.groupby('key')['value'].agg(['mean', 'count'])
+        np.sort(frame['value'].to_numpy())
+        json.dumps(frame['value'].iloc[:50000].tolist())
+    timings = []
+    for _ in range(max(repeat, 5)):
+        start = time.perf_counter()
+        workload()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def triggered(func, prop_id):
+    # Runs a callback that reads dash.ctx as if prop_id had triggered it
+    from dash._callback_context import context_value
+    from dash._utils import AttributeDict
+
+    def call(*args):
+        def run():
+            context_value.set(AttributeDict(triggered_inputs=[{'prop_id': prop_id,
+                                                               'value': args[0]}]))
+            return func(*args)
+        return contextvars.copy_context().run(run)
+    return call
+
+
+def callback_cases(backend, callbacks):
+    # callback name -> [(label, args)] or [(label, args, triggering prop id)]; a
+    # realistic mix including the all-Default explorer filter with the full age range
+    sessions = backend.distinct_values('congress')
+    states = backend.distinct_values('state_abbrev')
+    first_page = backend.table_page({}, None, '', [], 0, 10)[0]
+    first_rows = first_page.astype(object).to_dict('records')
+    first_name = str(first_page['bioname'].iloc[0])
+    first_id = str(first_page['bioguide_id'].iloc[0])
+    party_cases = [('combined', (['Combined'],)), ('democrat', (['Democrat'],)),
+                   ('both', (['Democrat', 'Republican'],)),
+                   ('combined+republican', (['Combined', 'Republican'],))]
+    chamber_cases = [('combined', (['Combined'],)), ('house', (['House'],)),
+                     ('both', (['House', 'Senate'],))]
+    table = ('Default', 'Default', 'Default', 'Default')
+    cross_filter = {'states': states[:3], 'sessions': [sessions[len(sessions) // 2],
+                                                      sessions[-1]]}
+
+    def cross_filtered(*cases):
+        # cases passing the cross-filter store, an extra input only with CROSS_FILTER=1
+        return list(cases) if callbacks.CROSS_FILTER else []
+
+    def linked(selection):
+        # the cross-filter, the dropdowns of the linked line charts, histogram visible
+        return ((selection,) + tuple(['Democrat'] for _ in callbacks.LINKED_LINE_CHARTS)
+                + ((True,) if callbacks.LAZY_FIGURES else ()))
+
+    map_click = {'points': [{'location': states[0]}]}
+    bar_selection = {'points': [{'x': session} for session in sessions[-10:]]}
+    return {
+        'update_average_age_party_chart': party_cases + cross_filtered(
+            ('cross-filtered', (['Democrat', 'Republican'], cross_filter))),
+        'update_average_age_chamber_chart': chamber_cases,
+        'update_new_vs_returning_party_chart': party_cases,
+        'update_new_vs_returning_chamber_chart': chamber_cases,
+        'update_party_name': [('default', ('Default',)), ('democrat', (100,))],
+        # single-flight callbacks take the session-id store last; None outside a browser
+        'update_filtered_data': [(label, args + (None,)) for label, args in [
+            ('all-default', table + ([20, 100], 0, 10, [], '')),
+            ('all-default-last-page', table + ([20, 100], 10 ** 6, 10, [], '')),
+            ('sorted-by-age', table + ([20, 100], 0, 10,
+                                       [{'column_id': 'age_years', 'direction': 'desc'}], '')),
+            ('session-house', (sessions[-1], 'House', 'Default', 'Default',
+                               [20, 100], 0, 10, [], '')),
+            ('state-party-age', ('Default', 'Default', states[0], 100,
+                                 [40, 60], 0, 10, [], '')),
+            ('native-filter', table + ([20, 100], 0, 10, [],
+                                       '{bioname} contains A && {age_years} ge 50')),
+            *cross_filtered(('cross-filtered', table + ([20, 100], 0, 10, [], '', cross_filter))),
+        ]],
+        'update_export_links': [('all-default', table + ([20, 100],)), *cross_filtered(
+            ('cross-filtered', table + ([20, 100], cross_filter)))],
+        'update_cross_filter': [
+            ('map-click', (map_click, None, None, 0, {}), 'choropleth.clickData'),
+            ('bar-selection', (None, None, bar_selection, 0, {'states': states[:1]}),
+             'stacked-bar.selectedData')],
+        'update_linked_charts': [('states-and-sessions', linked(cross_filter)),
+                                 ('cleared', linked({}))],
+        'update_member_search': [('one-letter', (first_name[:1], None)),
+                                 ('last-name-prefix', (first_name.split(',')[0][:4], None)),
+                                 ('last-first', (first_name, None)),
+                                 ('misspelled', (first_name.split(',')[0][::-1], None))],
+        'select_searched_member': [('first-member', (first_id,))],
+        'update_career_timeline': [
+            ('table-row', ([0], None, first_rows), 'filtered-table.selected_rows'),
+            ('searched-member', (None, first_id, first_rows), 'member-search-results.value')],
+        'update_selected_bioname': [('none', (None, first_rows)),
+                                    ('first-row', ([0], first_rows))],
+        'search_wikipedia': [('nothing-selected', (1, 0, 'Click a row to display bioname here.')),
+                             ('lookup', (1, 0, f'Selected Bioname: {first_name}'))],
+        'update_choropleth_session': [('patch', (sessions[0],))],
+    }
+
+
+def run_worker(repeat):
+    sys.path[:0] = [ROOT, PACKAGE_DIR]
+    os.chdir(PACKAGE_DIR)
+    results = {}
+    calibration = calibration_seconds(repeat)
+
+    start = time.perf_counter()
+    from congress_dashboard import data_loader
+    results['import:data_loader'] = {'seconds': time.perf_counter() - start, 'bytes': 0}
+    results['modified_data'] = time_call(data_loader.modified_data, (), repeat)
+
+    start = time.perf_counter()
+    import app  # noqa: F401  registers every callback
+    results['import:app'] = {'seconds': time.perf_counter() - start, 'bytes': 0}
+    from app_instance import app as dash_app
+    # the modules app.py registered from, not second copies under their bare names
+    from congress_dashboard import callbacks, figures, query_backend, wiki_lookup
+    wiki_lookup.set_backend(wiki_lookup.StaticBackend({}))
+
+    for name in sorted(dir(figures)):
+        builder = getattr(figures, name)
+        if name.startswith('create_') and callable(builder):
+            results[f'figures.{name}'] = time_call(
+                builder, (), repeat, getattr(builder, 'cache_clear', None))
+
+    cases = callback_cases(query_backend.get_backend(), callbacks)
+    # clientside callbacks have no server function to time
+    registered = {entry['callback'].__name__ for entry in dash_app.callback_map.values()
+                  if 'callback' in entry}
+    registered.discard('render_lazy_figure')  # runs the create_* builders timed above
+    missing = sorted(registered - set(cases))
+    for name, name_cases in cases.items():
+        func = getattr(callbacks, name, None)
+        if func is None or name not in registered:
+            continue
+        clear = getattr(func, 'cache_clear', None)
+
+        def before(clear=clear):
+            # the cross-filter aggregation and the career timelines are shared by
+            # several callbacks; time them each call
+            figures.linked_cells.cache_clear()
+            figures.career_timeline_figure.cache_clear()
+            if clear is not None:
+                clear()
+        for label, args, *trigger in name_cases:
+            call = triggered(func, trigger[0]) if trigger else func
+            results[f'callbacks.{name}[{label}]'] = time_call(call, args, repeat, before)
+    for result in results.values():
+        result['relative'] = result['seconds'] / calibration
+    return results, missing, calibration
+
+
+# ---------------------------------------------------------------------------
+# runner
+
+def run_scale(scale, repeat, workdir):
+    csv_path = synthetic_csv(scale, workdir)
+    env = dict(os.environ,
+               CONGRESS_DATA_URL='file://' + os.path.abspath(csv_path),
+               CONGRESS_SNAPSHOT_DIR=os.path.join(workdir, f'snapshot_x{scale}'),
+               CONGRESS_REFRESH_INTERVAL='0',
+               # time the builders, not reads of their pre-rendered JSON
+               WARM_START='0',
+               # time the lazy and cross-filtered paths as well, unless asked not to
+               LAZY_FIGURES=os.environ.get('LAZY_FIGURES', '1'),
+               CROSS_FILTER=os.environ.get('CROSS_FILTER', '1'),
+               WIKIPEDIA_CACHE_FILE=os.path.join(workdir, 'wikipedia_cache.sqlite'))
+    env.pop('CONGRESS_SHARED_STORE', None)
+    output = os.path.join(workdir, f'results_x{scale}.json')
+    subprocess.run([sys.executable, os.path.abspath(__file__), '--worker',
+                    '--repeat', str(repeat), '--output', output],
+                   env=env, check=True)
+    with open(output) as f:
+        return json.load(f)
+
+
+def compare(results, baseline):
+    regressions = []
+    for scale, scale_results in results.items():
+        slack = TIME_SLACK / scale_results['calibration']
+        for name, current in scale_results['results'].items():
+            base = baseline.get(scale, {}).get(name)
+            if base is None:
+                continue
+            if current['relative'] > base['relative'] * TIME_TOLERANCE + slack:
+                regressions.append(f"x{scale} {name}: {base['relative']:.3f}x -> "
+                                   f"{current['relative']:.3f}x calibration")
+            if current['bytes'] > base['bytes'] * SIZE_TOLERANCE:
+                regressions.append(f"x{scale} {name}: {base['bytes']} B -> {current['bytes']} B")
+    return regressions
+
+
+def print_results(results):
+    for scale, scale_results in results.items():
+        print(f"\n== dataset x{scale} (calibration {scale_results['calibration'] * 1000:.1f} ms) ==")
+        for name, current in scale_results['results'].items():
+            print(f"{name:70s} {current['seconds'] * 1000:10.2f} ms {current['relative']:9.3f}x "
+                  f"{current['bytes']:12d} B")
+        for name in scale_results['missing']:
+            print(f'{name:70s} NO BENCHMARK INPUTS')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scales', type=int, nargs='+', default=[1])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--update-baseline', action='store_true')
+    parser.add_argument('--bundle', action='store_true')
+    parser.add_argument('--synthetic', action='store_true',
+                        help='with --bundle: generate the bundled CSV instead of downloading it')
+    parser.add_argument('--output')
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.bundle:
+        if args.synthetic:
+            synthesize_bundle()
+        else:
+            bundle_snapshot()
+        return 0
+    if args.worker:
+        results, missing, calibration = run_worker(args.repeat)
+        with open(args.output, 'w') as f:
+            json.dump({'results': results, 'missing': missing, 'calibration': calibration}, f)
+        return 0
+
+    if not os.path.exists(BUNDLED_CSV):
+        print(f'{BUNDLED_CSV} is missing, run with --bundle first')
+        return 2
+    with tempfile.TemporaryDirectory() as workdir:
+        # big datasets get fewer repetitions
+        results = {str(scale): run_scale(scale, max(1, args.repeat // scale), workdir)
+                   for scale in args.scales}
+    print_results(results)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=1)
+
+    failed = any(scale_results['missing'] for scale_results in results.values())
+    if args.update_baseline:
+        baseline = {}
+        if os.path.exists(BASELINE_FILE):
+            with open(BASELINE_FILE) as f:
+                baseline = json.load(f)
+        # no absolute timings: they only hold for the machine that recorded them
+        baseline.update({scale: {name: {'relative': result['relative'], 'bytes': result['bytes']}
+                                 for name, result in scale_results['results'].items()}
+                         for scale, scale_results in results.items()})
+        with open(BASELINE_FILE, 'w') as f:
+            json.dump(baseline, f, indent=1, sort_keys=True)
+        print(f'\nbaseline written to {BASELINE_FILE}')
+    elif os.path.exists(BASELINE_FILE):
+        with open(BASELINE_FILE) as f:
+            regressions = compare(results, json.load(f))
+        for line in regressions:
+            print('REGRESSION', line)
+        failed = failed or bool(regressions)
+    else:
+        print('\nno baseline yet, run with --update-baseline to store one')
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+
+# Dimensions of the pre-aggregated age cube. Every chart that averages age_years
+# can be answered by rolling these cells up instead of rescanning the row data.
+CUBE_DIMENSIONS = ['congress', 'chamber', 'party_code', 'member_type',
+                   'state_abbrev', 'generation',
+                   # legend labels derived from the dimensions above; they never
+                   # split a cell, they only let charts group by the label directly
+                   'party_member_type', 'chamber_member_type']
+CUBE_MEASURES = ['age_sum', 'age_count', 'row_count']
+
+
+def build_age_cube(data, dimensions=CUBE_DIMENSIONS):
+    # One pass over the rows: sum and count of age_years plus the row count per cell.
+    # dropna=False keeps rows with a missing key so roll-ups that don't group on
+    # that dimension still count them, like a groupby on the raw rows would.
+    ages = data['age_years'].astype('float64')
+    grouped = ages.groupby([data[dim] for dim in dimensions],
+                           observed=True, dropna=False)
+    cube = pd.DataFrame({'age_sum': grouped.sum(),
+                         'age_count': grouped.count(),
+                         'row_count': grouped.size()})
+    return cube.reset_index()
+
+
+def filter_age_cube(cube, filters=None):
+    # filters maps a dimension to a single value or a list of accepted values
+    if not filters:
+        return cube
+    mask = pd.Series(True, index=cube.index)
+    for dim, value in filters.items():
+        if isinstance(value, (list, tuple, set)):
+            mask &= cube[dim].isin(list(value))
+        else:
+            mask &= cube[dim] == value
+    return cube[mask]
+
+
+def query_age_cube(cube, by, filters=None, dropna=True):
+    # Roll the cube up to the `by` dimensions after applying filters.
+    # age_years holds the average age, row_count the number of member rows.
+    # dropna=False keeps groups with a missing key, for roll-ups that are rolled up again.
+    cells = filter_age_cube(cube, filters)
+    if not by:
+        totals = cells[CUBE_MEASURES].sum().to_frame().T
+    else:
+        totals = cells.groupby(by, observed=True,
+                               dropna=dropna)[CUBE_MEASURES].sum().reset_index()
+    totals['age_years'] = totals['age_sum'] / totals['age_count']
+    return totals
+
+
+def build_cell_index(cells, dimensions):
+    # Integer codes per dimension over a small table of cells (e.g. one query_age_cube
+    # result), so the many roll-ups of that table are numpy bincounts instead of
+    # pandas group-bys. Codes follow sorted values; a missing key gets code -1.
+    index = {'n_cells': len(cells), 'codes': {}, 'values': {},
+             'measures': {m: cells[m].to_numpy('float64') for m in CUBE_MEASURES}}
+    for dim in dimensions:
+        codes, uniques = pd.factorize(cells[dim], sort=True)
+        index['codes'][dim] = codes
+        index['values'][dim] = np.asarray(uniques)
+    return index
+
+
+def roll_up_cells(index, by, filters=None):
+    # Same result as query_age_cube on the indexed cells
+    keep = np.ones(index['n_cells'], dtype=bool)
+    for dim, value in (filters or {}).items():
+        values = list(value) if isinstance(value, (list, tuple, set)) else [value]
+        wanted = np.flatnonzero(np.isin(index['values'][dim], values))
+        keep &= np.isin(index['codes'][dim], wanted)
+    for dim in by:
+        keep &= index['codes'][dim] >= 0
+    totals = {}
+    if by:
+        shape = [len(index['values'][dim]) for dim in by]
+        keys = np.ravel_multi_index([index['codes'][dim][keep] for dim in by], shape)
+        groups, inverse = np.unique(keys, return_inverse=True)
+        for dim, codes in zip(by, np.unravel_index(groups, shape)):
+            totals[dim] = index['values'][dim][codes]
+    else:
+        groups, inverse = np.zeros(1, dtype=np.int64), np.zeros(keep.sum(), dtype=np.int64)
+    for m in CUBE_MEASURES:
+        totals[m] = np.bincount(inverse, weights=index['measures'][m][keep],
+                                minlength=len(groups))
+    totals = pd.DataFrame(totals)
+    totals[['age_count', 'row_count']] = totals[['age_count', 'row_count']].astype('int64')
+    totals['age_years'] = totals['age_sum'] / totals['age_count']
+    return totals
@@ -1,112 +1,133 @@
 from app_instance import app
 from dash import Dash, html, dcc
 from dash import dash_table
+from congress_dashboard.data_loader import start_refresh_job
+from congress_dashboard.query_backend import get_backend
 from congress_dashboard.figures import *
 from congress_dashboard.callbacks import *
+from congress_dashboard.export import install_export
+from congress_dashboard.metrics import install_metrics
+from congress_dashboard.serialization import install_orjson
+from congress_dashboard.warm_start import install_warm_layout
 
 
 list_default = ['Default']
 
-app.layout = html.Div([
-    html.Div([  # Left pane
+
+# Graph whose figure is built on demand: in lazy mode the layout only carries a
+# placeholder, and assets/lazy_figures.js asks for the figure once the section
+# scrolls into view (see render_lazy_figure in callbacks.py)
+def lazy_graph(graph_id, builder, style=None):
+    if not LAZY_FIGURES:
+        return dcc.Graph(id=graph_id, figure=builder(), style=style)
+    return html.Div([
+        dcc.Store(id=f'{graph_id}-visible', data=False),
+        dcc.Loading(dcc.Graph(id=graph_id, style=style)),
+    ], id=f'{graph_id}-section', className='lazy-section')
+
+
+# State map section; in slider mode the map shows one session and a slider picks it
+def choropleth_section(backend):
+    if CHOROPLETH_MODE != 'slider':
+        return [lazy_graph("choropleth", create_choropleth)] + cross_filter_controls()
+    sessions = backend.distinct_values('congress')
+    return [
+        lazy_graph("choropleth", create_choropleth_session),
+        dcc.Slider(
+            id='choropleth-congress',
+            min=sessions[0],
+            max=sessions[-1],
+            step=1,
+            value=sessions[-1],
+            marks={i: str(i) for i in sessions if i % 10 == 0}
+        )
+    ] + cross_filter_controls()
+
+
+# Current cross-filter selection (see update_cross_filter in callbacks.py)
+def cross_filter_controls():
+    if not CROSS_FILTER:
+        return []
+    return [
+        dcc.Store(id='cross-filter', data={}),
         html.Div([
+            html.Button('Clear cross-filter', id='cross-filter-clear', n_clicks=0,
+                        style={'marginRight': '10px'}),
+            html.Span(cross_filter_summary({}), id='cross-filter-summary',
+                      style={'color': '#FFFFFF'})
+        ], style={'height': '40px'})
+    ]
+
+
+# extra room the session slider and the cross-filter controls take under the map
+choropleth_extra_height = ((50 if CHOROPLETH_MODE == 'slider' else 0)
+                           + (40 if CROSS_FILTER else 0))
+
+
+# Served on every page load, so dropdown options pick up sessions and states added
+# by a hot refresh of the dataset (see data_loader.start_refresh_job)
+def serve_layout():
+    backend = get_backend()
+    return html.Div([
+        dcc.Store(id='session-id'),
+        html.Div([  # Left pane
             html.Div([
-                html.H1("Is Congress Getting Older?",
-                        style={'marginLeft': '10px', 'color': '#FFFFFF'}),
-                html.P("Exploring the age trends of US Congress Members",
-                       style={'marginLeft': '10px', 'color': '#FFFFFF'}),
+                html.Div([
+                    html.H1("Is Congress Getting Older?",
+                            style={'marginLeft': '10px', 'color': '#FFFFFF'}),
+                    html.P("Exploring the age trends of US Congress Members",
+                           style={'marginLeft': '10px', 'color': '#FFFFFF'}),
+                    html.Img(
+                        src="assets/congress_seal.png",
+                        style={'display': 'block',
+                               'marginLeft': 'auto',
+                               'marginRight': 'auto',
+                               'width': 'auto'}
+                    ),
+                ], style={'height': '550px'}),
+                html.Div(style={'height': '300px'}),
+                html.Div(style={'height': f'{775 + choropleth_extra_height}px'}),
+                html.Div(style={'height': '1200px'}),
                 html.Img(
-                    src="assets/congress_seal.png",
+                    src="assets/generations.png",
                     style={'display': 'block',
                            'marginLeft': 'auto',
                            'marginRight': 'auto',
                            'width': 'auto'}
-                ),
-            ], style={'height': '550px'}),
-            html.Div(style={'height': '300px'}),
-            html.Div(style={'height': '775px'}),
-            html.Div(style={'height': '1200px'}),
-            html.Img(
-                src="assets/generations.png",
-                style={'display': 'block',
-                       'marginLeft': 'auto',
-                       'marginRight': 'auto',
-                       'width': 'auto'}
-            )
-        ]),
-    ], id='left-container'),
-
-    html.Div([  # Right pane
-        html.Div([  # Introduction part
-            html.Div(style={'height': '25px'}),
-            html.Img(src="assets/intro.png",
-                     style={'width': '1100px', 'height': '550px', 'margin': '0',
-                            'padding': '0'}),
-            html.Img(src="assets/questions.png",
-                     style={'width': '1100px', 'height': '300px', 'margin': '0',
-                            'padding': '0'}),
-            html.Div([
-                dcc.Graph(id="choropleth", figure=create_choropleth())
-            ], style={'height': '750px', 'width': '1100px'})
-        ]),
-        html.Div([  # Average Age of Congress Members
-            html.Div([
-                html.Div("Average Age of Congress Members Over Time:",
-                         style={'fontSize': '30px', 'fontWeight': 'bold',
-                                'color'
-                                : '#FFFFFF', 'marginTop': '25px',
-                                'marginBottom': '20px'}),
+                )
+            ]),
+        ], id='left-container'),
+
+        html.Div([  # Right pane
+            html.Div([  # Introduction part
+                html.Div(style={'height': '25px'}),
+                html.Img(src="assets/intro.png",
+                         style={'width': '1100px', 'height': '550px', 'margin': '0',
+                                'padding': '0'}),
+                html.Img(src="assets/questions.png",
+                         style={'width': '1100px', 'height': '300px', 'margin': '0',
+                                'padding': '0'}),
+                html.Div(choropleth_section(backend),
+                         style={'height': f'{750 + choropleth_extra_height}px',
+                                'width': '1100px'})
+            ]),
+            html.Div([  # Average Age of Congress Members
                 html.Div([
-                    html.Div([
-                        dcc.Graph(id='line-chart-average-age-party'),
-                        html.Div([
-                            html.Label("Party", className="dropdown-label"),
-                            dcc.Dropdown(
-                                id='party-dropdown-average-age',
-                                options=[
-                                    {'label': 'Democrat', 'value': 'Democrat'},
-                                    {'label': 'Republican',
-                                     'value': 'Republican'},
-                                    {'label': 'Combined', 'value': 'Combined'}
-                                ],
-                                value=['Combined'],  # Default to combined
-                                multi=True  # Allow multiple selections
-                            )
-                        ], style={'width': '45%', 'display': 'inline-block',
-                                  'padding': '10px'}),
-                    ], style={'width': '50%', 'display': 'inline-block'}),
-                    html.Div([
-                        dcc.Graph(id='line-chart-average-age-chamber'),
-                        html.Div([
-                            html.Label("Chamber", className="dropdown-label"),
-                            dcc.Dropdown(
-                                id='chamber-dropdown-average-age',
-                                options=[
-                                    {'label': 'Senate', 'value': 'Senate'},
-                                    {'label': 'House', 'value': 'House'},
-                                    {'label': 'Combined', 'value': 'Combined'}
-                                ],
-                                value=['Combined'],  # Default to combined
-                                multi=True  # Allow multiple selections
-                            )
-                        ], style={'width': '45%', 'display': 'inline-block',
-                                  'padding': '10px'}),
-                    ], style={'width': '50%', 'display': 'inline-block'})
-                ],style={'marginBottom': '30px'}),
-
-                html.Div([  # Average Age of New vs Returning Members
-                    html.Div("Average Age of New vs Returning Members Over Time:",
+                    html.Div("Average Age of Congress Members Over Time:",
                              style={'fontSize': '30px', 'fontWeight': 'bold',
                                     'color'
-                                    : '#FFFFFF', 'marginTop': '20px',
+                                    : '#FFFFFF', 'marginTop': '25px',
                                     'marginBottom': '20px'}),
+                    # aggregate table for the clientside chart mode, sent once with the page
+                    dcc.Store(id='age-aggregate-store',
+                              data=age_chart_store() if CLIENTSIDE_AGE_CHARTS else None),
                     html.Div([
                         html.Div([
-                            dcc.Graph(id='line-chart-new-vs-returning-party'),
+                            dcc.Graph(id='line-chart-average-age-party'),
                             html.Div([
                                 html.Label("Party", className="dropdown-label"),
                                 dcc.Dropdown(
-                                    id='party-dropdown-new-vs-returning',
+                                    id='party-dropdown-average-age',
                                     options=[
                                         {'label': 'Democrat', 'value': 'Democrat'},
                                         {'label': 'Republican',
@@ -120,11 +141,11 @@ app.layout = html.Div([
                                       'padding': '10px'}),
                         ], style={'width': '50%', 'display': 'inline-block'}),
                         html.Div([
-                            dcc.Graph(id='line-chart-new-vs-returning-chamber'),
+                            dcc.Graph(id='line-chart-average-age-chamber'),
                             html.Div([
                                 html.Label("Chamber", className="dropdown-label"),
                                 dcc.Dropdown(
-                                    id='chamber-dropdown-new-vs-returning',
+                                    id='chamber-dropdown-average-age',
                                     options=[
                                         {'label': 'Senate', 'value': 'Senate'},
                                         {'label': 'House', 'value': 'House'},
@@ -136,112 +157,198 @@ app.layout = html.Div([
                             ], style={'width': '45%', 'display': 'inline-block',
                                       'padding': '10px'}),
                         ], style={'width': '50%', 'display': 'inline-block'})
+                    ],style={'marginBottom': '30px'}),
+
+                    html.Div([  # Average Age of New vs Returning Members
+                        html.Div("Average Age of New vs Returning Members Over Time:",
+                                 style={'fontSize': '30px', 'fontWeight': 'bold',
+                                        'color'
+                                        : '#FFFFFF', 'marginTop': '20px',
+                                        'marginBottom': '20px'}),
+                        html.Div([
+                            html.Div([
+                                dcc.Graph(id='line-chart-new-vs-returning-party'),
+                                html.Div([
+                                    html.Label("Party", className="dropdown-label"),
+                                    dcc.Dropdown(
+                                        id='party-dropdown-new-vs-returning',
+                                        options=[
+                                            {'label': 'Democrat', 'value': 'Democrat'},
+                                            {'label': 'Republican',
+                                             'value': 'Republican'},
+                                            {'label': 'Combined', 'value': 'Combined'}
+                                        ],
+                                        value=['Combined'],  # Default to combined
+                                        multi=True  # Allow multiple selections
+                                    )
+                                ], style={'width': '45%', 'display': 'inline-block',
+                                          'padding': '10px'}),
+                            ], style={'width': '50%', 'display': 'inline-block'}),
+                            html.Div([
+                                dcc.Graph(id='line-chart-new-vs-returning-chamber'),
+                                html.Div([
+                                    html.Label("Chamber", className="dropdown-label"),
+                                    dcc.Dropdown(
+                                        id='chamber-dropdown-new-vs-returning',
+                                        options=[
+                                            {'label': 'Senate', 'value': 'Senate'},
+                                            {'label': 'House', 'value': 'House'},
+                                            {'label': 'Combined', 'value': 'Combined'}
+                                        ],
+                                        value=['Combined'],  # Default to combined
+                                        multi=True  # Allow multiple selections
+                                    )
+                                ], style={'width': '45%', 'display': 'inline-block',
+                                          'padding': '10px'}),
+                            ], style={'width': '50%', 'display': 'inline-block'})
+                        ])
                     ])
                 ])
-            ])
-        ], style={'height': '1200px', 'width': '1100px'}),
+            ], style={'height': '1200px', 'width': '1100px'}),
 
-        html.Div([  # Stacked Bar Chart
-            html.Div([
-                dcc.Graph(id="stacked-bar", figure=create_stacked_bar())
-            ])
-        ], style={'marginBottom': '30px'}),
-
-        html.Div("Dataset explore on Wikipedia:",
-                 style={'fontSize': '30px', 'fontWeight': 'bold',
-                        'marginTop': '5px', 'marginBottom': '5px'}),
-        html.Div([  # Congress and Chamber selection
-            html.Div([
-                html.Label('Congress:'),
-                dcc.Dropdown(
-                    id='select-congress',
-                    options=[{'label': val, 'value': val} for val in
-                             list_default + sorted(
-                                 congress['congress'].unique().tolist())],
-                    value='Default'
-                )
-            ], style={'width': '25%', 'display': 'inline-block',
-                      'paddingRight': '5%'}),
-            html.Div([
-                html.Label('Chamber:'),
-                dcc.Dropdown(
-                    id='select-chamber',
-                    options=[{'label': val, 'value': val} for val in
-                             list_default + sorted(
-                                 congress['chamber'].unique().tolist())],
-                    value='Default'
-                )
-            ], style={'width': '25%', 'display': 'inline-block'}),
-        ]),
+            html.Div([  # Stacked Bar Chart
+                html.Div([
+                    lazy_graph("stacked-bar", create_stacked_bar)
+                ])
+            ], style={'marginBottom': '30px'}),
 
-        html.Div([  # State and Party selection
-            html.Div([
-                html.Label('State:'),
-                dcc.Dropdown(
-                    id='select-state',
-                    options=[{'label': val, 'value': val} for val in
-                             list_default + sorted(
-                                 congress['state_abbrev'].unique().tolist())],
-                    value='Default'
-                )
-            ], style={'width': '25%', 'display': 'inline-block',
-                      'paddingRight': '5%'}),
-            html.Div([
-                html.Div(id='party-name'),
-                dcc.Dropdown(
-                    id='select-party',
-                    options=[{'label': val, 'value': val} for val in
-                             list_default + sorted(
-                                 congress['party_code'].unique().tolist())],
-                    value='Default'
-                )
-            ], style={'width': '25%', 'display': 'inline-block'}),
-        ]),
-
-        html.Div([  # Slider for Age Range
-            html.Label('Age Range:'),
-            dcc.RangeSlider(
-                id='age-slider',
-                min=20,
-                max=100,
-                value=[20, 100],
-                marks={i: str(i) for i in range(20, 101, 10)}
-            )
-        ], style={'width': '50%', 'marginTop': '20px'}),
-
-        html.Div([  # Filtered Table and Wikipedia Search
-            html.Div([
-                html.H3('Data After Filter'),
-                dash_table.DataTable(
-                    id='filtered-table',
-                    columns=[{"name": i, "id": i} for i in congress.columns],
-                    page_size=10,
-                    row_selectable='single'
+            html.Div("Dataset explore on Wikipedia:",
+                     style={'fontSize': '30px', 'fontWeight': 'bold',
+                            'marginTop': '5px', 'marginBottom': '5px'}),
+            html.Div([  # Member search, matched as you type (see member_search.py)
+                html.Label('Find a member:'),
+                dcc.Input(id='member-search', type='search', value='',
+                          placeholder='e.g. Pelosi, Nancy',
+                          style={'width': '40%', 'marginLeft': '10px'}),
+                dcc.RadioItems(id='member-search-results', options=[],
+                               labelStyle={'display': 'block'})
+            ], style={'marginBottom': '20px'}),
+            html.Div([  # Congress and Chamber selection
+                html.Div([
+                    html.Label('Congress:'),
+                    dcc.Dropdown(
+                        id='select-congress',
+                        options=[{'label': val, 'value': val} for val in
+                                 list_default +
+                                 backend.distinct_values('congress')],
+                        value='Default'
+                    )
+                ], style={'width': '25%', 'display': 'inline-block',
+                          'paddingRight': '5%'}),
+                html.Div([
+                    html.Label('Chamber:'),
+                    dcc.Dropdown(
+                        id='select-chamber',
+                        options=[{'label': val, 'value': val} for val in
+                                 list_default +
+                                 backend.distinct_values('chamber')],
+                        value='Default'
+                    )
+                ], style={'width': '25%', 'display': 'inline-block'}),
+            ]),
+
+            html.Div([  # State and Party selection
+                html.Div([
+                    html.Label('State:'),
+                    dcc.Dropdown(
+                        id='select-state',
+                        options=[{'label': val, 'value': val} for val in
+                                 list_default +
+                                 backend.distinct_values('state_abbrev')],
+                        value='Default'
+                    )
+                ], style={'width': '25%', 'display': 'inline-block',
+                          'paddingRight': '5%'}),
+                html.Div([
+                    html.Div(id='party-name'),
+                    dcc.Dropdown(
+                        id='select-party',
+                        options=[{'label': val, 'value': val} for val in
+                                 list_default +
+                                 backend.distinct_values('party_code')],
+                        value='Default'
+                    )
+                ], style={'width': '25%', 'display': 'inline-block'}),
+            ]),
+
+            html.Div([  # Slider for Age Range
+                html.Label('Age Range:'),
+                dcc.RangeSlider(
+                    id='age-slider',
+                    min=20,
+                    max=100,
+                    value=[20, 100],
+                    marks={i: str(i) for i in range(20, 101, 10)}
                 )
-            ], style={'width': '70%', 'display': 'inline-block'}),
-            html.Div([
-                html.H3('Selected Bioname:'),
-                html.Div(id='selected-bioname'),
-                html.Button('Search Wikipedia', id='search-wikipedia',
-                            n_clicks=0)
-            ], style={'padding-top': '20px', 'backgroundColor': '#e6e3e3'}),
-            html.Div(id='wikipedia-summary-table', style={'padding-top': '20px',
-                                                          'backgroundColor':
-                                                              '#e6e4e4'})
-        ]),
-        html.Div(style={'height': '50px'}),
-        html.Div([  # Preview dataset part
-            html.Div("Bonus Plots:",
-                     style={'fontSize': '30px', 'fontWeight': 'bold', 'marginTop': '5px', 'marginBottom': '5px'}),
-            html.Div([
-                dcc.Graph(figure=create_histogram(), style={'width': '70%', 'marginLeft': '0'})
-            ], style={'padding': '20px'}),
-            html.Div([
-                dcc.Graph(figure=create_bad_try(), style={'display': 'inline-block', 'width': '50%'})
-            ], style={'padding': '20px'})
-        ]),
-    ], id='right-container')
-], id='container')
+            ], style={'width': '50%', 'marginTop': '20px'}),
+
+            html.Div([  # Filtered Table and Wikipedia Search
+                html.Div([
+                    html.H3('Data After Filter'),
+                    html.Div(id='filtered-count'),
+                    # streamed by export.py, the links follow the filters above
+                    html.Div([
+                        html.A('Download CSV', id='export-csv', href='/export.csv'),
+                        html.A('Download Parquet', id='export-parquet', href='/export.parquet',
+                               style={'marginLeft': '20px'})
+                    ]),
+                    # paging, sorting and filtering run on the server (see table_query.py)
+                    dash_table.DataTable(
+                        id='filtered-table',
+                        columns=[{"name": i, "id": i,
+                                  "type": 'numeric' if numeric else 'text'}
+                                 for i, numeric in backend.table_columns()],
+                        page_current=0,
+                        page_size=10,
+                        page_action='custom',
+                        sort_action='custom',
+                        sort_mode='multi',
+                        sort_by=[],
+                        filter_action='custom',
+                        filter_query='',
+                        row_selectable='single'
+                    )
+                ], style={'width': '70%', 'display': 'inline-block'}),
+                html.Div([
+                    html.H3('Selected Bioname:'),
+                    html.Div(id='selected-bioname'),
+                    html.Button('Search Wikipedia', id='search-wikipedia',
+                                n_clicks=0),
+                    # career of the selected member, read from the career index
+                    html.Div(id='career-summary'),
+                    dcc.Graph(id='career-timeline', style={'display': 'none'})
+                ], style={'padding-top': '20px', 'backgroundColor': '#e6e3e3'}),
+                # polls the background Wikipedia lookup while one is in flight
+                dcc.Interval(id='wikipedia-poll', interval=300, disabled=True),
+                html.Div(id='wikipedia-summary-table', style={'padding-top': '20px',
+                                                              'backgroundColor':
+                                                                  '#e6e4e4'})
+            ]),
+            html.Div(style={'height': '50px'}),
+            html.Div([  # Preview dataset part
+                html.Div("Bonus Plots:",
+                         style={'fontSize': '30px', 'fontWeight': 'bold', 'marginTop': '5px', 'marginBottom': '5px'}),
+                html.Div([
+                    lazy_graph('histogram', create_histogram, style={'width': '70%', 'marginLeft': '0'})
+                ], style={'padding': '20px'}),
+                *([html.Div([
+                    lazy_graph('age-distribution', create_age_distribution)
+                ], style={'padding': '20px'})] if AGE_DISTRIBUTION_CHART else []),
+                html.Div([
+                    lazy_graph('bad-try', create_bad_try, style={'display': 'inline-block', 'width': '50%'})
+                ], style={'padding': '20px'})
+            ]),
+        ], id='right-container')
+    ], id='container')
+
+
+install_orjson()
+app.layout = serve_layout
+# a restart with the same dataset and code serves the layout pre-rendered
+install_warm_layout(app)
+install_metrics(app.server)
+install_export(app.server)
+start_refresh_job()
 
 if __name__ == '__main__':
     app.run_server(debug=True)
@@ -1,3 +1,9 @@
+import flask
 from dash import Dash
 
-app = Dash(__name__)
\ No newline at end of file
+from congress_dashboard.serialization import RESPONSE_COMPRESSION, compression_config
+
+server = flask.Flask(__name__)
+# flask-compress picks up its settings when Dash installs it
+server.config.update(compression_config())
+app = Dash(__name__, server=server, compress=RESPONSE_COMPRESSION)
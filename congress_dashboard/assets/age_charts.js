@@ -0,0 +1,175 @@
+// Clientside versions of the four average-age line charts (CLIENTSIDE_AGE_CHARTS=1).
+// The figures are rolled up in the browser from the age-aggregate-store, which holds
+// sum/count of age_years per (congress, party_code, chamber, member_type), so
+// dropdown changes never reach the server. Mirrors the callbacks in callbacks.py.
+(function () {
+    var PARTY_CODES = {'Democrat': 100, 'Republican': 200};
+    var PARTY_NAMES = {100: 'Democrat', 200: 'Republican'};
+    var COMBINED_COLORS = {'New': '#87CEEB', 'Returning': '#4682B4'};
+    var PARTY_MEMBER_COLORS = {
+        'Democrat (New)': '#87CEEB',
+        'Democrat (Returning)': '#4682B4',
+        'Republican (New)': '#FFA07A',
+        'Republican (Returning)': '#B22222'
+    };
+    var CHAMBER_MEMBER_COLORS = {
+        'House (New)': '#87CEEB',
+        'House (Returning)': '#4682B4',
+        'Senate (New)': '#FFA07A',
+        'Senate (Returning)': '#B22222'
+    };
+    var STYLED_LAYOUT = {
+        plot_bgcolor: '#FFFFFF',
+        paper_bgcolor: '#e6e4e4',
+        xaxis: {gridcolor: '#8CA8CD', title: {text: 'Congress Session'}},
+        yaxis: {gridcolor: '#8CA8CD', title: {text: 'Average Age'}}
+    };
+
+    function isCombined(selected) {
+        return selected.indexOf('Combined') !== -1 && selected.length === 1;
+    }
+
+    // Average age per (series label, congress) over the store rows that pass keep(i)
+    function rollup(store, keep, label) {
+        var series = {};
+        var order = [];
+        for (var i = 0; i < store.congress.length; i++) {
+            if (!keep(i)) {
+                continue;
+            }
+            var name = label(i);
+            if (!(name in series)) {
+                series[name] = {};
+                order.push(name);
+            }
+            var cell = series[name][store.congress[i]] || (series[name][store.congress[i]] = [0, 0]);
+            cell[0] += store.age_sum[i];
+            cell[1] += store.age_count[i];
+        }
+        order.sort();
+        return order.map(function (name) {
+            var congresses = Object.keys(series[name]).map(Number).sort(function (a, b) { return a - b; });
+            return {
+                name: name,
+                x: congresses,
+                y: congresses.map(function (c) {
+                    var cell = series[name][c];
+                    return cell[1] ? cell[0] / cell[1] : null;
+                })
+            };
+        });
+    }
+
+    function figure(store, lines, title, legendTitle, colors, styled) {
+        var colorway = (store.template.layout || {}).colorway || [];
+        var data = lines.map(function (line, i) {
+            return {
+                type: 'scatter',
+                mode: 'lines',
+                name: String(line.name),
+                legendgroup: String(line.name),
+                x: line.x,
+                y: line.y,
+                line: {color: (colors && colors[line.name]) || colorway[i % colorway.length], dash: 'solid'},
+                hovertemplate: legendTitle + '=' + line.name +
+                    '<br>Congress Session=%{x}<br>Average Age=%{y}<extra></extra>',
+                showlegend: true
+            };
+        });
+        var layout = {
+            template: store.template,
+            title: {text: title},
+            legend: {title: {text: legendTitle}, tracegroupgap: 0},
+            margin: {t: 60},
+            xaxis: {title: {text: 'Congress Session'}},
+            yaxis: {title: {text: 'Average Age'}}
+        };
+        if (styled) {
+            Object.assign(layout, STYLED_LAYOUT);
+        }
+        return {data: data, layout: layout};
+    }
+
+    function selectedParties(selected) {
+        return selected.filter(function (p) { return p in PARTY_CODES; })
+            .map(function (p) { return PARTY_CODES[p]; });
+    }
+
+    window.dash_clientside = Object.assign({}, window.dash_clientside, {
+        age_charts: {
+            averageAgeParty: function (selected, store) {
+                if (!store) {
+                    return window.dash_clientside.no_update;
+                }
+                if (isCombined(selected)) {
+                    var combined = rollup(store, function (i) {
+                        return store.party_code[i] === 100 || store.party_code[i] === 200;
+                    }, function () { return 'Combined'; });
+                    return figure(store, combined, 'Average Age by Party (Combined)', 'Party', null, true);
+                }
+                var codes = selectedParties(selected);
+                var lines = rollup(store, function (i) {
+                    return codes.indexOf(store.party_code[i]) !== -1;
+                }, function (i) { return store.party_code[i]; });
+                return figure(store, lines, 'Average Age by Party', 'Party', null, true);
+            },
+
+            averageAgeChamber: function (selected, store) {
+                if (!store) {
+                    return window.dash_clientside.no_update;
+                }
+                if (isCombined(selected)) {
+                    var combined = rollup(store, function (i) {
+                        return store.chamber[i] === 'House' || store.chamber[i] === 'Senate';
+                    }, function () { return 'Combined'; });
+                    return figure(store, combined, 'Average Age by Chamber (Combined)', 'Chamber', null, false);
+                }
+                var lines = rollup(store, function (i) {
+                    return selected.indexOf(store.chamber[i]) !== -1;
+                }, function (i) { return store.chamber[i]; });
+                return figure(store, lines, 'Average Age by Chamber', 'Chamber', null, false);
+            },
+
+            newVsReturningParty: function (selected, store) {
+                if (!store) {
+                    return window.dash_clientside.no_update;
+                }
+                if (isCombined(selected)) {
+                    var combined = rollup(store, function (i) {
+                        return store.party_code[i] === 100 || store.party_code[i] === 200;
+                    }, function (i) { return store.member_type[i]; });
+                    return figure(store, combined, 'New vs Returning Members (Combined)',
+                                  'Member Type', COMBINED_COLORS, false);
+                }
+                var codes = selectedParties(selected);
+                var lines = rollup(store, function (i) {
+                    return codes.indexOf(store.party_code[i]) !== -1;
+                }, function (i) {
+                    return PARTY_NAMES[store.party_code[i]] + ' (' + store.member_type[i] + ')';
+                });
+                return figure(store, lines, 'New vs Returning Members by Party',
+                              'Party/Member Type', PARTY_MEMBER_COLORS, false);
+            },
+
+            newVsReturningChamber: function (selected, store) {
+                if (!store) {
+                    return window.dash_clientside.no_update;
+                }
+                if (isCombined(selected)) {
+                    var combined = rollup(store, function (i) {
+                        return store.chamber[i] === 'House' || store.chamber[i] === 'Senate';
+                    }, function (i) { return store.member_type[i]; });
+                    return figure(store, combined, 'New vs Returning Members by Chamber (Combined)',
+                                  'Member Type', COMBINED_COLORS, true);
+                }
+                var lines = rollup(store, function (i) {
+                    return selected.indexOf(store.chamber[i]) !== -1;
+                }, function (i) {
+                    return store.chamber[i] + ' (' + store.member_type[i] + ')';
+                });
+                return figure(store, lines, 'New vs Returning Members by Chamber',
+                              'Chamber/Member Type', CHAMBER_MEMBER_COLORS, true);
+            }
+        }
+    });
+})();
@@ -0,0 +1,41 @@
+// Lazy-loaded figures: tell the server a .lazy-section is on screen the first
+// time it scrolls into view, by setting its <graph-id>-visible store.
+(function () {
+    function reveal(section) {
+        var storeId = section.id.replace(/-section$/, '-visible');
+        if (window.dash_clientside && window.dash_clientside.set_props) {
+            window.dash_clientside.set_props(storeId, {data: true});
+        } else {
+            // renderer not ready yet, try again shortly
+            setTimeout(function () { reveal(section); }, 100);
+        }
+    }
+
+    var observer = null;
+    if ('IntersectionObserver' in window) {
+        observer = new IntersectionObserver(function (entries) {
+            entries.forEach(function (entry) {
+                if (entry.isIntersecting) {
+                    observer.unobserve(entry.target);
+                    reveal(entry.target);
+                }
+            });
+        }, {rootMargin: '200px'});
+    }
+
+    function watch() {
+        var sections = document.querySelectorAll('.lazy-section:not([data-lazy-watched])');
+        sections.forEach(function (section) {
+            section.setAttribute('data-lazy-watched', '1');
+            if (observer) {
+                observer.observe(section);
+            } else {
+                reveal(section);
+            }
+        });
+    }
+
+    // sections are rendered by React after this script runs
+    new MutationObserver(watch).observe(document.documentElement,
+                                        {childList: true, subtree: true});
+})();
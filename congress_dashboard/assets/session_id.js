@@ -0,0 +1,19 @@
+// Per-tab id for the single-flight callbacks (see single_flight.py): set once in
+// the session-id store when the page loads, so requests from one tab can supersede
+// each other without touching other tabs or viewers.
+(function () {
+    function newId() {
+        if (window.crypto && window.crypto.randomUUID) {
+            return window.crypto.randomUUID();
+        }
+        return Date.now().toString(36) + Math.random().toString(36).slice(2);
+    }
+
+    window.dash_clientside = Object.assign({}, window.dash_clientside, {
+        session: {
+            newId: function (_) {
+                return newId();
+            }
+        }
+    });
+})();
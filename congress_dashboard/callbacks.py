@@ -1,158 +1,208 @@
 import plotly_express as px
-import wikipediaapi
-from dash.dependencies import Input, Output, State
+import plotly.io as pio
+from dash import Patch, ctx, no_update
+from dash.dependencies import Input, Output, State, ClientsideFunction
+from dash.exceptions import PreventUpdate
 from app_instance import app
-from congress_dashboard.data_loader import congress, party_info, calculate_avg_age_by_member_type
+from congress_dashboard.data_loader import (party_info, calculate_avg_age_by_member_type,
+                                            current_dataset)
+from congress_dashboard.age_cube import roll_up_cells
+from congress_dashboard.career_index import member_career
+from congress_dashboard.export import export_url
+from congress_dashboard.figure_cache import lru_figure_cache
+from congress_dashboard.figures import (LAZY_FIGURES, LAZY_FIGURE_BUILDERS, CHOROPLETH_MODE,
+                                        CLIENTSIDE_AGE_CHARTS, CROSS_FILTER,
+                                        CROSS_FILTERED_BUILDERS, cross_filter_conditions,
+                                        linked_cells, histogram_patch, career_timeline_figure,
+                                        create_choropleth_session, choropleth_session_patch)
+from congress_dashboard.member_search import format_sessions, member_name, search_members
+from congress_dashboard.query_backend import get_backend
+from congress_dashboard.serialization import AGE_DECIMALS, round_ages
+from congress_dashboard.single_flight import single_flight
+from congress_dashboard.wiki_lookup import (WIKIPEDIA_PREFETCH, bioname_to_title, format_summary,
+                                            lookup_nowait, prefetch_summaries)
+
+
+# Lazily loaded static figures: the <graph>-visible store is set by assets/lazy_figures.js
+# when the section first scrolls into view; the builders memoize per dataset version.
+# Figures that follow the cross-filter are first drawn for the current selection.
+def register_lazy_figure(graph_id, builder, cross_filtered=False):
+    @app.callback(
+        Output(graph_id, 'figure'),
+        Input(f'{graph_id}-visible', 'data'),
+        *([State('cross-filter', 'data')] if cross_filtered else []),
+        prevent_initial_call=True
+    )
+    def render_lazy_figure(visible, *cross_filter):
+        if not visible:
+            raise PreventUpdate
+        return builder(*cross_filter)
+
+
+if LAZY_FIGURES:
+    for lazy_graph_id, lazy_builder in LAZY_FIGURE_BUILDERS.items():
+        if CROSS_FILTER and lazy_graph_id in CROSS_FILTERED_BUILDERS:
+            register_lazy_figure(lazy_graph_id, CROSS_FILTERED_BUILDERS[lazy_graph_id],
+                                 cross_filtered=True)
+        else:
+            register_lazy_figure(lazy_graph_id, lazy_builder)
+
+
+# Slider-mode state map: the first render sends one session's map, later slider
+# moves only patch that session's values into the existing trace
+if CHOROPLETH_MODE == 'slider':
+    @app.callback(
+        Output('choropleth', 'figure'),
+        Input('choropleth-congress', 'value'),
+        *([Input('choropleth-visible', 'data')] if LAZY_FIGURES else []),
+        prevent_initial_call=True
+    )
+    def update_choropleth_session(session, visible=True):
+        if not visible:
+            raise PreventUpdate
+        if ctx.triggered_id == 'choropleth-visible':
+            return create_choropleth_session(session)
+        return choropleth_session_patch(session)
+
+
+# The four average-age charts are server callbacks unless CLIENTSIDE_AGE_CHARTS is
+# set, in which case assets/age_charts.js draws them from the age-aggregate-store
+def age_chart_callback(*args, **kwargs):
+    if CLIENTSIDE_AGE_CHARTS:
+        return lambda func: func
+    return app.callback(*args, **kwargs)
+
+
+if CLIENTSIDE_AGE_CHARTS:
+    for chart_function, graph_id, dropdown_id in [
+            ('averageAgeParty', 'line-chart-average-age-party', 'party-dropdown-average-age'),
+            ('averageAgeChamber', 'line-chart-average-age-chamber', 'chamber-dropdown-average-age'),
+            ('newVsReturningParty', 'line-chart-new-vs-returning-party', 'party-dropdown-new-vs-returning'),
+            ('newVsReturningChamber', 'line-chart-new-vs-returning-chamber', 'chamber-dropdown-new-vs-returning')]:
+        app.clientside_callback(
+            ClientsideFunction(namespace='age_charts', function_name=chart_function),
+            Output(graph_id, 'figure'),
+            Input(dropdown_id, 'value'),
+            Input('age-aggregate-store', 'data')
+        )
 
 
-@app.callback(
-    Output('line-chart-average-age-party', 'figure'),
-    Input('party-dropdown-average-age', 'value')
-)
-def update_average_age_party_chart(selected_parties):
-    # Base filtered data containing only valid parties (100 for Democrat, 200 for Republican)
-    data = congress[congress['party_code'].isin([100, 200])].copy()
+# Average age per group from the query backend, rounded to display precision for the wire.
+# In cross-filter mode every chart rolls up the linked cells of the current selection.
+def chart_data(by, filters, cross_filter=None):
+    if CROSS_FILTER:
+        data = roll_up_cells(linked_cells(cross_filter or {}), by, filters)
+    else:
+        data = get_backend().age_summary(by, filters)
+    data['age_years'] = round_ages(data['age_years'])
+    return data
+
+
+# The dropdown callbacks also read the current cross-filter selection
+def cross_filter_state():
+    return [State('cross-filter', 'data')] if CROSS_FILTER else []
+
+
+# Each line chart is described by a spec: the plotted data, the legend column and
+# its title, the chart title and an optional color map. line_figure draws it with
+# px.line; line_chart_patch sends just the traces when only the data changed.
+def line_figure(spec):
+    return px.line(
+        spec['data'],
+        x='congress',
+        y='age_years',
+        color=spec['color'],
+        title=spec['title'],
+        labels={
+            'congress': 'Congress Session',
+            'age_years': 'Average Age',
+            spec['color']: spec['legend']
+        },
+        color_discrete_map=spec['color_map']
+    )
 
+
+def line_chart_patch(spec):
+    # The traces px.line would draw for the spec, with the same colors (mapped
+    # values first, then the template colorway in order of appearance), swapped
+    # into the figure already on the page
+    data, color = spec['data'], spec['color']
+    colorway = pio.templates[pio.templates.default].layout.colorway
+    color_map = dict(spec['color_map'] or {})
+    traces = []
+    for name, group in data.groupby(color, sort=False):
+        if name not in color_map:
+            color_map[name] = colorway[len(color_map) % len(colorway)]
+        traces.append({
+            'type': 'scatter',
+            'mode': 'lines',
+            'name': str(name),
+            'legendgroup': str(name),
+            'showlegend': True,
+            'line': {'color': color_map[name], 'dash': 'solid'},
+            'marker': {'symbol': 'circle'},
+            'orientation': 'v',
+            'xaxis': 'x',
+            'yaxis': 'y',
+            'x': group['congress'].tolist(),
+            'y': group['age_years'].astype('float64').round(AGE_DECIMALS).tolist(),
+            'hovertemplate': f'{spec["legend"]}={name}<br>Congress Session=%{{x}}'
+                             '<br>Average Age=%{y}<extra></extra>'
+        })
+    patch = Patch()
+    patch['data'] = traces
+    return patch
+
+
+def line_spec(data, color, title, legend, color_map=None):
+    return {'data': data, 'color': color, 'title': title, 'legend': legend,
+            'color_map': color_map}
+
+
+def average_age_party_spec(selected_parties, cross_filter=None):
+    # Averages are rolled up by the query backend, only valid parties (100 for Democrat, 200 for Republican)
     if 'Combined' in selected_parties and len(selected_parties) == 1:
         # Calculate the combined average if "Combined" is the only selection
-        combined_data = (
-            data.groupby('congress')['age_years']
-            .mean()
-            .reset_index()
-        )
+        combined_data = chart_data(['congress'],
+                                   {'party_code': [100, 200]}, cross_filter)
         combined_data['party_code'] = 'Combined'
+        return line_spec(combined_data, 'party_code', 'Average Age by Party (Combined)', 'Party')
 
-        # Prepare the plot data
-        fig = px.line(
-            combined_data,
-            x='congress',
-            y='age_years',
-            color='party_code',
-            title='Average Age by Party (Combined)',
-            labels={
-                'congress': 'Congress Session',
-                'age_years': 'Average Age',
-                'party_code': 'Party'
-            }
-        )
-    else:
-        # Map selected parties to their codes
-        party_map = {'Democrat': 100, 'Republican': 200}
-        selected_codes = [party_map[party] for party in selected_parties if
-                          party in party_map]
-
-        # Filter for selected parties
-        filtered_data = data[data['party_code'].isin(selected_codes)]
-
-        # Prepare the data for plotting
-        avg_age_data = (
-            filtered_data.groupby(['congress', 'party_code'])['age_years']
-            .mean()
-            .reset_index()
-        )
+    # Map selected parties to their codes
+    party_map = {'Democrat': 100, 'Republican': 200}
+    selected_codes = [party_map[party] for party in selected_parties if
+                      party in party_map]
 
-        # Plot the chart with separate lines for each selected party
-        fig = px.line(
-            avg_age_data,
-            x='congress',
-            y='age_years',
-            color='party_code',
-            title='Average Age by Party',
-            labels={
-                'congress': 'Congress Session',
-                'age_years': 'Average Age',
-                'party_code': 'Party'
-            }
-        )
+    # Prepare the data for plotting, filtered to the selected parties,
+    # with separate lines for each selected party
+    avg_age_data = chart_data(['congress', 'party_code'],
+                              {'party_code': selected_codes}, cross_filter)
+    return line_spec(avg_age_data, 'party_code', 'Average Age by Party', 'Party')
 
-    fig.update_layout(
-        plot_bgcolor='#FFFFFF',
-        paper_bgcolor='#e6e4e4',  # Background around the plot
-        xaxis=dict(
-            gridcolor='#8CA8CD',  # Light gray for X-axis grid lines
-            title='Congress Session'
-        ),
-        yaxis=dict(
-            gridcolor='#8CA8CD',  # Light gray for Y-axis grid lines
-            title='Average Age'
-        )
-    )
-
-    return fig
-
-
-@app.callback(
-    Output('line-chart-average-age-chamber', 'figure'),
-    Input('chamber-dropdown-average-age', 'value')
-)
-def update_average_age_chamber_chart(selected_chambers):
-    # Base filtered data containing only valid chambers (House and Senate)
-    data = congress[congress['chamber'].isin(['House', 'Senate'])].copy()
 
+def average_age_chamber_spec(selected_chambers, cross_filter=None):
+    # Averages are rolled up by the query backend, only valid chambers (House and Senate)
     if 'Combined' in selected_chambers and len(selected_chambers) == 1:
         # Calculate the combined average if "Combined" is the only selection
-        combined_data = (
-            data.groupby('congress')['age_years']
-            .mean()
-            .reset_index()
-        )
+        combined_data = chart_data(['congress'],
+                                   {'chamber': ['House', 'Senate']}, cross_filter)
         combined_data['chamber'] = 'Combined'
+        return line_spec(combined_data, 'chamber', 'Average Age by Chamber (Combined)',
+                         'Chamber')
 
-        # Prepare the plot data
-        fig = px.line(
-            combined_data,
-            x='congress',
-            y='age_years',
-            color='chamber',
-            title='Average Age by Chamber (Combined)',
-            labels={
-                'congress': 'Congress Session',
-                'age_years': 'Average Age',
-                'chamber': 'Chamber'
-            }
-        )
-    else:
-        # Filter for selected chambers
-        filtered_data = data[data['chamber'].isin(selected_chambers)]
-
-        # Prepare the data for plotting
-        avg_age_data = (
-            filtered_data.groupby(['congress', 'chamber'])['age_years']
-            .mean()
-            .reset_index()
-        )
-
-        # Plot the chart with separate lines for each selected chamber
-        fig = px.line(
-            avg_age_data,
-            x='congress',
-            y='age_years',
-            color='chamber',
-            title='Average Age by Chamber',
-            labels={
-                'congress': 'Congress Session',
-                'age_years': 'Average Age',
-                'chamber': 'Chamber'
-            }
-        )
-
-    return fig
+    # Prepare the data for plotting, filtered to the selected chambers,
+    # with separate lines for each selected chamber
+    avg_age_data = chart_data(['congress', 'chamber'],
+                              {'chamber': selected_chambers}, cross_filter)
+    return line_spec(avg_age_data, 'chamber', 'Average Age by Chamber', 'Chamber')
 
-@app.callback(
-    Output('line-chart-new-vs-returning-party', 'figure'),
-    Input('party-dropdown-new-vs-returning', 'value')
-)
-def update_new_vs_returning_party_chart(selected_parties):
-    # Base filtered data containing only valid parties (100 for Democrat, 200 for Republican)
-    data = congress[congress['party_code'].isin([100, 200])].copy()
 
+def new_vs_returning_party_spec(selected_parties, cross_filter=None):
+    # Averages are rolled up by the query backend, only valid parties (100 for Democrat, 200 for Republican)
     if 'Combined' in selected_parties and len(selected_parties) == 1:
         # Calculate the combined average if "Combined" is the only selection
-        combined_data = (
-            data.groupby(['congress', 'member_type'])['age_years']
-            .mean()
-            .reset_index()
-        )
+        combined_data = chart_data(['congress', 'member_type'],
+                                   {'party_code': [100, 200]}, cross_filter)
         combined_data['party_member_type'] = combined_data['member_type']
 
         # Define color mapping for combined
@@ -160,86 +210,38 @@ def update_new_vs_returning_party_chart(selected_parties):
             'New': '#87CEEB',  # Light Blue
             'Returning': '#4682B4'  # Dark Blue
         }
-
-        # Prepare the plot data
-        fig = px.line(
-            combined_data,
-            x='congress',
-            y='age_years',
-            color='party_member_type',
-            title='New vs Returning Members (Combined)',
-            labels={
-                'congress': 'Congress Session',
-                'age_years': 'Average Age',
-                'party_member_type': 'Member Type'
-            },
-            color_discrete_map=color_discrete_map
-        )
-    else:
-        # Map selected parties to their codes
-        party_map = {'Democrat': 100, 'Republican': 200}
-        selected_codes = [party_map[party] for party in selected_parties if
-                          party in party_map]
-
-        # Filter for selected parties
-        filtered_data = data[data['party_code'].isin(selected_codes)]
-
-        # Prepare the data for plotting
-        avg_age_data = (
-            filtered_data.groupby(['congress', 'member_type', 'party_code'])[
-                'age_years']
-            .mean()
-            .reset_index()
-        )
-
-        # Create a combined column for legend
-        avg_age_data['party_member_type'] = avg_age_data.apply(
-            lambda
-                row: f"{'Democrat' if row['party_code'] == 100 else 'Republican'} ({row['member_type']})",
-            axis=1
-        )
-
-        # Define color mapping
-        color_discrete_map = {
-            'Democrat (New)': '#87CEEB',  # Light Blue
-            'Democrat (Returning)': '#4682B4',  # Dark Blue
-            'Republican (New)': '#FFA07A',  # Light Red
-            'Republican (Returning)': '#B22222'  # Dark Red
-        }
-
-        # Plot the chart
-        fig = px.line(
-            avg_age_data,
-            x='congress',
-            y='age_years',
-            color='party_member_type',
-            title='New vs Returning Members by Party',
-            labels={
-                'congress': 'Congress Session',
-                'age_years': 'Average Age',
-                'party_member_type': 'Party/Member Type'
-            },
-            color_discrete_map=color_discrete_map
-        )
-
-    return fig
-
-
-@app.callback(
-    Output('line-chart-new-vs-returning-chamber', 'figure'),
-    Input('chamber-dropdown-new-vs-returning', 'value')
-)
-def update_new_vs_returning_chamber_chart(selected_chambers):
-    # Base filtered data containing only valid chambers
-    data = congress[congress['chamber'].isin(['House', 'Senate'])].copy()
-
+        return line_spec(combined_data, 'party_member_type',
+                         'New vs Returning Members (Combined)', 'Member Type',
+                         color_discrete_map)
+
+    # Map selected parties to their codes
+    party_map = {'Democrat': 100, 'Republican': 200}
+    selected_codes = [party_map[party] for party in selected_parties if
+                      party in party_map]
+
+    # Prepare the data for plotting, filtered to the selected parties
+    # party_member_type is the precomputed legend label, e.g. 'Democrat (New)'
+    avg_age_data = chart_data(
+        ['congress', 'member_type', 'party_code', 'party_member_type'],
+        {'party_code': selected_codes}, cross_filter)
+
+    # Define color mapping
+    color_discrete_map = {
+        'Democrat (New)': '#87CEEB',  # Light Blue
+        'Democrat (Returning)': '#4682B4',  # Dark Blue
+        'Republican (New)': '#FFA07A',  # Light Red
+        'Republican (Returning)': '#B22222'  # Dark Red
+    }
+    return line_spec(avg_age_data, 'party_member_type', 'New vs Returning Members by Party',
+                     'Party/Member Type', color_discrete_map)
+
+
+def new_vs_returning_chamber_spec(selected_chambers, cross_filter=None):
+    # Averages are rolled up by the query backend, only valid chambers
     if 'Combined' in selected_chambers and len(selected_chambers) == 1:
         # Calculate the combined average if "Combined" is the only selection
-        combined_data = (
-            data.groupby(['congress', 'member_type'])['age_years']
-            .mean()
-            .reset_index()
-        )
+        combined_data = chart_data(['congress', 'member_type'],
+                                   {'chamber': ['House', 'Senate']}, cross_filter)
         combined_data['chamber_member_type'] = combined_data['member_type']
 
         # Define color mapping for combined
@@ -247,61 +249,28 @@ def update_new_vs_returning_chamber_chart(selected_chambers):
             'New': '#87CEEB',  # Light Blue
             'Returning': '#4682B4'  # Dark Blue
         }
-
-        # Prepare the plot data
-        fig = px.line(
-            combined_data,
-            x='congress',
-            y='age_years',
-            color='chamber_member_type',
-            title='New vs Returning Members by Chamber (Combined)',
-            labels={
-                'congress': 'Congress Session',
-                'age_years': 'Average Age',
-                'chamber_member_type': 'Member Type'
-            },
-            color_discrete_map=color_discrete_map
-        )
-    else:
-        # Filter for selected chambers
-        filtered_data = data[data['chamber'].isin(selected_chambers)]
-
-        # Prepare the data for plotting
-        avg_age_data = (
-            filtered_data.groupby(['congress', 'member_type', 'chamber'])[
-                'age_years']
-            .mean()
-            .reset_index()
-        )
-
-        # Create a combined column for legend
-        avg_age_data['chamber_member_type'] = avg_age_data.apply(
-            lambda row: f"{row['chamber']} ({row['member_type']})", axis=1
-        )
-
-        # Define color mapping
-        color_discrete_map = {
-            'House (New)': '#87CEEB',  # Light Blue
-            'House (Returning)': '#4682B4',  # Dark Blue
-            'Senate (New)': '#FFA07A',  # Light Red
-            'Senate (Returning)': '#B22222'  # Dark Red
-        }
-
-        # Plot the chart
-        fig = px.line(
-            avg_age_data,
-            x='congress',
-            y='age_years',
-            color='chamber_member_type',
-            title='New vs Returning Members by Chamber',
-            labels={
-                'congress': 'Congress Session',
-                'age_years': 'Average Age',
-                'chamber_member_type': 'Chamber/Member Type'
-            },
-            color_discrete_map=color_discrete_map
-        )
-
+        return line_spec(combined_data, 'chamber_member_type',
+                         'New vs Returning Members by Chamber (Combined)', 'Member Type',
+                         color_discrete_map)
+
+    # Prepare the data for plotting, filtered to the selected chambers
+    # chamber_member_type is the precomputed legend label, e.g. 'House (New)'
+    avg_age_data = chart_data(
+        ['congress', 'member_type', 'chamber', 'chamber_member_type'],
+        {'chamber': selected_chambers}, cross_filter)
+
+    # Define color mapping
+    color_discrete_map = {
+        'House (New)': '#87CEEB',  # Light Blue
+        'House (Returning)': '#4682B4',  # Dark Blue
+        'Senate (New)': '#FFA07A',  # Light Red
+        'Senate (Returning)': '#B22222'  # Dark Red
+    }
+    return line_spec(avg_age_data, 'chamber_member_type', 'New vs Returning Members by Chamber',
+                     'Chamber/Member Type', color_discrete_map)
+
+
+def style_line_chart(fig):
     fig.update_layout(
         plot_bgcolor='#FFFFFF',
         paper_bgcolor='#e6e4e4',  # Background around the plot
@@ -314,10 +283,132 @@ def update_new_vs_returning_chamber_chart(selected_chambers):
             title='Average Age'
         )
     )
-
     return fig
 
 
+@age_chart_callback(
+    Output('line-chart-average-age-party', 'figure'),
+    Input('party-dropdown-average-age', 'value'),
+    *cross_filter_state()
+)
+@lru_figure_cache()
+def update_average_age_party_chart(selected_parties, cross_filter=None):
+    return style_line_chart(line_figure(average_age_party_spec(selected_parties, cross_filter)))
+
+
+@age_chart_callback(
+    Output('line-chart-average-age-chamber', 'figure'),
+    Input('chamber-dropdown-average-age', 'value'),
+    *cross_filter_state()
+)
+@lru_figure_cache()
+def update_average_age_chamber_chart(selected_chambers, cross_filter=None):
+    return line_figure(average_age_chamber_spec(selected_chambers, cross_filter))
+
+@age_chart_callback(
+    Output('line-chart-new-vs-returning-party', 'figure'),
+    Input('party-dropdown-new-vs-returning', 'value'),
+    *cross_filter_state()
+)
+@lru_figure_cache()
+def update_new_vs_returning_party_chart(selected_parties, cross_filter=None):
+    return line_figure(new_vs_returning_party_spec(selected_parties, cross_filter))
+
+
+@age_chart_callback(
+    Output('line-chart-new-vs-returning-chamber', 'figure'),
+    Input('chamber-dropdown-new-vs-returning', 'value'),
+    *cross_filter_state()
+)
+@lru_figure_cache()
+def update_new_vs_returning_chamber_chart(selected_chambers, cross_filter=None):
+    return style_line_chart(line_figure(new_vs_returning_chamber_spec(selected_chambers,
+                                                                      cross_filter)))
+
+
+# Cross-filter mode. Map clicks toggle a state, a box/lasso selection on the map
+# replaces the states, and a selection on the stacked bar sets the session range.
+def cross_filter_summary(cross_filter):
+    parts = []
+    if cross_filter.get('states'):
+        parts.append('States: ' + ', '.join(cross_filter['states']))
+    if cross_filter.get('sessions'):
+        parts.append('Congress {}-{}'.format(*cross_filter['sessions']))
+    if not parts:
+        return 'Click states on the map or select sessions on the bar chart to cross-filter.'
+    return 'Cross-filter: ' + '; '.join(parts)
+
+
+if CROSS_FILTER:
+    @app.callback(
+        Output('cross-filter', 'data'),
+        Output('cross-filter-summary', 'children'),
+        Input('choropleth', 'clickData'),
+        Input('choropleth', 'selectedData'),
+        Input('stacked-bar', 'selectedData'),
+        Input('cross-filter-clear', 'n_clicks'),
+        State('cross-filter', 'data'),
+        prevent_initial_call=True
+    )
+    def update_cross_filter(map_click, map_selection, bar_selection, clear_clicks,
+                            cross_filter):
+        cross_filter = dict(cross_filter or {})
+        triggered = {item['prop_id'] for item in ctx.triggered}
+        if 'cross-filter-clear.n_clicks' in triggered:
+            cross_filter = {}
+        elif 'choropleth.selectedData' in triggered:
+            points = (map_selection or {}).get('points', [])
+            cross_filter['states'] = sorted({point['location'] for point in points})
+        elif 'choropleth.clickData' in triggered and map_click:
+            states = set(cross_filter.get('states', []))
+            states ^= {map_click['points'][0]['location']}
+            cross_filter['states'] = sorted(states)
+        if 'stacked-bar.selectedData' in triggered:
+            sessions = [point['x'] for point in (bar_selection or {}).get('points', [])]
+            cross_filter['sessions'] = [min(sessions), max(sessions)] if sessions else []
+        cross_filter = {key: value for key, value in cross_filter.items() if value}
+        return cross_filter, cross_filter_summary(cross_filter)
+
+    # graph id, dropdown id and spec of the line charts the cross-filter drives;
+    # the clientside charts are drawn in the browser and stay unfiltered
+    LINKED_LINE_CHARTS = [] if CLIENTSIDE_AGE_CHARTS else [
+        ('line-chart-average-age-party', 'party-dropdown-average-age', average_age_party_spec),
+        ('line-chart-average-age-chamber', 'chamber-dropdown-average-age', average_age_chamber_spec),
+        ('line-chart-new-vs-returning-party', 'party-dropdown-new-vs-returning',
+         new_vs_returning_party_spec),
+        ('line-chart-new-vs-returning-chamber', 'chamber-dropdown-new-vs-returning',
+         new_vs_returning_chamber_spec)]
+
+    # All linked charts in one request: the selection is aggregated once
+    # (linked_cells), every line chart rolls that up, and only the new traces and
+    # histogram bars go back as patches
+    @app.callback(
+        [*[Output(graph_id, 'figure', allow_duplicate=True)
+           for graph_id, _, _ in LINKED_LINE_CHARTS],
+         Output('histogram', 'figure', allow_duplicate=True)],
+        Input('cross-filter', 'data'),
+        *[State(dropdown_id, 'value') for _, dropdown_id, _ in LINKED_LINE_CHARTS],
+        *([State('histogram-visible', 'data')] if LAZY_FIGURES else []),
+        prevent_initial_call=True
+    )
+    def update_linked_charts(cross_filter, *selections):
+        cross_filter = cross_filter or {}
+        histogram_visible = selections[-1] if LAZY_FIGURES else True
+        patches = [line_chart_patch(spec(selected, cross_filter))
+                   for (_, _, spec), selected in zip(LINKED_LINE_CHARTS, selections)]
+        # a histogram not rendered yet picks the selection up on its first render
+        patches.append(histogram_patch(cross_filter) if histogram_visible else no_update)
+        return patches
+
+
+# the per-tab id the single-flight callbacks get, drawn once when the page loads
+app.clientside_callback(
+    ClientsideFunction(namespace='session', function_name='newId'),
+    Output('session-id', 'data'),
+    Input('session-id', 'id')
+)
+
+
 # try to add another section for table
 # modify to use party_info dataframe, upon select the party code in the filter to show party name
 @app.callback(
@@ -333,28 +424,95 @@ def update_party_name(select_party):
     return 'Party Code:'
 
 
+def table_selection(arg_congress, arg_chamber, arg_state, arg_party, cross_filter=None):
+    # dropdowns left on Default do not filter
+    selection = {col: value for col, value in [('congress', arg_congress),
+                                               ('chamber', arg_chamber),
+                                               ('state_abbrev', arg_state),
+                                               ('party_code', arg_party)]
+                 if value != 'Default'}
+    # the cross-filter narrows the rows further; a dropdown value outside the
+    # cross-filter selection matches nothing
+    for col, values in cross_filter_conditions(cross_filter).items():
+        if col in selection:
+            selection[col] = [selection[col]] if selection[col] in values else []
+        else:
+            selection[col] = values
+    return selection
+
+
 @app.callback(
     Output('filtered-table', 'data'),
+    Output('filtered-table', 'page_count'),
+    Output('filtered-count', 'children'),
     Input('select-congress', 'value'),
     Input('select-chamber', 'value'),
     Input('select-state', 'value'),
     Input('select-party', 'value'),
-    Input('age-slider', 'value')
+    Input('age-slider', 'value'),
+    Input('filtered-table', 'page_current'),
+    Input('filtered-table', 'page_size'),
+    Input('filtered-table', 'sort_by'),
+    Input('filtered-table', 'filter_query'),
+    *([Input('cross-filter', 'data')] if CROSS_FILTER else []),
+    State('session-id', 'data')
 )
+# bursts of slider and dropdown changes are coalesced, see single_flight.py
+@single_flight
 def update_filtered_data(arg_congress, arg_chamber, arg_state, arg_party,
-                         arg_age):
-    res = congress.copy()
-    if arg_congress != 'Default':
-        res = res[res['congress'] == arg_congress]
-    if arg_chamber != 'Default':
-        res = res[res['chamber'] == arg_chamber]
-    if arg_state != 'Default':
-        res = res[res['state_abbrev'] == arg_state]
-    if arg_party != 'Default':
-        res = res[res['party_code'] == arg_party]
-    res = res[
-        (res['age_years'] >= arg_age[0]) & (res['age_years'] <= arg_age[1])]
-    return res.to_dict('records')
+                         arg_age, page_current, page_size, sort_by,
+                         filter_query, cross_filter=None):
+    selection = table_selection(arg_congress, arg_chamber, arg_state, arg_party, cross_filter)
+    # filtering, sorting and paging all run in the query backend, only the visible page is sent back
+    page, page_count, n_rows = get_backend().table_page(selection, arg_age, filter_query,
+                                                        sort_by, page_current, page_size)
+    if WIKIPEDIA_PREFETCH:
+        # fetch the summaries of the rows on screen before a click asks for one
+        prefetch_summaries(page['bioname'])
+    return page.to_dict('records'), page_count, f'{n_rows} rows match'
+
+
+@app.callback(
+    Output('export-csv', 'href'),
+    Output('export-parquet', 'href'),
+    Input('select-congress', 'value'),
+    Input('select-chamber', 'value'),
+    Input('select-state', 'value'),
+    Input('select-party', 'value'),
+    Input('age-slider', 'value'),
+    *([Input('cross-filter', 'data')] if CROSS_FILTER else [])
+)
+def update_export_links(arg_congress, arg_chamber, arg_state, arg_party, arg_age,
+                        cross_filter=None):
+    # the downloads stream the same rows as the table, before its own column filters
+    selection = table_selection(arg_congress, arg_chamber, arg_state, arg_party, cross_filter)
+    return export_url('csv', selection, arg_age), export_url('parquet', selection, arg_age)
+
+
+@app.callback(
+    Output('member-search-results', 'options'),
+    Input('member-search', 'value'),
+    State('session-id', 'data'),
+    prevent_initial_call=True
+)
+@single_flight
+def update_member_search(query):
+    # runs on every keystroke against the index built with the dataset, no string scans
+    matches = search_members(current_dataset().member_index, query or '')
+    return [{'label': f"{match['bioname']} (Congress {format_sessions(match['sessions'])})",
+             'value': match['bioguide_id']} for match in matches]
+
+
+@app.callback(
+    Output('selected-bioname', 'children', allow_duplicate=True),
+    Input('member-search-results', 'value'),
+    prevent_initial_call=True
+)
+def select_searched_member(bioguide_id):
+    name = member_name(current_dataset().member_index, bioguide_id) if bioguide_id else None
+    if name is None:
+        raise PreventUpdate
+    return f'Selected Bioname: {name}'
 
 
 @app.callback(
@@ -370,33 +528,58 @@ def update_selected_bioname(selected_rows, table_data):
     return 'Click a row to display bioname here.'
 
 
+def career_summary(career):
+    chamber_word = 'chambers' if ',' in career['chambers'] else 'chamber'
+    switches = career['party_switches']
+    return (f"Congress {career['first_congress']}-{career['last_congress']}, "
+            f"{chamber_word}: {career['chambers']}, "
+            f"{switches} party switch{'es' if switches != 1 else ''}, "
+            f"age {career['entry_age']:.1f} at entry and {career['exit_age']:.1f} at exit")
+
+
+@app.callback(
+    Output('career-timeline', 'figure'),
+    Output('career-timeline', 'style'),
+    Output('career-summary', 'children'),
+    Input('filtered-table', 'selected_rows'),
+    Input('member-search-results', 'value'),
+    State('filtered-table', 'data'),
+    prevent_initial_call=True
+)
+def update_career_timeline(selected_rows, searched_id, table_data):
+    # The member comes from the selected table row or the member search; everything
+    # shown is read from the career index built with the dataset
+    if ctx.triggered_id == 'member-search-results':
+        bioguide_id = searched_id
+    elif selected_rows and table_data and selected_rows[0] < len(table_data):
+        bioguide_id = table_data[selected_rows[0]].get('bioguide_id')
+    else:
+        bioguide_id = None
+    career = member_career(current_dataset().career_index, bioguide_id) if bioguide_id else None
+    if career is None:
+        return no_update, {'display': 'none'}, ''
+    return career_timeline_figure(bioguide_id), {'display': 'block'}, career_summary(career)
+
+
 @app.callback(
     Output('wikipedia-summary-table', 'children'),
+    Output('wikipedia-poll', 'disabled'),
     Input('search-wikipedia', 'n_clicks'),
+    Input('wikipedia-poll', 'n_intervals'),
     State('selected-bioname', 'children')
 )
-# wiki documentation https://pypi.org/project/Wikipedia-API/?form=MG0AV3
-def search_wikipedia(n_clicks, selected_name):
+# The lookup runs on the wiki_lookup thread pool; while it is in flight the
+# wikipedia-poll interval re-runs this callback until the result is cached.
+def search_wikipedia(n_clicks, n_intervals, selected_name):
     if selected_name == 'Click a row to display bioname here.':
-        return 'Please select who you want to know.'
+        return 'Please select who you want to know.', True
     if n_clicks > 0 and selected_name:
-        user_agent = "MyApp/1.0 (https://myappwebsite.example)"
-        wiki = wikipediaapi.Wikipedia('en', headers={'User-Agent': user_agent})
-
         # Extract the name without "Selected Bioname:"
         name = selected_name.replace('Selected Bioname: ', '').strip()
-        parts = name.split(', ')
-        parts = parts[::-1]
-        parts[1] = parts[1].capitalize()
-        name = " ".join(parts)
-        res = ['### Wikipedia Summary:', 'name']
-
         if name:
-            page = wiki.page(name)
-            if page.exists():
-                res.append(page.summary[:500])
-                link = f"[Read more on Wikipedia](https://en.wikipedia.org/wiki/{name.replace(' ', '_')})"
-                return f'{res[0]}\n\n{res[1]}\n\n{res[2]}\n\n{link}'
-            else:
-                return f'{res[0]}\n\n{res[1]}\n\nNo page found for this name.'
-    return ''
+            result = lookup_nowait(name)
+            if result is None:
+                return (f'### Wikipedia Summary:\n\n{bioname_to_title(name)}'
+                        f'\n\nLooking up Wikipedia...'), False
+            return format_summary(result), True
+    return '', True
@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+
+# Per-member career summary, built once per dataset in one sorted group pass.
+# Entries are indexed by member position; 'position' maps a bioguide_id to it.
+#   first_congress / last_congress   sessions the career starts and ends in
+#   chambers                         chambers served in, e.g. 'House, Senate'
+#   party_switches                   times party_code changed between consecutive rows
+#   entry_age / exit_age             age_years in the first and the last row
+#   row_start / row_end              the member's slice of row_order, which lists the
+#                                    member's row ids in the congress frame by session
+
+
+def build_career_index(data):
+    codes, bioguide_ids = pd.factorize(data['bioguide_id'])
+    congress = data['congress'].to_numpy()
+    # member rows made contiguous and ordered by session (row id breaks ties)
+    row_order = np.lexsort((np.arange(len(data)), congress, codes))
+    row_order = row_order[codes[row_order] >= 0]
+    member = codes[row_order]
+    row_start = np.flatnonzero(np.r_[True, member[1:] != member[:-1]])
+    row_end = np.r_[row_start[1:], len(row_order)]
+
+    # one bit per chamber, OR-ed over each member's rows
+    chamber_codes, chamber_names = pd.factorize(data['chamber'].astype(str), sort=True)
+    chamber_bits = np.bitwise_or.reduceat(1 << chamber_codes[row_order], row_start)
+    labels = np.empty(1 << len(chamber_names), dtype=object)
+    for bits in range(len(labels)):
+        labels[bits] = ', '.join(name for i, name in enumerate(chamber_names) if bits >> i & 1)
+
+    party = data['party_code'].to_numpy()[row_order]
+    changed = np.r_[False, party[1:] != party[:-1]]
+    changed[row_start] = False  # the first row of a member starts the count
+    ages = data['age_years'].to_numpy('float64')[row_order]
+    bioguide_ids = np.asarray(bioguide_ids).astype(str)
+    return {'bioguide_id': bioguide_ids,
+            'position': {bioguide_id: i for i, bioguide_id in enumerate(bioguide_ids)},
+            'first_congress': congress[row_order][row_start],
+            'last_congress': congress[row_order][row_end - 1],
+            'chambers': labels[chamber_bits],
+            'party_switches': np.add.reduceat(changed.astype(np.int64), row_start),
+            'entry_age': ages[row_start],
+            'exit_age': ages[row_end - 1],
+            'row_start': row_start,
+            'row_end': row_end,
+            'row_order': row_order}
+
+
+def member_career(index, bioguide_id):
+    # Career summary of one member, with 'rows' holding the member's row ids in
+    # the congress frame in session order; None for an unknown bioguide_id
+    i = index['position'].get(bioguide_id)
+    if i is None:
+        return None
+    return {'bioguide_id': bioguide_id,
+            'first_congress': int(index['first_congress'][i]),
+            'last_congress': int(index['last_congress'][i]),
+            'chambers': index['chambers'][i],
+            'party_switches': int(index['party_switches'][i]),
+            'entry_age': float(index['entry_age'][i]),
+            'exit_age': float(index['exit_age'][i]),
+            'rows': index['row_order'][index['row_start'][i]:index['row_end'][i]]}
@@ -1,35 +1,458 @@
 import pandas as pd
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
 import ssl
 import certifi
 import urllib.request
+import urllib.error
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import namedtuple
+from pandas.api.types import union_categoricals
+from congress_dashboard.age_cube import build_age_cube
+from congress_dashboard.career_index import build_career_index
+from congress_dashboard.filter_index import build_filter_index
+from congress_dashboard.member_search import build_member_index
+from congress_dashboard import shared_store
+
+logger = logging.getLogger(__name__)
+
+CONGRESS_URL = os.environ.get(
+    'CONGRESS_DATA_URL',
+    'https://raw.githubusercontent.com/fivethirtyeight/data/refs/heads/master/congress-demographics/data_aging_congress.csv')
+
+# Local columnar snapshot of the parsed congress data, so startup never waits on the network
+SNAPSHOT_DIR = os.environ.get(
+    'CONGRESS_SNAPSHOT_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'snapshot'))
+SNAPSHOT_FILE = os.path.join(SNAPSHOT_DIR, 'congress.parquet')
+SNAPSHOT_META = os.path.join(SNAPSHOT_DIR, 'congress.meta.json')
+FETCH_TIMEOUT = 30
+# Set to 1 to check upstream for a newer CSV on every boot (falls back to the snapshot when offline)
+REFRESH_ON_START = os.environ.get('CONGRESS_REFRESH_ON_START', '0') == '1'
+# Engine the figures and callbacks query through (see query_backend.py). 'pandas'
+# keeps the derived frame in memory; 'duckdb' never loads it and queries a Parquet
+# copy of the snapshot with the derived columns added instead.
+QUERY_BACKEND = os.environ.get('CONGRESS_QUERY_BACKEND', 'pandas')
+DERIVED_BATCH_ROWS = 100000
+
+
+def read_snapshot_meta():
+    try:
+        with open(SNAPSHOT_META) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+# Conditional GET of the CSV: returns (data, headers), or None when upstream answers 304 Not Modified
+def fetch_congress_csv(meta=None):
+    meta = meta or {}
+    request = urllib.request.Request(CONGRESS_URL)
+    if meta.get('etag'):
+        request.add_header('If-None-Match', meta['etag'])
+    if meta.get('last_modified'):
+        request.add_header('If-Modified-Since', meta['last_modified'])
+    context = ssl.create_default_context(cafile=certifi.where())
+    try:
+        with urllib.request.urlopen(request, context=context,
+                                    timeout=FETCH_TIMEOUT) as response:
+            # some servers ignore the conditional headers, so compare validators ourselves too
+            etag = response.headers.get('ETag')
+            last_modified = response.headers.get('Last-Modified')
+            if (etag or last_modified) and etag == meta.get('etag') \
+                    and last_modified == meta.get('last_modified'):
+                return None
+            return pd.read_csv(response), response.headers
+    except urllib.error.HTTPError as err:
+        if err.code == 304:
+            return None
+        raise
+
+
+def write_snapshot(data, headers):
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    # write to temp files first so a crash never leaves a half-written snapshot behind;
+    # every worker refreshes on its own, so the temp names are per process
+    tmp_file = f'{SNAPSHOT_FILE}.{os.getpid()}.tmp'
+    data.to_parquet(tmp_file, index=False)
+    os.replace(tmp_file, SNAPSHOT_FILE)
+    meta = {'url': CONGRESS_URL,
+            'etag': headers.get('ETag'),
+            'last_modified': headers.get('Last-Modified'),
+            'fetched_at': time.time(),
+            'rows': len(data)}
+    tmp_meta = f'{SNAPSHOT_META}.{os.getpid()}.tmp'
+    with open(tmp_meta, 'w') as f:
+        json.dump(meta, f)
+    os.replace(tmp_meta, SNAPSHOT_META)
+
+
+# Refresh step: download the CSV only if it changed since the last snapshot.
+# Returns True when a new snapshot was written.
+def refresh_snapshot():
+    meta = read_snapshot_meta()
+    if meta.get('url') != CONGRESS_URL or not os.path.exists(SNAPSHOT_FILE):
+        meta = {}
+    result = fetch_congress_csv(meta)
+    if result is None:
+        logger.info('congress snapshot is up to date')
+        return False
+    data, headers = result
+    write_snapshot(data, headers)
+    logger.info('congress snapshot refreshed (%d rows)', len(data))
+    return True
+
+
+def ensure_snapshot():
+    if not os.path.exists(SNAPSHOT_FILE):
+        # first boot: nothing to fall back on, so a network error is fatal here
+        refresh_snapshot()
+    elif REFRESH_ON_START:
+        try:
+            refresh_snapshot()
+        except (urllib.error.URLError, OSError) as err:
+            logger.warning('could not refresh congress data, using last snapshot: %s', err)
+
 
 # Function to load congress data
 def load_congress_data():
-    url = 'https://raw.githubusercontent.com/fivethirtyeight/data/refs/heads/master/congress-demographics/data_aging_congress.csv'
-    context = ssl.create_default_context(cafile=certifi.where())
-    with urllib.request.urlopen(url, context=context) as response:
-        return pd.read_csv(response)
+    ensure_snapshot()
+    return pd.read_parquet(SNAPSHOT_FILE)
+
+# Identifies the loaded snapshot; caches keyed on it are dropped when it changes
+def snapshot_version(meta=None):
+    meta = meta if meta is not None else read_snapshot_meta()
+    key = '|'.join(str(meta.get(field)) for field in
+                   ('url', 'etag', 'last_modified', 'rows', 'fetched_at'))
+    return hashlib.sha1(key.encode()).hexdigest()[:12]
 
 # Function to load party info data
 def load_party_info():
     return pd.read_csv("assets/party_codes.csv")
 
-def modified_data():
-    congress_data = load_congress_data()
+# Compact in-memory schema: the dashboard filters and groups on these columns in every callback
+CATEGORICAL_COLUMNS = ['chamber', 'state_abbrev', 'generation', 'member_type',
+                       'bioname', 'start_date', 'party_label',
+                       'party_member_type', 'chamber_member_type']
+INTEGER_COLUMNS = ['congress', 'party_code', 'cmltv_cong', 'cmltv_chamber',
+                   'age_days', 'tenure_years']
+# age_years stays float64: its 4-decimal source values do not survive a round trip
+# through float32 (31.9261 would come back as 31.92609977722168 in the table rows)
+
+# bytes used by the last frame passed through compact_congress_data, before and after
+memory_usage = {}
+
+
+def compact_congress_data(data):
+    before = int(data.memory_usage(deep=True).sum())
+    for col in CATEGORICAL_COLUMNS:
+        if col in data:
+            data[col] = data[col].astype('category')
+    for col in INTEGER_COLUMNS:
+        if col in data:
+            data[col] = pd.to_numeric(data[col], downcast='integer')
+    after = int(data.memory_usage(deep=True).sum())
+    memory_usage.update(before=before, after=after)
+    logger.info('congress frame memory: %.1f MB -> %.1f MB',
+                before / 2 ** 20, after / 2 ** 20)
+    return data
+
+
+# Derived columns, computed once at load with vectorized operations so callbacks
+# can group and label by them directly. Features run in registration order, so
+# a feature may use the columns registered before it.
+DERIVED_FEATURES = {}
+# derived columns that only exist for grouping/legends, not shown in the explorer table
+HIDDEN_FEATURES = set()
+
+PARTY_LABELS = {100: 'Democrat', 200: 'Republican'}
+AGE_BANDS = [0, 30, 40, 50, 60, 70, 80, np.inf]
+AGE_BAND_LABELS = ['<30', '30-39', '40-49', '50-59', '60-69', '70-79', '80+']
+
+
+def derived_feature(name, display=True):
+    def register(func):
+        DERIVED_FEATURES[name] = func
+        if not display:
+            HIDDEN_FEATURES.add(name)
+        return func
+    return register
+
+
+@derived_feature('member_type')
+def member_type(data):
     # Classify each member as 'New' if cmltv_cong == 1, otherwise 'Returning'
-    congress_data['member_type'] = congress_data['cmltv_cong'].apply(
-        lambda x: 'New' if x == 1 else 'Returning')
-    return congress_data
+    return pd.Series(np.where(data['cmltv_cong'] == 1, 'New', 'Returning'),
+                     index=data.index)
+
+
+@derived_feature('party_label')
+def party_label(data):
+    return data['party_code'].map(PARTY_LABELS).fillna('Other')
+
+
+@derived_feature('party_member_type', display=False)
+def party_member_type(data):
+    # legend label of the new vs returning by party chart, e.g. 'Democrat (New)'
+    return data['party_label'].astype(str) + ' (' + data['member_type'].astype(str) + ')'
+
+
+@derived_feature('chamber_member_type', display=False)
+def chamber_member_type(data):
+    # legend label of the new vs returning by chamber chart, e.g. 'House (New)'
+    return data['chamber'].astype(str) + ' (' + data['member_type'].astype(str) + ')'
+
+
+@derived_feature('tenure_years')
+def tenure_years(data):
+    # years already served in congress when this session started
+    return (data['cmltv_cong'] - 1) * 2
+
+
+@derived_feature('age_band')
+def age_band(data):
+    return pd.cut(data['age_years'], bins=AGE_BANDS, labels=AGE_BAND_LABELS,
+                  right=False)
+
+
+def add_derived_features(data, names=None):
+    for name, func in DERIVED_FEATURES.items():
+        if names is None or name in names:
+            data[name] = func(data)
+    return data
+
+
+# Columns shown in the explorer table
+def display_columns(data):
+    return [col for col in data.columns if col not in HIDDEN_FEATURES]
+
+
+def modified_data():
+    congress_data = add_derived_features(load_congress_data())
+    return compact_congress_data(congress_data)
+
+def derived_snapshot_file(version):
+    return os.path.join(SNAPSHOT_DIR, f'congress.derived.{version}.parquet')
+
+
+def write_derived_snapshot(version):
+    # The snapshot with the derived columns added, for the duckdb backend. Rows are
+    # derived one record batch at a time, so the whole frame is never in memory.
+    path = derived_snapshot_file(version)
+    if os.path.exists(path):
+        return path
+    source = pq.ParquetFile(SNAPSHOT_FILE)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    writer = None
+    for batch in source.iter_batches(batch_size=DERIVED_BATCH_ROWS):
+        table = pa.Table.from_pandas(add_derived_features(batch.to_pandas()),
+                                     preserve_index=False)
+        if writer is None:
+            # source columns keep the snapshot's types, categorical derived columns
+            # (age_band) are stored as plain values so every batch shares one schema
+            schema = pa.schema([
+                source.schema_arrow.field(field.name)
+                if field.name in source.schema_arrow.names
+                else pa.field(field.name, field.type.value_type
+                              if pa.types.is_dictionary(field.type) else field.type)
+                for field in table.schema])
+            writer = pq.ParquetWriter(tmp_path, schema)
+        writer.write_table(table.cast(schema))
+    writer.close()
+    os.replace(tmp_path, path)
+    # keep the previous version too, workers still on it may be mid-query
+    old_files = sorted((name for name in os.listdir(SNAPSHOT_DIR)
+                        if name.startswith('congress.derived.') and name.endswith('.parquet')),
+                       key=lambda name: os.path.getmtime(os.path.join(SNAPSHOT_DIR, name)))
+    for name in old_files[:-2]:
+        os.remove(os.path.join(SNAPSHOT_DIR, name))
+    logger.info('derived congress snapshot written: %s', path)
+    return path
+
 
 def calculate_avg_age_by_member_type(data):
     # Calculate the average age for new vs. returning members per session
-    avg_age_data = data.groupby(['congress', 'member_type'])['age_years'].mean().reset_index()
+    avg_age_data = data.groupby(['congress', 'member_type'], observed=True)['age_years'].mean().reset_index()
     return avg_age_data
 
 
+# Everything the callbacks read about the congress data, swapped as one object so
+# a callback that grabbed current_dataset() never sees a half-refreshed mix.
+#   congress      member-by-session rows with derived columns
+#   age_cube      sum/count of age_years per (congress, chamber, party, member type, state, generation)
+#   filter_index  row bitmaps for the explorer dropdowns and a sorted age index for the slider
+#   member_index  name token and trigram index for the member search (see member_search.py)
+#   career_index  per-member career summary and row ids (see career_index.py)
+#   version       snapshot_version() of the data, keys the figure caches
+# With the duckdb query backend the data stays on disk and only the member and
+# career indexes are held in memory; their row ids are row numbers of the derived file.
+Dataset = namedtuple('Dataset', ['congress', 'age_cube', 'filter_index', 'member_index',
+                                 'career_index', 'version'])
+MEMBER_COLUMNS = ['bioguide_id', 'bioname', 'congress', 'chamber', 'party_code', 'age_years']
+
+
+def build_dataset(congress_data, version):
+    return Dataset(congress_data, build_age_cube(congress_data),
+                   build_filter_index(congress_data), build_member_index(congress_data),
+                   build_career_index(congress_data), version)
+
+
+def derived_dataset(version):
+    members = pd.read_parquet(derived_snapshot_file(version), columns=MEMBER_COLUMNS)
+    return Dataset(None, None, None, build_member_index(members),
+                   build_career_index(members), version)
+
+
+def current_dataset():
+    return _dataset
+
+
+def load_dataset():
+    if QUERY_BACKEND == 'duckdb':
+        ensure_snapshot()
+        write_derived_snapshot(snapshot_version())
+        return derived_dataset(snapshot_version())
+    if not shared_store.SHARED_STORE_DIR:
+        return build_dataset(modified_data(), snapshot_version())
+    # Shared mode: the first process to get the lock loads and publishes the frame,
+    # every process (including that one) then maps the published columns read-only
+    with shared_store.store_lock():
+        if shared_store.published_version() != snapshot_version():
+            congress_data = modified_data()
+            shared_store.publish_frame(congress_data, snapshot_version())
+            del congress_data
+    return build_dataset(*shared_store.attach_frame())
+
+
+def concat_frames(frames):
+    # pd.concat that keeps categorical columns categorical by unioning their categories
+    frames = [frame.copy() for frame in frames]
+    for col in frames[0].columns:
+        if any(isinstance(frame[col].dtype, pd.CategoricalDtype) for frame in frames):
+            for frame in frames:
+                frame[col] = frame[col].astype('category')
+            categories = union_categoricals(
+                [frame[col] for frame in frames], ignore_order=True).categories
+            for frame in frames:
+                frame[col] = frame[col].cat.set_categories(categories)
+    return pd.concat(frames, ignore_index=True)
+
+
+def _hashable(series):
+    # the same values hash the same whether they sit in the raw snapshot or in the
+    # compacted frame (categories, downcast integers)
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        series = series.astype(series.cat.categories.dtype)
+    if pd.api.types.is_integer_dtype(series):
+        return series.astype('int64')
+    if pd.api.types.is_float_dtype(series):
+        return series.astype('float64')
+    return series.astype(object)
+
+
+def session_hashes(data, columns):
+    # content hash of each congress session over `columns`, independent of row order
+    hashes = pd.util.hash_pandas_object(
+        pd.DataFrame({col: _hashable(data[col]) for col in columns}), index=False)
+    return hashes.groupby(data['congress'].to_numpy()).sum()
+
+
+def changed_sessions(old_data, new_raw):
+    # congress sessions that are new, gone, or whose rows differ in any source column
+    # (a corrected birthday, party_code or bioname, a replaced member) in the fresh snapshot
+    columns = [col for col in new_raw.columns if col in old_data.columns]
+    old_hashes = session_hashes(old_data, columns).to_dict()
+    new_hashes = session_hashes(new_raw, columns).to_dict()
+    return sorted(int(session) for session in old_hashes.keys() | new_hashes.keys()
+                  if old_hashes.get(session) != new_hashes.get(session))
+
+
+def refresh_dataset():
+    # Pull a newer snapshot if there is one and swap in a dataset where only the
+    # changed sessions were re-derived and re-aggregated. Returns True on a swap.
+    global _dataset
+    try:
+        refresh_snapshot()
+    except (urllib.error.URLError, OSError) as err:
+        logger.warning('could not refresh congress data: %s', err)
+    # compare against the snapshot on disk, which another worker may have refreshed already
+    version = snapshot_version()
+    old = current_dataset()
+    if version == old.version:
+        return False
+    if QUERY_BACKEND == 'duckdb':
+        write_derived_snapshot(version)
+        _dataset = derived_dataset(version)
+        logger.info('congress dataset refreshed')
+        return True
+    if shared_store.SHARED_STORE_DIR and shared_store.published_version() == version:
+        # another worker already merged and published this version
+        _dataset = build_dataset(*shared_store.attach_frame())
+        return True
+    new_raw = pd.read_parquet(SNAPSHOT_FILE)
+    sessions = changed_sessions(old.congress, new_raw)
+    if not sessions:
+        _dataset = old._replace(version=version)
+        return False
+
+    added = compact_congress_data(
+        add_derived_features(new_raw[new_raw['congress'].isin(sessions)].copy()))
+    kept = old.congress[~old.congress['congress'].isin(sessions)]
+    congress_data = concat_frames([kept, added])
+    congress_data = congress_data.sort_values('congress', kind='stable',
+                                              ignore_index=True)
+    # the cube partitions by congress, so untouched sessions keep their cells
+    cube = concat_frames([old.age_cube[~old.age_cube['congress'].isin(sessions)],
+                          build_age_cube(added)])
+    if shared_store.SHARED_STORE_DIR:
+        with shared_store.store_lock():
+            if shared_store.published_version() != version:
+                shared_store.publish_frame(congress_data, version)
+        congress_data, version = shared_store.attach_frame()
+    # row positions shift, so the row indexes are rebuilt over the merged frame
+    _dataset = Dataset(congress_data, cube, build_filter_index(congress_data),
+                       build_member_index(congress_data), build_career_index(congress_data),
+                       version)
+    logger.info('congress dataset refreshed: sessions %s', sessions)
+    return True
+
+
+# Background job that keeps the dataset current without restarting workers.
+# CONGRESS_REFRESH_INTERVAL is in seconds, 0 turns it off.
+REFRESH_INTERVAL = float(os.environ.get('CONGRESS_REFRESH_INTERVAL', 3600))
+_refresh_thread = None
+
+
+def _refresh_loop(interval):
+    while True:
+        time.sleep(interval)
+        try:
+            refresh_dataset()
+        except Exception:
+            logger.exception('congress dataset refresh failed, keeping current data')
+
+
+def start_refresh_job(interval=REFRESH_INTERVAL):
+    global _refresh_thread
+    if interval <= 0 or _refresh_thread is not None:
+        return
+    _refresh_thread = threading.Thread(target=_refresh_loop, args=(interval,),
+                                       name='congress-refresh', daemon=True)
+    _refresh_thread.start()
+
+
 # Load datasets
-congress = modified_data()
 party_info = load_party_info()
+_dataset = load_dataset()
 
 
-
+if __name__ == '__main__':
+    # python -m congress_dashboard.data_loader  -> refresh the local snapshot
+    logging.basicConfig(level=logging.INFO)
+    refresh_snapshot()
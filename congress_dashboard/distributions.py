@@ -0,0 +1,77 @@
+import numpy as np
+
+# Distribution summaries computed on the server, so the distribution charts ship
+# one value per bin or per group instead of one value per member-session row.
+NICE_STEPS = [1, 2, 5, 10]
+BOX_QUANTILES = [0.25, 0.5, 0.75]
+
+
+def nice_bin_size(span, nbins):
+    # Smallest 1/2/5 x 10^k bin width that fits the span into at most nbins bins,
+    # the same kind of round width plotly picks when it bins in the browser
+    if span <= 0:
+        return 1.0
+    raw = span / nbins
+    magnitude = 10 ** np.floor(np.log10(raw))
+    for step in NICE_STEPS:
+        if step * magnitude >= raw:
+            return float(step * magnitude)
+
+
+def bin_layout(low, high, nbins):
+    # (first bin start, bin width) covering [low, high] in at most about nbins bins
+    size = nice_bin_size(high - low, nbins)
+    return float(np.floor(low / size) * size), size
+
+
+def histogram_bins(values, nbins=50):
+    # Returns (bin starts, counts, bin width) over the non-NaN values
+    values = np.asarray(values, dtype='float64')
+    values = values[~np.isnan(values)]
+    if len(values) == 0:
+        return np.empty(0), np.empty(0, dtype=np.int64), 1.0
+    start, size = bin_layout(values.min(), values.max(), nbins)
+    bins = ((values - start) // size).astype(np.int64)
+    counts = np.bincount(bins)
+    return start + size * np.arange(len(counts)), counts, size
+
+
+def _group_slices(values, groups):
+    # Values ordered so each group is contiguous, plus the group keys and the
+    # offset where each group starts
+    keep = ~np.isnan(values)
+    values, groups = values[keep], groups[keep]
+    order = np.argsort(groups, kind='stable')
+    values, groups = values[order], groups[order]
+    keys, starts = np.unique(groups, return_index=True)
+    return values, keys, starts
+
+
+def _partition_quantiles(values, quantiles):
+    # Linear-interpolated quantiles (numpy's default method) using one
+    # np.partition over the neighbouring ranks instead of a full sort
+    positions = (len(values) - 1) * np.asarray(quantiles)
+    lower = np.floor(positions).astype(np.int64)
+    upper = np.ceil(positions).astype(np.int64)
+    ranked = np.partition(values, np.unique(np.concatenate([lower, upper])))
+    return ranked[lower] + (ranked[upper] - ranked[lower]) * (positions - lower)
+
+
+def box_summary(values, groups):
+    # Per group: quartiles, Tukey fences (the most extreme values within 1.5 IQR
+    # of the box), mean and count. Returns a dict of arrays keyed like go.Box args.
+    values, keys, starts = _group_slices(np.asarray(values, dtype='float64'),
+                                         np.asarray(groups))
+    bounds = np.append(starts, len(values))
+    quartiles = np.array([_partition_quantiles(values[a:b], BOX_QUANTILES)
+                          for a, b in zip(bounds[:-1], bounds[1:])])
+    q1, median, q3 = quartiles.T
+    iqr = q3 - q1
+    sizes = np.diff(bounds)
+    low_limit = np.repeat(q1 - 1.5 * iqr, sizes)
+    high_limit = np.repeat(q3 + 1.5 * iqr, sizes)
+    lowerfence = np.minimum.reduceat(np.where(values >= low_limit, values, np.inf), starts)
+    upperfence = np.maximum.reduceat(np.where(values <= high_limit, values, -np.inf), starts)
+    return {'x': keys, 'q1': q1, 'median': median, 'q3': q3,
+            'lowerfence': lowerfence, 'upperfence': upperfence,
+            'mean': np.add.reduceat(values, starts) / sizes, 'count': sizes}
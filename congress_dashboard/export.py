@@ -0,0 +1,90 @@
+import io
+import os
+import urllib.parse
+
+import flask
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+
+from congress_dashboard.query_backend import get_backend
+
+# Download of the explorer's result set. /export.csv and /export.parquet take the
+# dropdown and age slider values as query parameters, e.g.
+#   /export.csv?congress=117&chamber=House&state=CA&state=NY&age_min=40&age_max=60
+# and stream the matching rows one Arrow record batch at a time, so the memory
+# used stays bounded by EXPORT_BATCH_ROWS however many rows match. A repeated
+# parameter accepts any of its values; a parameter given only empty matches nothing.
+EXPORT_BATCH_ROWS = int(os.environ.get('EXPORT_BATCH_ROWS', 50000))
+EXPORT_MIMETYPES = {'csv': 'text/csv', 'parquet': 'application/vnd.apache.parquet'}
+# query parameter -> (filtered column, value type)
+EXPORT_FILTERS = {'congress': ('congress', int),
+                  'chamber': ('chamber', str),
+                  'state': ('state_abbrev', str),
+                  'party': ('party_code', int)}
+
+
+def export_selection(args):
+    # (selection, age_range) as the query backend takes them from the request args;
+    # raises ValueError for a value of the wrong type
+    selection = {}
+    for param, (col, value_type) in EXPORT_FILTERS.items():
+        values = [value for value in args.getlist(param) if value != 'Default']
+        if values:
+            selection[col] = [value_type(value) for value in values if value != '']
+    age_range = None
+    if 'age_min' in args or 'age_max' in args:
+        age_range = [float(args.get('age_min', '-inf')), float(args.get('age_max', 'inf'))]
+    return selection, age_range
+
+
+def export_url(fmt, selection, age_range):
+    # Inverse of export_selection, for the download links next to the table
+    params = []
+    for param, (col, _) in EXPORT_FILTERS.items():
+        if col in selection:
+            values = selection[col]
+            values = values if isinstance(values, (list, tuple, set)) else [values]
+            params.extend((param, value) for value in values or [''])
+    if age_range is not None:
+        params += [('age_min', age_range[0]), ('age_max', age_range[1])]
+    return f'/export.{fmt}?{urllib.parse.urlencode(params)}'
+
+
+def _drain(buffer):
+    data = buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    return data
+
+
+def stream_export(fmt, selection, age_range, batch_rows=EXPORT_BATCH_ROWS):
+    # Yields the encoded file piece by piece: each batch is written and handed on
+    # before the next one is read
+    buffer = io.BytesIO()
+    writer = None
+    for batch in get_backend().table_batches(selection, age_range, batch_rows):
+        if writer is None:
+            if fmt == 'csv':
+                writer = pa_csv.CSVWriter(buffer, batch.schema)
+            else:
+                writer = pq.ParquetWriter(buffer, batch.schema)
+        writer.write_batch(batch)
+        yield _drain(buffer)
+    writer.close()
+    yield _drain(buffer)
+
+
+def export_view(fmt):
+    if fmt not in EXPORT_MIMETYPES:
+        flask.abort(404)
+    try:
+        selection, age_range = export_selection(flask.request.args)
+    except ValueError as err:
+        flask.abort(400, str(err))
+    return flask.Response(
+        stream_export(fmt, selection, age_range), mimetype=EXPORT_MIMETYPES[fmt],
+        headers={'Content-Disposition': f'attachment; filename=congress_export.{fmt}'})
+
+
+def install_export(server):
+    server.add_url_rule('/export.<fmt>', 'export', export_view)
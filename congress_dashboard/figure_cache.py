@@ -0,0 +1,71 @@
+import os
+import threading
+from collections import OrderedDict
+from functools import wraps
+
+from congress_dashboard import data_loader
+
+# Bounded LRU memoization for callbacks whose output depends only on their inputs
+# and the dataset (the dropdown-driven line charts). Entries are keyed on the
+# normalized inputs plus the current dataset version, and a cache is emptied as
+# soon as it sees a new dataset version.
+FIGURE_CACHE_SIZE = int(os.environ.get('FIGURE_CACHE_SIZE', 64))
+
+# hit/miss/eviction counters per cached callback
+cache_stats = {}
+
+
+def normalize_key(value):
+    # Multi-select dropdowns send lists in click order; treat them as sets
+    if isinstance(value, (list, tuple, set)):
+        return tuple(sorted((normalize_key(v) for v in value), key=repr))
+    if isinstance(value, dict):
+        return tuple(sorted((k, normalize_key(v)) for k, v in value.items()))
+    return value
+
+
+def lru_figure_cache(maxsize=FIGURE_CACHE_SIZE):
+    def decorator(func):
+        entries = OrderedDict()
+        lock = threading.Lock()
+        state = {'version': None}
+        stats = cache_stats.setdefault(
+            func.__name__, {'hits': 0, 'misses': 0, 'evictions': 0})
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            version = data_loader.current_dataset().version
+            key = (normalize_key(args), normalize_key(kwargs))
+            with lock:
+                if state['version'] != version:
+                    entries.clear()
+                    state['version'] = version
+                if key in entries:
+                    entries.move_to_end(key)
+                    stats['hits'] += 1
+                    return entries[key]
+                stats['misses'] += 1
+
+            result = func(*args, **kwargs)
+
+            with lock:
+                # don't store a figure built from a dataset that was swapped out meanwhile
+                if state['version'] == version:
+                    entries[key] = result
+                    entries.move_to_end(key)
+                    while len(entries) > maxsize:
+                        entries.popitem(last=False)
+                        stats['evictions'] += 1
+            return result
+
+        def cache_clear():
+            with lock:
+                entries.clear()
+
+        wrapper.cache_clear = cache_clear
+        return wrapper
+    return decorator
+
+
+def figure_cache_stats():
+    return {name: dict(stats) for name, stats in cache_stats.items()}
@@ -1,32 +1,99 @@
 
+import os
 import plotly_express as px
+import plotly.io as pio
+import plotly.graph_objects as go
+import numpy as np
 import pandas as pd
-from congress_dashboard.data_loader import congress
+from dash import Patch
+from congress_dashboard.age_cube import build_cell_index
+from congress_dashboard.career_index import member_career
+from congress_dashboard.data_loader import current_dataset
+from congress_dashboard.query_backend import get_backend
+from congress_dashboard.figure_cache import lru_figure_cache
+from congress_dashboard.metrics import timed_builder
+from congress_dashboard.serialization import AGE_DECIMALS, round_ages, round_percentages
+from congress_dashboard.warm_start import warm_figure
 
+# Build the static figures on demand, when their section first scrolls into view,
+# instead of at import time inside app.layout. Off by default: the page then first
+# shows placeholders that callbacks fill in. Set LAZY_FIGURES=1 to turn it on.
+LAZY_FIGURES = os.environ.get('LAZY_FIGURES', '0') == '1'
+# 'animated': one animation frame per congress session (the original map)
+# 'slider': a single session at a time, switched with the choropleth-congress slider
+CHOROPLETH_MODE = os.environ.get('CHOROPLETH_MODE', 'animated')
+# Draw the four average-age line charts in the browser from an aggregate table
+# shipped once in the age-aggregate-store (assets/age_charts.js)
+CLIENTSIDE_AGE_CHARTS = os.environ.get('CLIENTSIDE_AGE_CHARTS', '0') == '1'
+# Selecting states on the map or a session range on the stacked bar re-filters the
+# line charts, the histogram and the explorer table (the cross-filter store).
+# Off by default: it turns dragging on the stacked bar from zooming into selecting
+# and adds the cross-filter input to those callbacks. Set CROSS_FILTER=1 to link them.
+CROSS_FILTER = os.environ.get('CROSS_FILTER', '0') == '1'
+# Box per congress session of the age distribution in the bonus section
+AGE_DISTRIBUTION_CHART = os.environ.get('AGE_DISTRIBUTION_CHART', '0') == '1'
 
+# Dimensions the linked line charts group and filter on; one summary at this grain
+# per cross-filter selection is enough to roll up all four of them
+LINKED_DIMENSIONS = ['congress', 'party_code', 'chamber', 'member_type',
+                     'party_member_type', 'chamber_member_type']
 
 
-def create_choropleth():
-    # CHOROPLETH GRAPH
-    data_c = congress.groupby(by=['state_abbrev', 'congress'])[
-        'age_years'].mean().reset_index()
+def cross_filter_conditions(cross_filter):
+    # The cross-filter store as backend filters: the selected states, and the
+    # selected session range expanded to its sessions
+    conditions = {}
+    if cross_filter and cross_filter.get('states'):
+        conditions['state_abbrev'] = list(cross_filter['states'])
+    if cross_filter and cross_filter.get('sessions'):
+        low, high = cross_filter['sessions']
+        conditions['congress'] = list(range(int(low), int(high) + 1))
+    return conditions
+
+
+@lru_figure_cache()
+@timed_builder
+def linked_cells(cross_filter):
+    # The one aggregation pass per cross-filter selection, indexed so the linked
+    # charts roll it up with roll_up_cells instead of each querying the backend.
+    # Groups with a missing label (e.g. party_member_type of a third party) are
+    # kept for those roll-ups.
+    cells = get_backend().age_summary(LINKED_DIMENSIONS, cross_filter_conditions(cross_filter),
+                                      dropna=False)
+    return build_cell_index(cells, LINKED_DIMENSIONS)
+
+
+# built once per dataset version
+@lru_figure_cache(maxsize=1)
+@timed_builder
+def choropleth_data():
+    # average age plus House/Senate seat counts per state and congress session
+    backend = get_backend()
+    data_c = backend.age_summary(['state_abbrev', 'congress'])[
+        ['state_abbrev', 'congress', 'age_years']]
     data_c.rename(columns={'age_years': 'average_age'}, inplace=True)
     data_c.sort_values(by='congress', inplace=True)
     # add more info to Geo map
     # dataset: get number of house by different year
-    temp = congress[congress['chamber'] == 'House'].groupby(
-        by=['state_abbrev', 'congress'])['age_years'].size().reset_index()
-    temp.rename(columns={'age_years': 'number_of_house'}, inplace=True)
+    temp = backend.age_summary(['state_abbrev', 'congress'],
+                               {'chamber': 'House'})[
+        ['state_abbrev', 'congress', 'row_count']]
+    temp.rename(columns={'row_count': 'number_of_house'}, inplace=True)
     # dataset: get number of senate by different year
-    temp1 = congress[congress['chamber'] == 'Senate'].groupby(
-        by=['state_abbrev', 'congress'])['age_years'].size().reset_index()
-    temp1.rename(columns={'age_years': 'number_of_senate'}, inplace=True)
+    temp1 = backend.age_summary(['state_abbrev', 'congress'],
+                                {'chamber': 'Senate'})[
+        ['state_abbrev', 'congress', 'row_count']]
+    temp1.rename(columns={'row_count': 'number_of_senate'}, inplace=True)
     # merge them then merge to main Geo dataset
     temp = temp.merge(temp1, left_on=['state_abbrev', 'congress'],
                       right_on=['state_abbrev', 'congress'])
     data_c = data_c.merge(temp, left_on=['state_abbrev', 'congress'],
                           right_on=['state_abbrev', 'congress'])
+    data_c['average_age'] = round_ages(data_c['average_age'])
+    return data_c
+
 
+def _choropleth_figure(data_c, title, **kwargs):
     choropleth = px.choropleth(data_c,
                                locations='state_abbrev',
                                locationmode='USA-states',
@@ -43,36 +110,189 @@ def create_choropleth():
                                        'congress': 'Number of the Congress',
                                        'number_of_house': 'Number of House',
                                        'number_of_senate': 'Number of Senate'},
-                               title='Average Age of Congress Members by State',
-                               animation_frame='congress'
+                               title=title,
+                               **kwargs
                                )
     choropleth.update_layout(height=750,
                              width=1100)  # adjust for Geomap in Introduction
     return choropleth
 
 
-def create_histogram():
-    # HISTOGRAM: Age distribution
-    histogram = px.histogram(
-        congress,
+# built once per dataset version
+@lru_figure_cache(maxsize=1)
+@warm_figure
+@timed_builder
+def create_choropleth():
+    # CHOROPLETH GRAPH
+    return _choropleth_figure(choropleth_data(),
+                              'Average Age of Congress Members by State',
+                              animation_frame='congress')
+
+
+# Slider mode: one base trace, with per-session values swapped in on demand
+# instead of shipping an animation frame for every congress session
+@lru_figure_cache(maxsize=1)
+@timed_builder
+def choropleth_sessions():
+    # congress session -> compact columns for that session's map
+    sessions = {}
+    for session, data_s in choropleth_data().groupby('congress'):
+        sessions[int(session)] = {
+            'locations': data_s['state_abbrev'].astype(str).tolist(),
+            'z': data_s['average_age'].astype('float64').round(2).tolist(),
+            'customdata': data_s[['number_of_house',
+                                  'number_of_senate']].values.tolist()}
+    return sessions
+
+
+def choropleth_session_title(session):
+    return f'Average Age of Congress Members by State (Congress {session})'
+
+
+@lru_figure_cache()
+@warm_figure
+@timed_builder
+def create_choropleth_session(session=None):
+    if session is None:
+        session = max(choropleth_sessions())
+    data_c = choropleth_data()
+    return _choropleth_figure(data_c[data_c['congress'] == session],
+                              choropleth_session_title(session))
+
+
+def choropleth_session_patch(session):
+    # Partial update of the slider-mode map: only this session's values go over the wire
+    columns = choropleth_sessions()[session]
+    patch = Patch()
+    patch['data'][0]['locations'] = columns['locations']
+    patch['data'][0]['hovertext'] = columns['locations']
+    patch['data'][0]['z'] = columns['z']
+    patch['data'][0]['customdata'] = columns['customdata']
+    patch['layout']['title']['text'] = choropleth_session_title(session)
+    return patch
+
+
+def histogram_bars(cross_filter=None):
+    # (bin starts, counts, bin width) of the ages, over the cross-filter selection if any
+    return get_backend().age_histogram(nbins=50,
+                                       filters=cross_filter_conditions(cross_filter))
+
+
+def _histogram_figure(starts, counts, size):
+    bins = pd.DataFrame({'age_years': round_ages(starts + size / 2), 'count': counts,
+                         'bin_start': starts, 'bin_end': starts + size})
+    histogram = px.bar(
+        bins,
         x='age_years',
-        nbins=50,  # Number of bins
+        y='count',
         title='Age Years Data is Normally Distributed',
-        labels={'age_years': 'Age (Years)'}
+        labels={'age_years': 'Age (Years)'},
+        custom_data=['bin_start', 'bin_end']
     )
+    histogram.update_traces(width=size,
+                            hovertemplate='Age (Years)=%{customdata[0]}-%{customdata[1]}'
+                                          '<br>count=%{y}<extra></extra>')
+    histogram.update_layout(bargap=0)
     return histogram
 
+
+# built once per dataset version
+@lru_figure_cache(maxsize=1)
+@warm_figure
+@timed_builder
+def create_histogram():
+    # HISTOGRAM: Age distribution, binned on the server so only the bars are sent
+    return _histogram_figure(*histogram_bars())
+
+
+@lru_figure_cache()
+@timed_builder
+def create_cross_filtered_histogram(cross_filter=None):
+    # first render of the histogram while a cross-filter selection is already set
+    if not cross_filter_conditions(cross_filter):
+        return create_histogram()
+    return _histogram_figure(*histogram_bars(cross_filter))
+
+
+def histogram_patch(cross_filter):
+    # Partial update of the histogram: only the bars of the new selection are sent
+    starts, counts, size = histogram_bars(cross_filter)
+    patch = Patch()
+    patch['data'][0]['x'] = np.round(starts + size / 2, AGE_DECIMALS).tolist()
+    patch['data'][0]['y'] = counts.tolist()
+    patch['data'][0]['customdata'] = np.column_stack([starts, starts + size]).tolist()
+    patch['data'][0]['width'] = size
+    return patch
+
+
+CAREER_COLUMNS = ['congress', 'chamber', 'party_code', 'age_years']
+CHAMBER_COLORS = {'House': '#4682B4', 'Senate': '#B22222'}
+
+
+@lru_figure_cache()
+@timed_builder
+def career_timeline_figure(bioguide_id):
+    # Age by session over one member's career, one trace per chamber. The rows come
+    # straight from the career index row ids, the frame is never filtered.
+    career = member_career(current_dataset().career_index, bioguide_id)
+    if career is None:
+        return None
+    rows = get_backend().rows_by_id(career['rows'], CAREER_COLUMNS)
+    timeline = go.Figure()
+    for chamber, served in rows.groupby(rows['chamber'].astype(str), sort=True):
+        timeline.add_trace(go.Scatter(
+            x=served['congress'],
+            y=round_ages(served['age_years']),
+            customdata=served['party_code'],
+            mode='lines+markers',
+            name=chamber,
+            marker_color=CHAMBER_COLORS.get(chamber),
+            hovertemplate='Congress %{x}<br>Age %{y}<br>Party Code %{customdata}'
+        ))
+    timeline.update_layout(title='Career Timeline', xaxis_title='Congress Session',
+                           yaxis_title='Age (Years)', height=300,
+                           margin={'l': 40, 'r': 20, 't': 40, 'b': 40})
+    return timeline
+
+
+# built once per dataset version
+@lru_figure_cache(maxsize=1)
+@warm_figure
+@timed_builder
+def create_age_distribution():
+    # Age distribution per congress session as boxes, from quantiles computed on the server
+    summary = get_backend().age_box_summary('congress')
+    distribution = go.Figure(go.Box(
+        x=summary['x'],
+        q1=round_ages(summary['q1']),
+        median=round_ages(summary['median']),
+        q3=round_ages(summary['q3']),
+        lowerfence=round_ages(summary['lowerfence']),
+        upperfence=round_ages(summary['upperfence']),
+        mean=round_ages(summary['mean']),
+        name='Age',
+        marker_color='#4682B4'
+    ))
+    distribution.update_layout(title='Age Distribution of Congress Members by Session',
+                               xaxis_title='Congress Session',
+                               yaxis_title='Age (Years)')
+    return distribution
+
+# built once per dataset version
+@lru_figure_cache(maxsize=1)
+@warm_figure
+@timed_builder
 def create_stacked_bar():
     # STACKED BAR GRAPH
-    generation_counts = congress.groupby(['congress', 'generation']).size().unstack(
-        fill_value=0)
+    data_gen = get_backend().age_summary(['congress', 'generation'])
+    generation_counts = data_gen.set_index(['congress', 'generation'])[
+        'row_count'].unstack(fill_value=0)
     generation_percentages = generation_counts.div(generation_counts.sum(axis=1),
                                                    axis=0) * 100
     generation_percentages = generation_percentages.reset_index()
 
     # Calculate the average age of each generation per session
-    avg_age_by_gen = congress.groupby(['congress', 'generation'])[
-        'age_years'].mean().reset_index()
+    avg_age_by_gen = data_gen[['congress', 'generation', 'age_years']]
     avg_age_by_gen = avg_age_by_gen.rename(columns={'age_years': 'average_age'})
 
     # Define generation columns, I was getting weird columns in plot so this filters out the unwanted columns
@@ -88,6 +308,10 @@ def create_stacked_bar():
     # Merge with the average age data
     merged_data = pd.merge(generation_percentages_melted, avg_age_by_gen,
                            on=['congress', 'generation'])
+    merged_data['percentage'] = round_percentages(merged_data['percentage'])
+    # average_age only goes out in the mixed customdata list, where float32 would
+    # print as 51.2000007, so it is rounded but kept float64
+    merged_data['average_age'] = merged_data['average_age'].round(AGE_DECIMALS)
 
     # Create stacked bar chart using plotly chart with average age in hover over data
     stacked_bar = px.bar(merged_data,
@@ -112,17 +336,55 @@ def create_stacked_bar():
         legend_title='Generation',
         bargap=0.1,  # Adds a slight gap between bars
     )
+    if CROSS_FILTER:
+        # dragging across the bars selects a session range for the cross-filter
+        stacked_bar.update_layout(dragmode='select', selectdirection='h')
     return stacked_bar
 
+# built once per dataset version
+@lru_figure_cache(maxsize=1)
+@warm_figure
+@timed_builder
 def create_bad_try():
     # graph from Analysis 2
-    data2 = congress.groupby(['congress', 'party_code'])['age_years'].mean()
-    data2 = data2.reset_index()
+    data2 = get_backend().age_summary(['congress', 'party_code'])[
+        ['congress', 'party_code', 'age_years']]
     data2.rename(columns={'age_years': 'average_age'}, inplace=True)
+    data2['average_age'] = round_ages(data2['average_age'])
 
     # For plot21 # just find out seaborn does not work with dash
     plot21 = px.line(data2, x='congress', y='average_age', color='party_code',
                      labels={'party_code': 'Party Code',
                              'average_age': 'Average Age'},
                      title='bad try: Party-wise Average Age of Congress Members')
-    return plot21
\ No newline at end of file
+    return plot21
+
+
+# Aggregate table for the clientside age charts: sum/count of age_years per
+# (congress, party_code, chamber, member_type), as columns, plus the plotly
+# template so browser-built figures look like the px ones
+@lru_figure_cache(maxsize=1)
+@timed_builder
+def age_chart_store():
+    cells = get_backend().age_summary(['congress', 'party_code', 'chamber',
+                                      'member_type'])
+    return {'congress': cells['congress'].tolist(),
+            'party_code': cells['party_code'].tolist(),
+            'chamber': cells['chamber'].astype(str).tolist(),
+            'member_type': cells['member_type'].astype(str).tolist(),
+            'age_sum': cells['age_sum'].round(4).tolist(),
+            'age_count': cells['age_count'].tolist(),
+            'template': pio.templates[pio.templates.default].to_plotly_json()}
+
+
+# graph id -> builder for the figures app.layout loads lazily
+LAZY_FIGURE_BUILDERS = {'stacked-bar': create_stacked_bar,
+                        'histogram': create_histogram,
+                        'bad-try': create_bad_try}
+if AGE_DISTRIBUTION_CHART:
+    LAZY_FIGURE_BUILDERS['age-distribution'] = create_age_distribution
+if CHOROPLETH_MODE == 'animated':
+    # in slider mode update_choropleth_session renders the map instead
+    LAZY_FIGURE_BUILDERS['choropleth'] = create_choropleth
+# lazy figures that follow the cross-filter: graph id -> builder taking the selection
+CROSS_FILTERED_BUILDERS = {'histogram': create_cross_filtered_histogram}
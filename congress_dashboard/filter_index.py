@@ -0,0 +1,53 @@
+import numpy as np
+
+# Index over the columns the explorer dropdowns select on. Each distinct value
+# gets a packed bitmap of the rows holding it, and age_years is kept as a sorted
+# index so the age slider resolves with a binary search.
+INDEXED_COLUMNS = ['congress', 'chamber', 'state_abbrev', 'party_code']
+
+
+def build_filter_index(data, columns=INDEXED_COLUMNS):
+    n_rows = len(data)
+    bitmaps = {}
+    for col in columns:
+        bitmaps[col] = {}
+        for value, rows in data.groupby(col, observed=True).indices.items():
+            mask = np.zeros(n_rows, dtype=bool)
+            mask[rows] = True
+            bitmaps[col][value] = np.packbits(mask)
+    ages = data['age_years'].to_numpy()
+    # NaN ages sort to the end, so binary searches never include them
+    age_order = np.argsort(ages, kind='stable')
+    return {'n_rows': n_rows,
+            'bitmaps': bitmaps,
+            'ages': ages,
+            'age_order': age_order,
+            'age_sorted': ages[age_order]}
+
+
+def lookup_rows(index, selection, age_range=None):
+    # selection maps an indexed column to the wanted value or a list of accepted
+    # values, age_range is an inclusive [low, high]. Returns the matching row
+    # positions in frame order.
+    bits = None
+    for col, value in selection.items():
+        values = list(value) if isinstance(value, (list, tuple, set)) else [value]
+        found = [index['bitmaps'][col][v] for v in values if v in index['bitmaps'][col]]
+        if not found:
+            return np.empty(0, dtype=np.intp)
+        value_bits = found[0] if len(found) == 1 else np.bitwise_or.reduce(found)
+        bits = value_bits if bits is None else np.bitwise_and(bits, value_bits)
+
+    if bits is None:
+        if age_range is None:
+            return np.arange(index['n_rows'])
+        # only the age range is set: binary search the sorted age index
+        lo = np.searchsorted(index['age_sorted'], age_range[0], side='left')
+        hi = np.searchsorted(index['age_sorted'], age_range[1], side='right')
+        return np.sort(index['age_order'][lo:hi])
+
+    rows = np.flatnonzero(np.unpackbits(bits, count=index['n_rows']))
+    if age_range is not None:
+        ages = index['ages'][rows]
+        rows = rows[(ages >= age_range[0]) & (ages <= age_range[1])]
+    return rows
@@ -0,0 +1,135 @@
+import unicodedata
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+# Search-as-you-type over member names, built once per dataset. bionames come as
+# "LAST, First Middle, Jr." and are split into normalized word tokens, so
+# "pelosi", "nancy pel" and "Pelosi, Nancy" all find the same member.
+#   token index    every name token, sorted, for exact and prefix matches by binary search
+#   trigram index  trigram -> members having it, for misspelled or partial words
+SEARCH_RESULTS = 10
+MIN_SCORE = 0.3
+EXACT_SCORE = 3.0
+PREFIX_SCORE = 2.0
+# sorts after every character a token can hold, for prefix upper bounds
+MAX_CHAR = chr(0x10FFFF)
+JOINING_PUNCTUATION = set("'’.")
+APOSTROPHES = set("'’")
+
+
+def name_tokens(name):
+    # lowercase ASCII words: accents are dropped, apostrophes and periods are
+    # dropped inside words ("O'ROURKE" -> "orourke") and other punctuation splits words
+    text = unicodedata.normalize('NFKD', str(name))
+    text = ''.join(c for c in text if not unicodedata.combining(c)).lower()
+    text = ''.join(c for c in text if c not in JOINING_PUNCTUATION)
+    return ''.join(c if c.isalnum() else ' ' for c in text).split()
+
+
+def index_tokens(name):
+    # name_tokens plus the part after an apostrophe as a word of its own, so both
+    # "orourke" and "rourke" match O'ROURKE exactly
+    tokens = name_tokens(name)
+    for apostrophe in APOSTROPHES:
+        for part in str(name).split(apostrophe)[1:]:
+            tokens.extend(name_tokens(part)[:1])
+    return tokens
+
+
+def trigrams(token):
+    # padded like pg_trgm, so the start of a word weighs more than its end
+    padded = f'  {token} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def build_member_index(data):
+    # One entry per bioguide_id: the latest bioname and the sorted sessions served
+    codes, bioguide_ids = pd.factorize(data['bioguide_id'])
+    keep = codes >= 0
+    codes = codes[keep]
+    bioguide_ids = np.asarray(bioguide_ids).astype(str)
+    # the last row of each member holds the latest name (rows are in congress order)
+    last_rows = np.zeros(len(bioguide_ids), dtype=np.int64)
+    last_rows[codes] = np.arange(len(codes))
+    names = data['bioname'].astype(str).to_numpy()[keep][last_rows]
+    # distinct (member, session) pairs, sorted, split into one array per member
+    pairs = np.unique(np.column_stack([codes, data['congress'].to_numpy()[keep]]), axis=0)
+    starts = np.searchsorted(pairs[:, 0], np.arange(len(bioguide_ids)))
+    sessions = [runs.tolist() for runs in np.split(pairs[:, 1], starts[1:])]
+
+    token_values, token_members = [], []
+    postings = defaultdict(list)
+    for member, name in enumerate(names):
+        tokens = set(index_tokens(name))
+        token_values.extend(tokens)
+        token_members.extend([member] * len(tokens))
+        for gram in set().union(*map(trigrams, tokens)):
+            postings[gram].append(member)
+    token_values = np.array(token_values, dtype=str)
+    order = np.argsort(token_values, kind='stable')
+    return {'bioguide_id': bioguide_ids,
+            'position': {bioguide_id: i for i, bioguide_id in enumerate(bioguide_ids)},
+            'bioname': names,
+            'sessions': sessions,
+            'tokens': token_values[order],
+            'token_members': np.array(token_members, dtype=np.int32)[order],
+            'trigrams': {gram: np.array(ids, dtype=np.int32)
+                         for gram, ids in postings.items()}}
+
+
+def _token_scores(index, token):
+    # Per member: EXACT_SCORE for a name word equal to the token, PREFIX_SCORE for
+    # one starting with it, otherwise the share of the token's trigrams it has
+    n_members = len(index['bioname'])
+    grams = trigrams(token)
+    hits = [index['trigrams'][gram] for gram in grams if gram in index['trigrams']]
+    if hits:
+        scores = np.bincount(np.concatenate(hits), minlength=n_members) / len(grams)
+    else:
+        scores = np.zeros(n_members)
+    start, prefix_end = np.searchsorted(index['tokens'], [token, token + MAX_CHAR])
+    exact_end = np.searchsorted(index['tokens'], token, side='right')
+    scores[index['token_members'][start:prefix_end]] = PREFIX_SCORE
+    scores[index['token_members'][start:exact_end]] = EXACT_SCORE
+    return scores
+
+
+def search_members(index, query, k=SEARCH_RESULTS):
+    # Top-k members for the query as [{'bioguide_id', 'bioname', 'sessions', 'score'}],
+    # best first; every query word has to match some part of the name
+    tokens = name_tokens(query)
+    if not tokens or index is None or not len(index['bioname']):
+        return []
+    scores = np.zeros(len(index['bioname']))
+    matched = np.ones(len(index['bioname']), dtype=bool)
+    for token in tokens:
+        token_scores = _token_scores(index, token)
+        matched &= token_scores >= MIN_SCORE
+        scores += token_scores
+    candidates = np.flatnonzero(matched)
+    if len(candidates) > k:
+        candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+    # best score first, ties by name
+    candidates = sorted(candidates, key=lambda m: (-scores[m], index['bioname'][m]))
+    return [{'bioguide_id': index['bioguide_id'][m],
+             'bioname': index['bioname'][m],
+             'sessions': index['sessions'][m],
+             'score': round(float(scores[m]), 3)} for m in candidates]
+
+
+def member_name(index, bioguide_id):
+    position = index['position'].get(bioguide_id)
+    return None if position is None else index['bioname'][position]
+
+
+def format_sessions(sessions):
+    # [97, 98, 99, 101] -> '97-99, 101'
+    runs = []
+    for session in sessions:
+        if runs and session == runs[-1][1] + 1:
+            runs[-1][1] = session
+        else:
+            runs.append([session, session])
+    return ', '.join(str(a) if a == b else f'{a}-{b}' for a, b in runs)
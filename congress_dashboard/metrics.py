@@ -0,0 +1,138 @@
+import json
+import logging
+import os
+import random
+import threading
+import time
+from bisect import bisect_left
+from functools import wraps
+
+import flask
+
+from congress_dashboard.figure_cache import figure_cache_stats
+
+# Latency, call/error counts and response sizes for every Dash callback, keyed by
+# the callback's output id, plus build times of the figure builders. Served in the
+# Prometheus text format on /metrics.
+# METRICS_SAMPLE_RATE records only that fraction of callback requests (e.g. 0.1)
+# METRICS_LOG=1 logs one JSON line per recorded callback request
+METRICS_SAMPLE_RATE = float(os.environ.get('METRICS_SAMPLE_RATE', 1))
+METRICS_LOG = os.environ.get('METRICS_LOG', '0') == '1'
+CALLBACK_PATH = '/_dash-update-component'
+
+LATENCY_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+SIZE_BUCKETS = [256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304]
+
+logger = logging.getLogger(__name__)
+_lock = threading.Lock()
+# metric name -> {labels tuple -> histogram dict or counter value}
+_histograms = {}
+_counters = {}
+
+
+def observe(name, labels, value, buckets):
+    with _lock:
+        series = _histograms.setdefault(name, {})
+        hist = series.get(labels)
+        if hist is None:
+            hist = series[labels] = {'buckets': buckets, 'counts': [0] * len(buckets),
+                                     'sum': 0.0, 'count': 0}
+        i = bisect_left(buckets, value)
+        if i < len(buckets):
+            hist['counts'][i] += 1
+        hist['sum'] += value
+        hist['count'] += 1
+
+
+def increment(name, labels, amount=1):
+    with _lock:
+        series = _counters.setdefault(name, {})
+        series[labels] = series.get(labels, 0) + amount
+
+
+def timed_builder(func):
+    # Records how long a figure builder takes; put it under lru_figure_cache so
+    # only real builds are timed, not cache hits
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            observe('figure_builder_duration_seconds', (('builder', func.__name__),),
+                    time.perf_counter() - start, LATENCY_BUCKETS)
+    return wrapper
+
+
+def _before_callback():
+    if flask.request.path != CALLBACK_PATH:
+        return
+    if METRICS_SAMPLE_RATE < 1 and random.random() >= METRICS_SAMPLE_RATE:
+        return
+    flask.g.callback_started = time.perf_counter()
+
+
+def _after_callback(response):
+    started = flask.g.pop('callback_started', None)
+    if started is None:
+        return response
+    seconds = time.perf_counter() - started
+    body = flask.request.get_json(silent=True) or {}
+    callback = body.get('output', 'unknown')
+    labels = (('callback', callback),)
+    size = response.calculate_content_length() or 0
+    increment('dash_callback_calls_total', labels)
+    # 204 is PreventUpdate/no_update, not an error
+    increment('dash_callback_errors_total', labels, int(response.status_code >= 400))
+    observe('dash_callback_duration_seconds', labels, seconds, LATENCY_BUCKETS)
+    observe('dash_callback_response_bytes', labels, size, SIZE_BUCKETS)
+    if METRICS_LOG:
+        logger.info(json.dumps({'callback': callback, 'seconds': round(seconds, 6),
+                                'bytes': size, 'status': response.status_code}))
+    return response
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    escaped = [(k, str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+               for k, v in labels]
+    return '{' + ','.join(f'{k}="{v}"' for k, v in escaped) + '}'
+
+
+def render_metrics():
+    lines = []
+    with _lock:
+        for name in sorted(_counters):
+            lines.append(f'# TYPE {name} counter')
+            for labels, value in sorted(_counters[name].items()):
+                lines.append(f'{name}{_format_labels(labels)} {value}')
+        for name in sorted(_histograms):
+            lines.append(f'# TYPE {name} histogram')
+            for labels, hist in sorted(_histograms[name].items()):
+                cumulative = 0
+                for bound, count in zip(hist['buckets'], hist['counts']):
+                    cumulative += count
+                    le = labels + (('le', repr(float(bound))),)
+                    lines.append(f'{name}_bucket{_format_labels(le)} {cumulative}')
+                le = labels + (('le', '+Inf'),)
+                lines.append(f'{name}_bucket{_format_labels(le)} {hist["count"]}')
+                lines.append(f'{name}_sum{_format_labels(labels)} {hist["sum"]}')
+                lines.append(f'{name}_count{_format_labels(labels)} {hist["count"]}')
+    # memoized figure callbacks (see figure_cache.py)
+    for stat in ['hits', 'misses', 'evictions']:
+        name = f'figure_cache_{stat}_total'
+        lines.append(f'# TYPE {name} counter')
+        for function, stats in sorted(figure_cache_stats().items()):
+            lines.append(f'{name}{_format_labels((("function", function),))} {stats[stat]}')
+    lines.append('# TYPE dash_callback_sample_rate gauge')
+    lines.append(f'dash_callback_sample_rate {METRICS_SAMPLE_RATE}')
+    return '\n'.join(lines) + '\n'
+
+
+def install_metrics(server):
+    # Hooks the Flask server behind the Dash app and adds the /metrics route
+    server.before_request(_before_callback)
+    server.after_request(_after_callback)
+    server.add_url_rule('/metrics', 'metrics', lambda: flask.Response(
+        render_metrics(), mimetype='text/plain; version=0.0.4'))
@@ -0,0 +1,255 @@
+import threading
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from pandas.api.types import is_numeric_dtype
+
+from congress_dashboard import data_loader
+from congress_dashboard.age_cube import query_age_cube
+from congress_dashboard.distributions import bin_layout, box_summary, histogram_bins
+from congress_dashboard.filter_index import lookup_rows
+from congress_dashboard.table_query import (apply_filter_query, apply_sort, filter_query_sql,
+                                            page_bounds, page_of, quote_identifier, sort_sql)
+
+# Where the figures and callbacks get their numbers from. Every aggregation the
+# dashboard needs goes through one of these methods, so the engine behind them
+# can change with CONGRESS_QUERY_BACKEND (see data_loader.py):
+#   pandas  the in-memory derived frame, age cube and filter index (default)
+#   duckdb  DuckDB queries over the derived Parquet snapshot; filters, group-bys,
+#           sorting and paging run inside the engine and only results come back
+# Optional dependency (requirements-optional.txt): duckdb is only imported when that
+# backend is selected.
+
+AGE_COLUMN = 'age_years'
+
+
+class PandasBackend:
+    def age_summary(self, by, filters=None, dropna=True):
+        # age_sum/age_count/row_count and the mean age_years per `by` group;
+        # groups with a missing key are left out unless dropna=False
+        return query_age_cube(data_loader.current_dataset().age_cube, by, filters, dropna)
+
+    def distinct_values(self, column):
+        return sorted(data_loader.current_dataset().congress[column].unique().tolist())
+
+    def table_columns(self):
+        # [(name, is numeric)] of the explorer table
+        congress = data_loader.current_dataset().congress
+        return [(col, is_numeric_dtype(congress[col]))
+                for col in data_loader.display_columns(congress)]
+
+    def table_page(self, selection, age_range, filter_query, sort_by, page_current, page_size):
+        # Returns (rows on the page, page count, matching row count)
+        dataset = data_loader.current_dataset()
+        # resolve the selectors through the filter index instead of scanning a copy of the frame
+        res = dataset.congress.iloc[lookup_rows(dataset.filter_index, selection, age_range)]
+        res = apply_sort(apply_filter_query(res, filter_query), sort_by)
+        page, page_count = page_of(res, page_current, page_size)
+        # only the columns the table shows go out, not the hidden label columns
+        return page[data_loader.display_columns(page)], page_count, len(res)
+
+    def table_batches(self, selection, age_range, batch_rows):
+        # The rows table_page filters on (before filter_query), as Arrow record batches
+        # of at most batch_rows rows in frame order; at least one, possibly empty, batch
+        dataset = data_loader.current_dataset()
+        congress = dataset.congress
+        names = data_loader.display_columns(congress)
+        columns = [congress.columns.get_loc(col) for col in names]
+        # categoricals go out as plain values: a dictionary-encoded batch would carry
+        # every category (all the bionames) however few rows it holds
+        plain = {col: congress[col].cat.categories.dtype for col in names
+                 if isinstance(congress[col].dtype, pd.CategoricalDtype)}
+        rows = lookup_rows(dataset.filter_index, selection, age_range)
+        for start in range(0, max(len(rows), 1), batch_rows):
+            chunk = congress.iloc[rows[start:start + batch_rows], columns].astype(plain)
+            yield pa.RecordBatch.from_pandas(chunk, preserve_index=False)
+
+    def age_histogram(self, nbins, filters=None):
+        dataset = data_loader.current_dataset()
+        if not filters:
+            return histogram_bins(dataset.congress[AGE_COLUMN], nbins)
+        index = dataset.filter_index
+        return histogram_bins(index['ages'][lookup_rows(index, filters)], nbins)
+
+    def age_box_summary(self, by):
+        congress = data_loader.current_dataset().congress
+        return box_summary(congress[AGE_COLUMN], congress[by])
+
+    def rows_by_id(self, row_ids, columns):
+        # rows of the derived frame by position, in the order given
+        return data_loader.current_dataset().congress.iloc[row_ids][columns]
+
+
+NUMERIC_SQL_TYPES = {'TINYINT', 'SMALLINT', 'INTEGER', 'BIGINT', 'HUGEINT', 'UTINYINT',
+                     'USMALLINT', 'UINTEGER', 'UBIGINT', 'FLOAT', 'DOUBLE'}
+
+
+class DuckDBBackend:
+    def __init__(self):
+        import duckdb
+        self._connection = duckdb.connect()
+        self._lock = threading.Lock()
+
+    def _query(self, sql, params=(), frame=False):
+        # Result rows, or a DataFrame with frame=True. Each query gets its own
+        # cursor: one DuckDB connection must not be used from several threads.
+        with self._lock:
+            cursor = self._connection.cursor()
+        try:
+            cursor.execute(sql, list(params))
+            return cursor.df() if frame else cursor.fetchall()
+        finally:
+            cursor.close()
+
+    def _source(self):
+        path = data_loader.derived_snapshot_file(data_loader.current_dataset().version)
+        return "read_parquet('{}', file_row_number = true)".format(path.replace("'", "''"))
+
+    def _where(self, filters):
+        # filters maps a column to a value or a list of accepted values
+        conditions, params = [], []
+        for col, value in (filters or {}).items():
+            values = list(value) if isinstance(value, (list, tuple, set)) else [value]
+            if not values:
+                conditions.append('FALSE')
+                continue
+            conditions.append(f"{quote_identifier(col)} IN ({', '.join('?' * len(values))})")
+            params.extend(values)
+        return conditions, params
+
+    @staticmethod
+    def _clause(conditions):
+        return ' WHERE ' + ' AND '.join(conditions) if conditions else ''
+
+    def age_summary(self, by, filters=None, dropna=True):
+        conditions, params = self._where(filters)
+        if dropna:
+            conditions += [f'{quote_identifier(col)} IS NOT NULL' for col in by]
+        keys = ', '.join(quote_identifier(col) for col in by)
+        age = quote_identifier(AGE_COLUMN)
+        measures = (f'sum({age}) AS age_sum, count({age}) AS age_count, '
+                    f'count(*) AS row_count')
+        if by:
+            sql = (f'SELECT {keys}, {measures} FROM {self._source()}'
+                   f'{self._clause(conditions)} GROUP BY {keys} '
+                   f"ORDER BY {', '.join(quote_identifier(col) + ' NULLS LAST' for col in by)}")
+        else:
+            sql = f'SELECT {measures} FROM {self._source()}{self._clause(conditions)}'
+        totals = self._query(sql, params, frame=True)
+        totals['age_years'] = totals['age_sum'] / totals['age_count']
+        return totals
+
+    def distinct_values(self, column):
+        column = quote_identifier(column)
+        rows = self._query(f'SELECT DISTINCT {column} FROM {self._source()} '
+                           f'WHERE {column} IS NOT NULL ORDER BY {column}')
+        return [row[0] for row in rows]
+
+    def table_columns(self):
+        described = self._query(f'DESCRIBE SELECT * FROM {self._source()}')
+        return [(name, sql_type in NUMERIC_SQL_TYPES or sql_type.startswith('DECIMAL'))
+                for name, sql_type, *_ in described
+                if name != 'file_row_number' and name not in data_loader.HIDDEN_FEATURES]
+
+    def _table_where(self, selection, age_range):
+        conditions, params = self._where(selection)
+        if age_range is not None:
+            conditions.append(f'{quote_identifier(AGE_COLUMN)} BETWEEN ? AND ?')
+            params.extend(age_range)
+        return conditions, params
+
+    def table_page(self, selection, age_range, filter_query, sort_by, page_current, page_size):
+        columns = dict(self.table_columns())
+        conditions, params = self._table_where(selection, age_range)
+        query_conditions, query_params = filter_query_sql(filter_query, columns)
+        conditions += query_conditions
+        params += query_params
+        where = self._clause(conditions)
+        n_rows = self._query(f'SELECT count(*) FROM {self._source()}{where}',
+                             params)[0][0]
+        start, page_count, page_size = page_bounds(n_rows, page_current, page_size)
+        # file order breaks ties, like the stable sort of the pandas backend
+        order = ', '.join(sort_sql(sort_by, columns) + ['file_row_number'])
+        select = ', '.join(quote_identifier(name) for name in columns)
+        page = self._query(f'SELECT {select} FROM {self._source()}{where} '
+                           f'ORDER BY {order} LIMIT {int(page_size)} OFFSET {int(start)}', params,
+                           frame=True)
+        return page, page_count, n_rows
+
+    def table_batches(self, selection, age_range, batch_rows):
+        # Streams the result from the engine batch by batch. There is no ORDER BY, which
+        # would buffer the whole result: DuckDB keeps the file order of a plain scan.
+        conditions, params = self._table_where(selection, age_range)
+        columns = ', '.join(quote_identifier(name) for name, _ in self.table_columns())
+        with self._lock:
+            cursor = self._connection.cursor()
+        try:
+            cursor.execute(f'SELECT {columns} FROM {self._source()}{self._clause(conditions)}',
+                           params)
+            reader = cursor.fetch_record_batch(batch_rows)
+            empty = True
+            for batch in reader:
+                empty = False
+                yield batch
+            if empty:
+                yield pa.RecordBatch.from_pylist([], schema=reader.schema)
+        finally:
+            cursor.close()
+
+    def age_histogram(self, nbins, filters=None):
+        age = quote_identifier(AGE_COLUMN)
+        conditions, params = self._where(filters)
+        low, high = self._query(f'SELECT min({age}), max({age}) FROM {self._source()}'
+                                f'{self._clause(conditions)}', params)[0]
+        if low is None:
+            return np.empty(0), np.empty(0, dtype=np.int64), 1.0
+        start, size = bin_layout(low, high, nbins)
+        where = self._clause(conditions + [f'{age} IS NOT NULL'])
+        rows = self._query(f'SELECT CAST(floor(({age} - ?) / ?) AS BIGINT) AS bin, count(*) '
+                           f'FROM {self._source()}{where} GROUP BY bin',
+                           [start, size] + params)
+        bins = np.array([row[0] for row in rows], dtype=np.int64)
+        counts = np.zeros(bins.max() + 1, dtype=np.int64)
+        counts[bins] = [row[1] for row in rows]
+        return start + size * np.arange(len(counts)), counts, size
+
+    def age_box_summary(self, by):
+        # same summary as distributions.box_summary, computed by the engine
+        age, key = quote_identifier(AGE_COLUMN), quote_identifier(by)
+        source = self._source()
+        summary = self._query(f'''
+            WITH quartiles AS (
+                SELECT {key} AS x, quantile_cont({age}, [0.25, 0.5, 0.75]) AS q,
+                       avg({age}) AS mean, count({age}) AS count
+                FROM {source} WHERE {age} IS NOT NULL GROUP BY {key})
+            SELECT x, q[1] AS q1, q[2] AS median, q[3] AS q3, mean, count,
+                   min({age}) FILTER (WHERE {age} >= q[1] - 1.5 * (q[3] - q[1])) AS lowerfence,
+                   max({age}) FILTER (WHERE {age} <= q[3] + 1.5 * (q[3] - q[1])) AS upperfence
+            FROM {source} JOIN quartiles ON {key} = x
+            GROUP BY x, q, mean, count ORDER BY x''', frame=True)
+        return {col: summary[col].to_numpy() for col in summary.columns}
+
+    def rows_by_id(self, row_ids, columns):
+        # row ids are row numbers of the derived file (see data_loader.derived_dataset)
+        row_ids = [int(row_id) for row_id in row_ids]
+        rows = self._query(f"SELECT file_row_number, {', '.join(map(quote_identifier, columns))} "
+                           f'FROM {self._source()} WHERE file_row_number IN '
+                           f"({', '.join('?' * len(row_ids))})", row_ids, frame=True)
+        return rows.set_index('file_row_number').loc[row_ids].reset_index(drop=True)
+
+
+BACKENDS = {'pandas': PandasBackend, 'duckdb': DuckDBBackend}
+_backend = None
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        _backend = BACKENDS[data_loader.QUERY_BACKEND]()
+    return _backend
+
+
+def set_backend(backend):
+    global _backend
+    _backend = backend
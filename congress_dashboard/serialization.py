@@ -0,0 +1,54 @@
+import json
+import os
+
+import numpy as np
+import plotly.io as pio
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# What the figures put on the wire. plotly already sends numpy columns as base64
+# typed arrays; rounding ages and percentages to display precision and storing
+# them as float32 halves those arrays, and responses are compressed on the way out.
+# A negative number of decimals keeps full precision.
+AGE_DECIMALS = int(os.environ.get('AGE_DECIMALS', 2))
+PERCENT_DECIMALS = int(os.environ.get('PERCENT_DECIMALS', 1))
+# gzip for responses larger than COMPRESS_MIN_BYTES through Dash's compress option
+# (flask-compress, installed with dash[compress]); set to 0 to turn off
+RESPONSE_COMPRESSION = os.environ.get('RESPONSE_COMPRESSION', '1') == '1'
+COMPRESS_MIN_BYTES = int(os.environ.get('COMPRESS_MIN_BYTES', 1024))
+COMPRESS_MIMETYPES = ['application/json', 'text/html', 'text/plain']
+GZIP_LEVEL = 6
+
+
+def compression_config():
+    # flask-compress settings, for the server config before Dash installs it
+    return {'COMPRESS_MIN_SIZE': COMPRESS_MIN_BYTES, 'COMPRESS_MIMETYPES': COMPRESS_MIMETYPES,
+            'COMPRESS_LEVEL': GZIP_LEVEL}
+
+
+def install_orjson():
+    # Dash serializes callback responses through plotly's encoder; use orjson when
+    # it is installed instead of falling back to the stdlib json module
+    if orjson is not None:
+        pio.json.config.default_engine = 'orjson'
+
+
+def _round(values, decimals):
+    if decimals < 0:
+        return values
+    return np.round(values.astype('float64'), decimals).astype('float32')
+
+
+def round_ages(values):
+    return _round(values, AGE_DECIMALS)
+
+
+def round_percentages(values):
+    return _round(values, PERCENT_DECIMALS)
+
+
+def loads(payload):
+    return orjson.loads(payload) if orjson is not None else json.loads(payload)
@@ -0,0 +1,96 @@
+import fcntl
+import json
+import os
+import shutil
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+# Column store shared by all server worker processes on one host. One process
+# publishes the congress frame as one .npy file per column (categorical and text
+# columns as integer codes plus their categories), and every worker memory-maps
+# those files read-only, so the column data exists once in the page cache no
+# matter how many workers run. Point CONGRESS_SHARED_STORE at a directory,
+# ideally on tmpfs (e.g. /dev/shm/congress_dashboard), to turn it on.
+SHARED_STORE_DIR = os.environ.get('CONGRESS_SHARED_STORE', '')
+CURRENT_FILE = 'current'
+MANIFEST_FILE = 'manifest.json'
+
+
+@contextmanager
+def store_lock():
+    # Exclusive lock across processes, held while loading/publishing the dataset
+    os.makedirs(SHARED_STORE_DIR, exist_ok=True)
+    with open(os.path.join(SHARED_STORE_DIR, '.lock'), 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def published_version():
+    try:
+        with open(os.path.join(SHARED_STORE_DIR, CURRENT_FILE)) as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def publish_frame(data, version):
+    # Write every column of `data` under <store>/<version>/ and point `current` at it
+    target = os.path.join(SHARED_STORE_DIR, version)
+    tmp_dir = target + '.tmp'
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    columns = []
+    for i, col in enumerate(data.columns):
+        series = data[col]
+        entry = {'name': col, 'file': f'{i}.npy'}
+        if pd.api.types.is_numeric_dtype(series) and not isinstance(
+                series.dtype, pd.CategoricalDtype):
+            values = series.to_numpy()
+            entry['kind'] = 'numeric'
+        else:
+            # text columns are dictionary-encoded so they can be mapped too
+            if not isinstance(series.dtype, pd.CategoricalDtype):
+                series = series.astype('category')
+            values = series.cat.codes.to_numpy()
+            entry['kind'] = 'category'
+            entry['categories'] = series.cat.categories.astype(str).tolist()
+            entry['ordered'] = bool(series.cat.ordered)
+        np.save(os.path.join(tmp_dir, entry['file']), values)
+        columns.append(entry)
+    with open(os.path.join(tmp_dir, MANIFEST_FILE), 'w') as f:
+        json.dump({'version': version, 'rows': len(data), 'columns': columns}, f)
+
+    shutil.rmtree(target, ignore_errors=True)
+    os.replace(tmp_dir, target)
+    pointer = os.path.join(SHARED_STORE_DIR, CURRENT_FILE)
+    with open(pointer + '.tmp', 'w') as f:
+        f.write(version)
+    os.replace(pointer + '.tmp', pointer)
+
+    # older versions can go: workers that still map them keep their pages until they swap
+    for name in os.listdir(SHARED_STORE_DIR):
+        path = os.path.join(SHARED_STORE_DIR, name)
+        if name != version and os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def attach_frame():
+    # Returns (frame, version) built over read-only memory maps of the published columns
+    version = published_version()
+    directory = os.path.join(SHARED_STORE_DIR, version)
+    with open(os.path.join(directory, MANIFEST_FILE)) as f:
+        manifest = json.load(f)
+    columns = {}
+    for entry in manifest['columns']:
+        values = np.load(os.path.join(directory, entry['file']), mmap_mode='r')
+        if entry['kind'] == 'category':
+            dtype = pd.CategoricalDtype(entry['categories'], ordered=entry['ordered'])
+            # validate=False keeps the mapped codes instead of copying them
+            values = pd.Categorical.from_codes(values, dtype=dtype, validate=False)
+        columns[entry['name']] = values
+    return pd.DataFrame(columns, copy=False), manifest['version']
@@ -0,0 +1,97 @@
+import os
+import threading
+from concurrent.futures import Future
+from functools import wraps
+
+from dash.exceptions import PreventUpdate
+
+from congress_dashboard import data_loader
+from congress_dashboard.metrics import increment
+
+# Single-flight execution for the explorer callbacks that fire in bursts (slider
+# drags, dropdown flips, typing):
+#   coalescing   requests with the same arguments that arrive while one of them is
+#                being computed wait for that computation and share its result,
+#                across all viewers (keyed on the dataset version as well)
+#   superseding  requests from the same browser tab run one at a time; one that is
+#                still waiting when a newer request of the tab arrives is dropped
+#                with PreventUpdate, the renderer only shows the newest response anyway
+# A burst from one tab then costs the running computation plus the last one.
+# The tab is told apart by the session-id store (set in the browser on page load,
+# see app.py), which the decorated callback takes as its last argument; the wrapper
+# consumes it, the callback itself never sees it. SINGLE_FLIGHT=0 turns this off.
+SINGLE_FLIGHT = os.environ.get('SINGLE_FLIGHT', '1') == '1'
+
+_lock = threading.Lock()
+# (callback, arguments, dataset version) -> Future of the running computation
+_flights = {}
+# (session id, callback) -> {'latest': newest ticket, 'waiting': requests, 'lock': Lock}
+_sessions = {}
+
+
+def freeze(value):
+    # Hashable form of callback arguments; unlike figure_cache.normalize_key list
+    # order is kept, it matters for e.g. sort_by
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, freeze(v)) for k, v in value.items()))
+    return value
+
+
+def _coalesced(func, args):
+    key = (func.__name__, freeze(args), data_loader.current_dataset().version)
+    with _lock:
+        flight = _flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = _flights[key] = Future()
+    if not leader:
+        increment('single_flight_coalesced_total', (('callback', func.__name__),))
+        return flight.result()
+    try:
+        result = func(*args)
+    except BaseException as err:
+        # PreventUpdate and errors reach the waiting requests too
+        flight.set_exception(err)
+        raise
+    else:
+        flight.set_result(result)
+        return result
+    finally:
+        with _lock:
+            _flights.pop(key, None)
+
+
+def single_flight(func):
+    @wraps(func)
+    def wrapper(*args):
+        *args, session_id = args
+        if not SINGLE_FLIGHT:
+            return func(*args)
+        if not session_id:
+            # before the browser has set its session id
+            return _coalesced(func, args)
+        slot_key = (session_id, func.__name__)
+        with _lock:
+            slot = _sessions.get(slot_key)
+            if slot is None:
+                slot = _sessions[slot_key] = {'latest': 0, 'waiting': 0,
+                                              'lock': threading.Lock()}
+            slot['latest'] += 1
+            slot['waiting'] += 1
+            ticket = slot['latest']
+        try:
+            with slot['lock']:
+                if ticket != slot['latest']:
+                    increment('single_flight_superseded_total',
+                              (('callback', func.__name__),))
+                    raise PreventUpdate
+                return _coalesced(func, args)
+        finally:
+            with _lock:
+                slot['waiting'] -= 1
+                if not slot['waiting']:
+                    # idle tabs keep no state
+                    _sessions.pop(slot_key, None)
+    return wrapper
@@ -0,0 +1,154 @@
+import math
+import operator
+
+import pandas as pd
+
+# Server-side paging, sorting and filtering for the filtered-table DataTable.
+# The DataTable runs with page_action/sort_action/filter_action='custom', so only
+# the visible page is ever serialized to the browser.
+
+# Same operator table the DataTable filter UI produces, see
+# https://dash.plotly.com/datatable/callbacks
+FILTER_OPERATORS = [['ge ', '>='],
+                    ['le ', '<='],
+                    ['lt ', '<'],
+                    ['gt ', '>'],
+                    ['ne ', '!='],
+                    ['eq ', '='],
+                    ['contains '],
+                    ['datestartswith ']]
+
+COMPARISONS = {'ge': operator.ge, 'le': operator.le, 'lt': operator.lt,
+               'gt': operator.gt, 'ne': operator.ne, 'eq': operator.eq}
+
+
+def split_filter_part(filter_part):
+    # '{age_years} ge 60' -> ('age_years', 'ge', 60.0)
+    for operator_type in FILTER_OPERATORS:
+        for op in operator_type:
+            if op in filter_part:
+                name_part, value_part = filter_part.split(op, 1)
+                name = name_part[name_part.find('{') + 1: name_part.rfind('}')]
+
+                value_part = value_part.strip()
+                v0 = value_part[0] if value_part else ''
+                if v0 and v0 == value_part[-1] and v0 in ("'", '"', '`'):
+                    value = value_part[1: -1].replace('\\' + v0, v0)
+                else:
+                    try:
+                        value = float(value_part)
+                    except ValueError:
+                        value = value_part
+
+                # word operators need spaces after them in the filter string,
+                # but we don't want these later
+                return name, operator_type[0].strip(), value
+
+    return None, None, None
+
+
+def _column_mask(column, op, value):
+    # Vectorized mask for one filter clause
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        # evaluate against the (few) categories, then expand with isin
+        categories = pd.Series(column.cat.categories)
+        matched = categories[_column_mask(categories, op, value).to_numpy()]
+        if op == 'ne':
+            # missing values are not among the categories; != keeps them, as it
+            # does for other columns and IS DISTINCT FROM does on the duckdb backend
+            return column.isin(matched) | column.isna()
+        return column.isin(matched)
+    if op == 'contains':
+        return column.astype(str).str.contains(str(value), regex=False, na=False)
+    if op == 'datestartswith':
+        return column.astype(str).str.startswith(str(value), na=False)
+    if pd.api.types.is_numeric_dtype(column) and isinstance(value, str):
+        # a text value typed into a numeric column matches nothing
+        return pd.Series(op == 'ne', index=column.index)
+    if not pd.api.types.is_numeric_dtype(column) and not isinstance(value, str):
+        value = str(int(value)) if float(value).is_integer() else str(value)
+    return COMPARISONS[op](column, value)
+
+
+def apply_filter_query(data, filter_query):
+    # Translate the DataTable filter_query ('{a} ge 5 && {b} contains x') into one boolean mask
+    if not filter_query:
+        return data
+    mask = pd.Series(True, index=data.index)
+    for filter_part in filter_query.split(' && '):
+        col_name, op, value = split_filter_part(filter_part)
+        if col_name not in data.columns or op is None:
+            continue
+        mask &= _column_mask(data[col_name], op, value)
+    return data[mask]
+
+
+def apply_sort(data, sort_by):
+    if not sort_by:
+        return data
+    columns = [col['column_id'] for col in sort_by if col['column_id'] in data.columns]
+    ascending = [col['direction'] == 'asc' for col in sort_by
+                 if col['column_id'] in data.columns]
+    if not columns:
+        return data
+    return data.sort_values(columns, ascending=ascending, kind='stable')
+
+
+def page_bounds(n_rows, page_current, page_size):
+    # Returns (first row of the requested page, total page count, page size),
+    # with the page clamped to the ones that exist
+    page_size = page_size or 10
+    page_count = max(1, math.ceil(n_rows / page_size))
+    page_current = min(max(page_current or 0, 0), page_count - 1)
+    return page_current * page_size, page_count, page_size
+
+
+def page_of(data, page_current, page_size):
+    # Returns (rows on the requested page, total page count)
+    start, page_count, page_size = page_bounds(len(data), page_current, page_size)
+    return data.iloc[start: start + page_size], page_count
+
+
+# SQL versions of the above for the duckdb query backend (see query_backend.py).
+# numeric_columns maps each column the table can filter on to whether it is numeric.
+# IS DISTINCT FROM keeps rows with a missing value, like pandas' != does
+SQL_COMPARISONS = {'ge': '>=', 'le': '<=', 'lt': '<', 'gt': '>',
+                   'ne': 'IS DISTINCT FROM', 'eq': '='}
+
+
+def quote_identifier(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def filter_query_sql(filter_query, numeric_columns):
+    # Returns (list of SQL conditions, list of their parameters)
+    conditions, params = [], []
+    if not filter_query:
+        return conditions, params
+    for filter_part in filter_query.split(' && '):
+        col_name, op, value = split_filter_part(filter_part)
+        if col_name not in numeric_columns or op is None:
+            continue
+        column = quote_identifier(col_name)
+        if op == 'contains':
+            conditions.append(f'contains(CAST({column} AS VARCHAR), ?)')
+            params.append(str(value))
+        elif op == 'datestartswith':
+            conditions.append(f'starts_with(CAST({column} AS VARCHAR), ?)')
+            params.append(str(value))
+        elif numeric_columns[col_name] and isinstance(value, str):
+            # a text value typed into a numeric column matches nothing
+            conditions.append('TRUE' if op == 'ne' else 'FALSE')
+        else:
+            if not numeric_columns[col_name] and not isinstance(value, str):
+                value = str(int(value)) if float(value).is_integer() else str(value)
+            conditions.append(f'{column} {SQL_COMPARISONS[op]} ?')
+            params.append(value)
+    return conditions, params
+
+
+def sort_sql(sort_by, columns):
+    # ORDER BY terms; missing values sort last like pandas' sort_values
+    return [f"{quote_identifier(col['column_id'])} "
+            f"{'ASC' if col['direction'] == 'asc' else 'DESC'} NULLS LAST"
+            for col in sort_by or [] if col['column_id'] in columns]
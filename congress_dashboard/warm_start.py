@@ -0,0 +1,142 @@
+import hashlib
+import os
+import shutil
+import threading
+import time
+from functools import wraps
+
+import dash
+import flask
+import plotly
+from plotly.io.json import to_json_plotly
+
+from congress_dashboard import data_loader
+from congress_dashboard.serialization import loads
+
+# Pre-rendered JSON of the page layout and the static figures, kept on disk so a
+# restart with the same dataset and code serves them without rebuilding anything.
+# Files live under <WARM_START_DIR>/<key>/, where the key hashes the dataset
+# version, the source of this package, the plotly/dash versions and the settings
+# that change what gets rendered. Set WARM_START=0 to always build from scratch.
+WARM_START = os.environ.get('WARM_START', '1') == '1'
+WARM_START_DIR = os.environ.get('WARM_START_DIR',
+                                os.path.join(data_loader.SNAPSHOT_DIR, 'warm'))
+WARM_START_SETTINGS = ['LAZY_FIGURES', 'CHOROPLETH_MODE', 'CLIENTSIDE_AGE_CHARTS',
+                       'CROSS_FILTER', 'AGE_DISTRIBUTION_CHART', 'AGE_DECIMALS',
+                       'PERCENT_DECIMALS']
+# renders of other keys are pruned only when neither among the WARM_START_KEEP most
+# recently used nor used within WARM_START_MAX_AGE seconds, so workers on different
+# code or settings (a rolling deploy, mixed env) don't delete each other's renders
+WARM_START_KEEP = int(os.environ.get('WARM_START_KEEP', 4))
+WARM_START_MAX_AGE = float(os.environ.get('WARM_START_MAX_AGE', 24 * 3600))
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+_lock = threading.Lock()
+# in-memory copy of the serialized layout, per key
+_layouts = {}
+
+
+def code_version():
+    digest = hashlib.sha1()
+    for name in sorted(os.listdir(PACKAGE_DIR)):
+        if name.endswith('.py'):
+            with open(os.path.join(PACKAGE_DIR, name), 'rb') as f:
+                digest.update(name.encode() + b'\0' + f.read())
+    digest.update(f'plotly={plotly.__version__}|dash={dash.__version__}'.encode())
+    return digest.hexdigest()[:12]
+
+
+CODE_VERSION = code_version()
+
+
+def warm_start_key():
+    settings = '|'.join(f'{name}={os.environ.get(name, "")}' for name in WARM_START_SETTINGS)
+    key = f'{data_loader.current_dataset().version}|{CODE_VERSION}|{settings}'
+    return hashlib.sha1(key.encode()).hexdigest()[:16]
+
+
+def read_warm(key, name):
+    try:
+        with open(os.path.join(WARM_START_DIR, key, name + '.json'), 'rb') as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def write_warm(key, name, payload):
+    directory = os.path.join(WARM_START_DIR, key)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, name + '.json')
+    # unique temp name so workers rendering the same file don't clobber each other
+    tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(payload)
+    os.replace(tmp_path, path)
+    prune_warm(key)
+
+
+def touch_warm(key):
+    # marks the key's renders as in use
+    try:
+        os.utime(os.path.join(WARM_START_DIR, key))
+    except OSError:
+        pass
+
+
+def prune_warm(key):
+    # drops renders of keys nobody has used for a while, e.g. an older dataset or code version
+    touch_warm(key)
+    entries = []
+    for name in os.listdir(WARM_START_DIR):
+        path = os.path.join(WARM_START_DIR, name)
+        try:
+            entries.append((os.path.getmtime(path), path))
+        except OSError:
+            continue
+    entries.sort(reverse=True)
+    cutoff = time.time() - WARM_START_MAX_AGE
+    for mtime, path in entries[WARM_START_KEEP:]:
+        if mtime < cutoff and os.path.basename(path) != key:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def warm_figure(func):
+    # Serves a figure builder from its pre-rendered JSON when one exists for the
+    # current key, and renders it to disk otherwise. Callers get the figure as a
+    # plain dict either way, which dcc.Graph and callback outputs take as is.
+    @wraps(func)
+    def wrapper(*args):
+        if not WARM_START:
+            return func(*args)
+        key = warm_start_key()
+        name = '-'.join([func.__name__] + [str(arg) for arg in args])
+        payload = read_warm(key, name)
+        if payload is None:
+            payload = to_json_plotly(func(*args)).encode()
+            write_warm(key, name, payload)
+        return loads(payload)
+    return wrapper
+
+
+def warm_layout_response(app):
+    # Pre-rendered /_dash-layout response, or None to let Dash build it
+    if not WARM_START or flask.request.path != app.config.routes_pathname_prefix + '_dash-layout':
+        return None
+    key = warm_start_key()
+    with _lock:
+        payload = _layouts.get(key)
+    if payload is None:
+        payload = read_warm(key, 'layout')
+        if payload is None:
+            payload = to_json_plotly(app.get_layout()).encode()
+            write_warm(key, 'layout', payload)
+        else:
+            touch_warm(key)
+        with _lock:
+            _layouts.clear()
+            _layouts[key] = payload
+    return flask.Response(payload, mimetype='application/json')
+
+
+def install_warm_layout(app):
+    app.server.before_request(lambda: warm_layout_response(app))
@@ -0,0 +1,281 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# Wikipedia summary lookups for the explorer. Lookups run on a background thread
+# pool so a Dash callback never waits on the remote round-trip, and results are
+# kept in memory and in an on-disk cache keyed by the normalized bioname.
+# With WIKIPEDIA_PREFETCH=1 the names on the table page on screen are prefetched on
+# a second, smaller pool, so the lookup a row click asks for is usually already
+# cached; it is off by default as it sends up to a page of requests per page
+# change. Point WIKIPEDIA_API_URL at a local stub server to run all of this offline.
+WIKIPEDIA_API_URL = os.environ.get('WIKIPEDIA_API_URL',
+                                   'https://en.wikipedia.org/api/rest_v1')
+WIKIPEDIA_PAGE_URL = 'https://en.wikipedia.org/wiki/'
+USER_AGENT = "MyApp/1.0 (https://myappwebsite.example)"
+# (connect, read) timeouts in seconds
+WIKIPEDIA_TIMEOUT = (3.05, 5)
+WIKIPEDIA_WORKERS = int(os.environ.get('WIKIPEDIA_WORKERS', 4))
+WIKIPEDIA_PREFETCH = os.environ.get('WIKIPEDIA_PREFETCH', '0') == '1'
+WIKIPEDIA_PREFETCH_WORKERS = int(os.environ.get('WIKIPEDIA_PREFETCH_WORKERS', 2))
+# at most this many prefetched lookups queued or running; names past it are skipped
+WIKIPEDIA_PREFETCH_QUEUE = int(os.environ.get('WIKIPEDIA_PREFETCH_QUEUE', 30))
+WIKIPEDIA_CACHE_TTL = float(os.environ.get('WIKIPEDIA_CACHE_TTL', 7 * 24 * 3600))
+# failed lookups are remembered (in memory only) this long before retrying
+WIKIPEDIA_RETRY_AFTER = 30
+WIKIPEDIA_CACHE_FILE = os.environ.get(
+    'WIKIPEDIA_CACHE_FILE',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'snapshot',
+                 'wikipedia_cache.sqlite'))
+SUMMARY_LENGTH = 500
+
+
+# "PELOSI, Nancy" -> "Nancy Pelosi", the page title the dataset names usually map to
+def bioname_to_title(bioname):
+    parts = bioname.strip().split(', ')
+    parts = parts[::-1]
+    if len(parts) > 1:
+        parts[1] = parts[1].capitalize()
+    return " ".join(parts)
+
+
+def normalize_bioname(bioname):
+    return ' '.join(bioname.lower().split())
+
+
+class WikipediaBackend:
+    # REST summary endpoint over one pooled session shared by all lookups; the pool
+    # holds a connection for every thread of both lookup pools
+    def __init__(self, api_url=WIKIPEDIA_API_URL, timeout=WIKIPEDIA_TIMEOUT,
+                 pool_size=WIKIPEDIA_WORKERS + WIKIPEDIA_PREFETCH_WORKERS):
+        self.api_url = api_url.rstrip('/')
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers['User-Agent'] = USER_AGENT
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def summary(self, title):
+        # Returns the page summary, or None when there is no page with this title
+        url = f"{self.api_url}/page/summary/{urllib.parse.quote(title.replace(' ', '_'))}"
+        response = self.session.get(url, timeout=self.timeout)
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return response.json().get('extract') or None
+
+
+class StaticBackend:
+    # Serves summaries from a dict, for tests and offline development
+    def __init__(self, pages=None):
+        self.pages = dict(pages or {})
+
+    def summary(self, title):
+        return self.pages.get(title)
+
+
+_backend = None
+_executor = ThreadPoolExecutor(max_workers=WIKIPEDIA_WORKERS,
+                               thread_name_prefix='wikipedia')
+_prefetch_executor = ThreadPoolExecutor(max_workers=WIKIPEDIA_PREFETCH_WORKERS,
+                                        thread_name_prefix='wikipedia-prefetch')
+_lock = threading.Lock()
+_in_flight = {}
+# keys whose in-flight lookup was queued by prefetch_summaries
+_prefetching = set()
+# newest page waiting for the prefetch driver, and whether a driver is queued or running;
+# pages asked for while the driver is busy replace each other, only the last is read
+_prefetch_page = None
+_prefetch_driver = False
+# normalized bioname -> (expires_at, result)
+_memory = {}
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        _backend = WikipediaBackend()
+    return _backend
+
+
+def set_backend(backend):
+    # Swap the summary source (e.g. StaticBackend in tests); drops the in-memory cache
+    global _backend
+    with _lock:
+        _backend = backend
+        _memory.clear()
+
+
+def _connect():
+    os.makedirs(os.path.dirname(WIKIPEDIA_CACHE_FILE), exist_ok=True)
+    conn = sqlite3.connect(WIKIPEDIA_CACHE_FILE, timeout=5)
+    conn.execute('CREATE TABLE IF NOT EXISTS summaries ('
+                 'key TEXT PRIMARY KEY, title TEXT, summary TEXT, fetched_at REAL)')
+    return conn
+
+
+def _read_disk(keys):
+    # key -> (expires_at, result) for the keys found on disk, in one query
+    try:
+        with _connect() as conn:
+            rows = conn.execute('SELECT key, title, summary, fetched_at FROM summaries '
+                                f"WHERE key IN ({', '.join('?' * len(keys))})",
+                                list(keys)).fetchall()
+    except sqlite3.Error as err:
+        logger.warning('wikipedia cache read failed: %s', err)
+        return {}
+    return {key: (fetched_at + WIKIPEDIA_CACHE_TTL, {'title': title, 'summary': summary})
+            for key, title, summary, fetched_at in rows}
+
+
+def _write_disk(key, fetched_at, result):
+    try:
+        with _connect() as conn:
+            conn.execute('INSERT OR REPLACE INTO summaries VALUES (?, ?, ?, ?)',
+                         (key, result['title'], result['summary'], fetched_at))
+    except sqlite3.Error as err:
+        logger.warning('wikipedia cache write failed: %s', err)
+
+
+def cached_summary(bioname):
+    # Memory first, then disk; None when the name has not been looked up within the TTL
+    key = normalize_bioname(bioname)
+    entry = _memory.get(key)
+    if entry is None:
+        entry = _read_disk([key]).get(key)
+        if entry is not None:
+            _memory[key] = entry
+    if entry is None or time.time() > entry[0]:
+        return None
+    return entry[1]
+
+
+def _fetch(key, bioname):
+    title = bioname_to_title(bioname)
+    try:
+        result = {'title': title, 'summary': get_backend().summary(title)}
+    except Exception as err:
+        # expected offline; the result carries the error and is retried later
+        logger.debug('wikipedia lookup for %r failed: %s', title, err)
+        result = {'title': title, 'summary': None, 'error': str(err)}
+        _memory[key] = (time.time() + WIKIPEDIA_RETRY_AFTER, result)
+    else:
+        fetched_at = time.time()
+        _memory[key] = (fetched_at + WIKIPEDIA_CACHE_TTL, result)
+        _write_disk(key, fetched_at, result)
+    finally:
+        with _lock:
+            _in_flight.pop(key, None)
+            _prefetching.discard(key)
+    return result
+
+
+def submit_lookup(bioname, prefetch=False):
+    # Queue a lookup unless one for the same name is already running; returns its Future.
+    # A lookup asked for directly takes over a prefetch of the name that has not started.
+    key = normalize_bioname(bioname)
+    with _lock:
+        future = _in_flight.get(key)
+        if (future is not None and not prefetch and key in _prefetching
+                and future.cancel()):
+            future = None
+        if future is None:
+            executor = _prefetch_executor if prefetch else _executor
+            future = executor.submit(_fetch, key, bioname)
+            _in_flight[key] = future
+            if prefetch:
+                _prefetching.add(key)
+            else:
+                _prefetching.discard(key)
+    return future
+
+
+def _is_cached(key, now):
+    entry = _memory.get(key)
+    return entry is not None and now <= entry[0]
+
+
+def _prefetch(bionames):
+    # Runs on the prefetch pool: one disk read for the page, then a lookup per name
+    # that is neither cached nor in flight, up to WIKIPEDIA_PREFETCH_QUEUE
+    now = time.time()
+    for key, entry in _read_disk(list(bionames)).items():
+        # another process may have cached a newer result
+        if key not in _memory or _memory[key][0] < entry[0]:
+            _memory[key] = entry
+    for key, bioname in bionames.items():
+        if _is_cached(key, now):
+            continue
+        with _lock:
+            if key in _in_flight:
+                continue
+            if len(_prefetching) >= WIKIPEDIA_PREFETCH_QUEUE:
+                break
+        submit_lookup(bioname, prefetch=True)
+
+
+def _prefetch_pages():
+    # The prefetch driver: one at a time on the prefetch pool, working through the
+    # newest waiting page until none is left
+    global _prefetch_page, _prefetch_driver
+    while True:
+        with _lock:
+            bionames, _prefetch_page = _prefetch_page, None
+            if bionames is None:
+                _prefetch_driver = False
+                return
+        try:
+            _prefetch(bionames)
+        except Exception:
+            # the driver has to reach the end, or no page would be prefetched again
+            logger.exception('wikipedia prefetch failed')
+
+
+def prefetch_summaries(bionames):
+    # Queue background lookups for the given names, e.g. the rows of the table page
+    # on screen; returns at once, names already in memory are not queued again
+    global _prefetch_page, _prefetch_driver
+    now = time.time()
+    bionames = {normalize_bioname(bioname): bioname for bioname in bionames
+                if isinstance(bioname, str) and bioname.strip()}
+    bionames = {key: bioname for key, bioname in bionames.items()
+                if not _is_cached(key, now)}
+    if not bionames:
+        return
+    with _lock:
+        _prefetch_page = bionames
+        if _prefetch_driver:
+            return
+        _prefetch_driver = True
+    _prefetch_executor.submit(_prefetch_pages)
+
+
+def lookup_nowait(bioname):
+    # Returns the cached result, or None after making sure a background lookup is queued.
+    # Failed lookups come back as a result with an 'error' so the caller stops waiting.
+    result = cached_summary(bioname)
+    if result is not None:
+        return result
+    future = submit_lookup(bioname)
+    return future.result() if future.done() else None
+
+
+def format_summary(result):
+    # Markdown for the wikipedia-summary-table component
+    header = '### Wikipedia Summary:'
+    if result.get('error'):
+        return f"{header}\n\n{result['title']}\n\nWikipedia lookup failed, please try again."
+    if result['summary'] is None:
+        return f"{header}\n\n{result['title']}\n\nNo page found for this name."
+    link = f"[Read more on Wikipedia]({WIKIPEDIA_PAGE_URL}{result['title'].replace(' ', '_')})"
+    return f"{header}\n\n{result['title']}\n\n{result['summary'][:SUMMARY_LENGTH]}\n\n{link}"
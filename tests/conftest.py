@@ -0,0 +1,39 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PACKAGE_DIR = os.path.join(ROOT, 'congress_dashboard')
+BUNDLED_CSV = os.path.join(ROOT, 'benchmarks', 'data', 'data_aging_congress.csv')
+sys.path.insert(0, ROOT)
+
+
+@pytest.fixture(scope='session')
+def dataset_env(tmp_path_factory):
+    # The package loads its dataset when data_loader is first imported: point it at
+    # the CSV bundled for the benchmarks and a throwaway snapshot directory, so the
+    # tests run offline
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setenv('CONGRESS_DATA_URL', 'file://' + BUNDLED_CSV)
+        patch.setenv('CONGRESS_SNAPSHOT_DIR', str(tmp_path_factory.mktemp('snapshot')))
+        patch.setenv('CONGRESS_REFRESH_INTERVAL', '0')
+        yield
+
+
+@pytest.fixture
+def package_dir(monkeypatch, dataset_env):
+    # assets/party_codes.csv is read relative to the working directory
+    monkeypatch.chdir(PACKAGE_DIR)
+
+
+@pytest.fixture
+def data_loader(package_dir):
+    from congress_dashboard import data_loader
+    return data_loader
+
+
+@pytest.fixture
+def dataset(data_loader):
+    # the Dataset loaded from the bundled CSV (pandas backend)
+    return data_loader.current_dataset()
@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from congress_dashboard.age_cube import (build_age_cube, build_cell_index, query_age_cube,
+                                         roll_up_cells)
+
+CASES = [
+    (['congress'], None),
+    (['congress', 'chamber'], None),
+    (['congress', 'party_code'], {'chamber': 'House'}),
+    (['congress', 'member_type'], {'party_code': [100, 200]}),
+    (['state_abbrev'], {'congress': 117}),
+    (['generation', 'chamber_member_type'], {'chamber': ['Senate'], 'congress': [100, 101]}),
+    ([], {'state_abbrev': 'CA'}),
+]
+
+
+def groupby_ages(congress, by, filters=None):
+    # The plain pandas aggregation the cube replaces
+    rows = congress
+    for dim, value in (filters or {}).items():
+        rows = rows[rows[dim].isin(value if isinstance(value, list) else [value])]
+    if not by:
+        return pd.DataFrame({'age_years': [rows['age_years'].mean()],
+                             'age_count': [rows['age_years'].count()],
+                             'row_count': [len(rows)]})
+    grouped = rows.groupby(by, observed=True)['age_years']
+    return pd.DataFrame({'age_years': grouped.mean(), 'age_count': grouped.count(),
+                         'row_count': grouped.size()}).reset_index()
+
+
+def assert_same_groups(got, want, by):
+    got = got.astype({dim: str for dim in by}).sort_values(by).reset_index(drop=True)
+    want = want.astype({dim: str for dim in by}).sort_values(by).reset_index(drop=True)
+    assert got[by].values.tolist() == want[by].values.tolist()
+    assert got['row_count'].tolist() == want['row_count'].tolist()
+    assert got['age_count'].tolist() == want['age_count'].tolist()
+    np.testing.assert_allclose(got['age_years'], want['age_years'])
+
+
+@pytest.mark.parametrize('by, filters', CASES)
+def test_cube_matches_groupby(dataset, by, filters):
+    assert_same_groups(query_age_cube(dataset.age_cube, by, filters),
+                       groupby_ages(dataset.congress, by, filters), by)
+
+
+@pytest.mark.parametrize('by, filters', [case for case in CASES if case[0]])
+def test_cell_roll_ups_match_the_cube(dataset, by, filters):
+    dimensions = ['congress', 'chamber', 'party_code', 'member_type', 'state_abbrev',
+                  'generation', 'chamber_member_type']
+    cells = query_age_cube(dataset.age_cube, dimensions, dropna=False)
+    index = build_cell_index(cells, dimensions)
+    assert_same_groups(roll_up_cells(index, by, filters),
+                       query_age_cube(dataset.age_cube, by, filters), by)
+
+
+def test_rows_with_a_missing_key_still_count(dataset):
+    congress = dataset.congress.iloc[:2000].copy()
+    congress.loc[congress.index[::5], 'generation'] = None
+    cube = build_age_cube(congress)
+    assert_same_groups(query_age_cube(cube, ['congress']),
+                       groupby_ages(congress, ['congress']), ['congress'])
+    # grouping on the gapped dimension leaves those rows out, like groupby does
+    assert_same_groups(query_age_cube(cube, ['generation']),
+                       groupby_ages(congress, ['generation']), ['generation'])
@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+
+from congress_dashboard.career_index import build_career_index, member_career
+
+COLUMNS = ['bioguide_id', 'congress', 'chamber', 'party_code', 'age_years']
+
+
+def frame(rows):
+    return pd.DataFrame(rows, columns=COLUMNS)
+
+
+def test_member_career_contents():
+    # rows out of session order, a chamber move and two party switches
+    index = build_career_index(frame([
+        ('A000001', 102, 'Senate', 200, 56.0),
+        ('B000002', 100, 'House', 100, 40.0),
+        ('A000001', 100, 'House', 100, 52.0),
+        ('A000001', 101, 'House', 328, 54.0),
+        (None, 101, 'House', 100, 60.0),
+        ('B000002', 101, 'House', 100, 42.0),
+    ]))
+    career = member_career(index, 'A000001')
+    assert career.pop('rows').tolist() == [2, 3, 0]
+    assert career == {'bioguide_id': 'A000001', 'first_congress': 100, 'last_congress': 102,
+                      'chambers': 'House, Senate', 'party_switches': 2,
+                      'entry_age': 52.0, 'exit_age': 56.0}
+    career = member_career(index, 'B000002')
+    assert career.pop('rows').tolist() == [1, 5]
+    assert career == {'bioguide_id': 'B000002', 'first_congress': 100, 'last_congress': 101,
+                      'chambers': 'House', 'party_switches': 0,
+                      'entry_age': 40.0, 'exit_age': 42.0}
+    # rows without a bioguide_id belong to no career
+    assert sorted(index['position']) == ['A000001', 'B000002']
+    assert member_career(index, 'X000000') is None
+
+
+def test_career_index_matches_a_groupby(dataset):
+    congress = dataset.congress
+    index = dataset.career_index
+    ordered = congress.assign(row=np.arange(len(congress))).sort_values(
+        ['bioguide_id', 'congress', 'row'])
+    members = ordered.groupby('bioguide_id', observed=True)
+    expected = pd.DataFrame({
+        'first_congress': members['congress'].first(),
+        'last_congress': members['congress'].last(),
+        'chambers': members['chamber'].agg(lambda c: ', '.join(sorted(c.astype(str).unique()))),
+        'party_switches': members['party_code'].agg(lambda p: int((p.diff().fillna(0) != 0).sum())),
+        'entry_age': members['age_years'].agg(lambda a: a.iloc[0]),
+        'exit_age': members['age_years'].agg(lambda a: a.iloc[-1]),
+        'rows': members['row'].agg(list),
+    })
+    assert len(index['bioguide_id']) == len(expected)
+    for bioguide_id, want in expected.sample(300, random_state=0).iterrows():
+        got = member_career(index, bioguide_id)
+        assert got.pop('rows').tolist() == want.pop('rows')
+        assert got == dict(want, bioguide_id=bioguide_id)
@@ -0,0 +1,101 @@
+import io
+
+import flask
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+SELECTIONS = [
+    ('', {}, None),
+    ('congress=117&chamber=House', {'congress': [117], 'chamber': ['House']}, None),
+    ('state=CA&state=NY&age_min=40&age_max=60', {'state_abbrev': ['CA', 'NY']}, [40, 60]),
+    ('party=200&age_max=45', {'party_code': [200]}, [-np.inf, 45]),
+    ('state=ZZ', {'state_abbrev': ['ZZ']}, None),
+    ('chamber=', {'chamber': []}, None),
+]
+
+
+@pytest.fixture(params=['pandas', 'duckdb'])
+def backend(request, dataset, data_loader):
+    from congress_dashboard import query_backend
+    if request.param == 'duckdb':
+        pytest.importorskip('duckdb')
+        data_loader.write_derived_snapshot(dataset.version)
+    query_backend.set_backend(query_backend.BACKENDS[request.param]())
+    yield request.param
+    query_backend.set_backend(None)
+
+
+@pytest.fixture
+def client(backend):
+    from congress_dashboard.export import install_export
+    server = flask.Flask(__name__)
+    install_export(server)
+    return server.test_client()
+
+
+def expected_rows(dataset, data_loader, selection, age_range):
+    congress = dataset.congress
+    mask = np.ones(len(congress), dtype=bool)
+    for col, values in selection.items():
+        mask &= congress[col].isin(values).to_numpy()
+    if age_range is not None:
+        mask &= congress['age_years'].between(*age_range).to_numpy()
+    rows = congress[mask][data_loader.display_columns(congress)]
+    return rows.astype({col: rows[col].cat.categories.dtype for col in rows.columns
+                        if isinstance(rows[col].dtype, pd.CategoricalDtype)})
+
+
+@pytest.mark.parametrize('query, selection, age_range', SELECTIONS)
+def test_parquet_export(client, dataset, data_loader, query, selection, age_range):
+    response = client.get(f'/export.parquet?{query}')
+    assert response.status_code == 200
+    assert response.mimetype == 'application/vnd.apache.parquet'
+    got = pq.read_table(io.BytesIO(response.data)).to_pandas()
+    want = expected_rows(dataset, data_loader, selection, age_range)
+    assert list(got.columns) == list(want.columns)
+    pd.testing.assert_frame_equal(got, want.reset_index(drop=True), check_dtype=False)
+
+
+@pytest.mark.parametrize('query, selection, age_range', SELECTIONS)
+def test_csv_export(client, dataset, data_loader, query, selection, age_range):
+    response = client.get(f'/export.csv?{query}')
+    assert response.status_code == 200
+    assert response.headers['Content-Disposition'] == \
+        'attachment; filename=congress_export.csv'
+    got = pd.read_csv(io.BytesIO(response.data))
+    want = expected_rows(dataset, data_loader, selection, age_range)
+    want = pd.read_csv(io.StringIO(want.to_csv(index=False)))
+    pd.testing.assert_frame_equal(got, want, check_dtype=False)
+
+
+@pytest.mark.parametrize('fmt', ['csv', 'parquet'])
+def test_export_streams_batches(backend, dataset, fmt):
+    from congress_dashboard.export import stream_export
+    chunks = list(stream_export(fmt, {'chamber': ['House']}, None, batch_rows=1000))
+    n_rows = int((dataset.congress['chamber'] == 'House').sum())
+    assert len(chunks) == -(-n_rows // 1000) + 1
+    data = b''.join(chunks)
+    read = pd.read_csv if fmt == 'csv' else pd.read_parquet
+    assert len(read(io.BytesIO(data))) == n_rows
+
+
+@pytest.mark.parametrize('url, status', [
+    ('/export.xlsx', 404),
+    ('/export.csv?congress=abc', 400),
+    ('/export.parquet?party=democrat', 400),
+    ('/export.csv?age_min=old', 400),
+])
+def test_export_errors(client, url, status):
+    assert client.get(url).status_code == status
+
+
+@pytest.mark.parametrize('query, selection, age_range', SELECTIONS)
+def test_export_url_round_trips(package_dir, query, selection, age_range):
+    from congress_dashboard.export import export_selection, export_url
+    with flask.Flask(__name__).test_request_context(f'/export.csv?{query}'):
+        assert export_selection(flask.request.args) == (selection, age_range)
+        url = export_url('csv', selection, age_range)
+    with flask.Flask(__name__).test_request_context(url):
+        assert export_selection(flask.request.args) == (selection, age_range)
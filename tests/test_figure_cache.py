@@ -0,0 +1,75 @@
+from types import SimpleNamespace
+
+import pytest
+
+
+@pytest.fixture
+def dataset_version(data_loader, monkeypatch):
+    version = SimpleNamespace(version='v1')
+    monkeypatch.setattr(data_loader, 'current_dataset', lambda: version)
+    return version
+
+
+@pytest.fixture
+def figure_cache(dataset_version):
+    from congress_dashboard import figure_cache
+    return figure_cache
+
+
+def cached(figure_cache, name, maxsize):
+    # A cached builder that records the arguments it was really called with
+    calls = []
+
+    def builder(*args):
+        calls.append(args)
+        return f'figure{len(calls)}'
+    builder.__name__ = name
+    return figure_cache.lru_figure_cache(maxsize)(builder), calls
+
+
+def test_normalize_key_ignores_selection_order(figure_cache):
+    normalize_key = figure_cache.normalize_key
+    assert normalize_key([200, 100]) == normalize_key([100, 200])
+    assert normalize_key({'b': ['x', 'y'], 'a': 1}) == normalize_key({'a': 1, 'b': ['y', 'x']})
+    assert normalize_key(['House', 'Senate']) != normalize_key(['House'])
+
+
+def test_least_recently_used_entry_is_evicted(figure_cache):
+    builder, calls = cached(figure_cache, 'eviction_builder', maxsize=2)
+    assert builder('House', [100, 200]) == 'figure1'
+    assert builder('Senate', [100]) == 'figure2'
+    # a hit refreshes the House entry, so Senate is the one evicted
+    assert builder('House', [200, 100]) == 'figure1'
+    assert builder('House', [328]) == 'figure3'
+    assert builder('House', [100, 200]) == 'figure1'
+    assert builder('Senate', [100]) == 'figure4'
+    assert calls == [('House', [100, 200]), ('Senate', [100]), ('House', [328]),
+                     ('Senate', [100])]
+    assert figure_cache.figure_cache_stats()['eviction_builder'] == \
+        {'hits': 2, 'misses': 4, 'evictions': 2}
+
+
+def test_new_dataset_version_invalidates_entries(figure_cache, dataset_version):
+    builder, calls = cached(figure_cache, 'version_builder', maxsize=4)
+    assert builder('House') == 'figure1'
+    assert builder('House') == 'figure1'
+    dataset_version.version = 'v2'
+    assert builder('House') == 'figure2'
+    assert builder('House') == 'figure2'
+    builder.cache_clear()
+    assert builder('House') == 'figure3'
+    assert len(calls) == 3
+
+
+def test_figure_from_a_swapped_out_dataset_is_not_stored(figure_cache, dataset_version):
+    calls = []
+
+    def builder(chamber):
+        calls.append(chamber)
+        # the dataset is refreshed while the figure is being built
+        dataset_version.version = f'v{len(calls) + 1}'
+        return f'figure{len(calls)}'
+    builder = figure_cache.lru_figure_cache(4)(builder)
+    assert builder('House') == 'figure1'
+    assert builder('House') == 'figure2'
+    assert calls == ['House', 'House']
@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+from congress_dashboard.filter_index import build_filter_index, lookup_rows
+
+CASES = [
+    ({}, None),
+    ({'congress': 117}, None),
+    ({'chamber': 'Senate', 'state_abbrev': ['CA', 'NY', 'TX']}, None),
+    ({'congress': [100, 101, 102], 'party_code': 200}, [40, 60]),
+    ({}, [30, 45.5]),
+    ({'chamber': 'House'}, [70, 200]),
+    ({'state_abbrev': 'ZZ'}, None),
+    ({'congress': [117, 999]}, None),
+    ({'party_code': []}, None),
+]
+
+
+def mask_rows(congress, selection, age_range=None):
+    # The boolean-mask filtering the index replaces
+    mask = np.ones(len(congress), dtype=bool)
+    for col, value in selection.items():
+        values = value if isinstance(value, list) else [value]
+        mask &= congress[col].isin(values).to_numpy()
+    if age_range is not None:
+        mask &= congress['age_years'].between(*age_range).to_numpy()
+    return np.flatnonzero(mask)
+
+
+@pytest.mark.parametrize('selection, age_range', CASES)
+def test_lookup_matches_boolean_masks(dataset, selection, age_range):
+    rows = lookup_rows(dataset.filter_index, selection, age_range)
+    np.testing.assert_array_equal(rows, mask_rows(dataset.congress, selection, age_range))
+
+
+@pytest.mark.parametrize('selection', [{}, {'chamber': 'House'}])
+def test_missing_ages_never_match_an_age_range(dataset, selection):
+    congress = dataset.congress.iloc[:3000].copy()
+    congress.loc[congress.index[::4], 'age_years'] = np.nan
+    index = build_filter_index(congress)
+    rows = lookup_rows(index, selection, [0, 200])
+    np.testing.assert_array_equal(rows, mask_rows(congress, selection, [0, 200]))
+    assert not np.isnan(congress['age_years'].to_numpy()[rows]).any()
+    # without an age range they are still selected
+    assert len(lookup_rows(index, selection)) == len(mask_rows(congress, selection))
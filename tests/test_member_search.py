@@ -0,0 +1,76 @@
+import pandas as pd
+import pytest
+
+from congress_dashboard.member_search import (EXACT_SCORE, MIN_SCORE, PREFIX_SCORE,
+                                              build_member_index, format_sessions,
+                                              member_name, name_tokens, search_members)
+
+MEMBERS = [
+    ('P000197', 'PELOSI, Nancy', [100, 101, 102, 104]),
+    ('P000999', 'PELOSKI, Paul', [101]),
+    ('O000170', "O'ROURKE, Robert (Beto)", [113, 114, 115]),
+    ('R000999', 'ROURKER, Sam', [110]),
+    ('M000999', 'MÜLLER, José', [99]),
+    ('S000999', 'SMITH, Jane', [100]),
+    ('S000999', 'SMITH-JONES, Jane', [101]),
+]
+
+
+@pytest.fixture(scope='module')
+def index():
+    rows = [(bioguide_id, bioname, congress) for bioguide_id, bioname, sessions in MEMBERS
+            for congress in sessions]
+    return build_member_index(pd.DataFrame(rows, columns=['bioguide_id', 'bioname', 'congress']))
+
+
+def ranking(index, query):
+    return [(result['bioguide_id'], result['score']) for result in search_members(index, query)]
+
+
+def test_name_tokens_normalize_punctuation_and_accents():
+    assert name_tokens("O'ROURKE, Robert (Beto)") == ['orourke', 'robert', 'beto']
+    assert name_tokens('MÜLLER, José') == ['muller', 'jose']
+    assert name_tokens('SMITH-JONES, Jane, Jr.') == ['smith', 'jones', 'jane', 'jr']
+
+
+def test_exact_match_ranks_before_prefix_match(index):
+    assert ranking(index, 'pelosi')[0] == ('P000197', EXACT_SCORE)
+    # both names start with the prefix: ties go by name
+    assert ranking(index, 'pelos') == [('P000197', PREFIX_SCORE), ('P000999', PREFIX_SCORE)]
+    assert ranking(index, 'rourke')[:2] == [('O000170', EXACT_SCORE), ('R000999', PREFIX_SCORE)]
+
+
+@pytest.mark.parametrize('query', ["o'rourke", 'O’Rourke', 'orourke', 'rourke', 'beto'])
+def test_apostrophe_names_match_exactly(index, query):
+    assert ranking(index, query)[0] == ('O000170', EXACT_SCORE)
+
+
+@pytest.mark.parametrize('query, bioguide_id', [('pelosy', 'P000197'), ('nacy', 'P000197'),
+                                                ('rourk', 'O000170'), ('muler', 'M000999')])
+def test_misspellings_match_by_trigrams(index, query, bioguide_id):
+    results = ranking(index, query)
+    assert results[0][0] == bioguide_id
+    assert MIN_SCORE <= results[0][1] <= PREFIX_SCORE
+
+
+def test_every_word_of_the_query_has_to_match(index):
+    assert ranking(index, 'Pelosi, Nancy') == [('P000197', 2 * EXACT_SCORE)]
+    assert ranking(index, 'nancy pel')[0] == ('P000197', EXACT_SCORE + PREFIX_SCORE)
+    assert ranking(index, 'muller jose') == [('M000999', 2 * EXACT_SCORE)]
+    assert ranking(index, 'pelosi xyzzy') == []
+    assert search_members(index, '  ,  ') == []
+
+
+def test_results_carry_the_latest_name_and_sessions(index):
+    result = search_members(index, 'jones')[0]
+    assert result['bioname'] == 'SMITH-JONES, Jane'
+    assert result['sessions'] == [100, 101]
+    assert member_name(index, 'P000197') == 'PELOSI, Nancy'
+    assert member_name(index, 'X000000') is None
+    assert len(search_members(index, 'p', k=1)) == 1
+
+
+def test_format_sessions_collapses_runs():
+    assert format_sessions([100, 101, 102, 104]) == '100-102, 104'
+    assert format_sessions([97]) == '97'
+    assert format_sessions([]) == ''
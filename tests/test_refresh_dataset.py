@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from congress_dashboard.age_cube import CUBE_DIMENSIONS, query_age_cube
+from congress_dashboard.career_index import member_career
+from congress_dashboard.filter_index import lookup_rows
+from congress_dashboard.member_search import search_members
+
+
+@pytest.fixture
+def snapshot(data_loader, monkeypatch, tmp_path):
+    # The bundled data as the current dataset, in a snapshot directory of its own
+    raw = pd.read_parquet(data_loader.SNAPSHOT_FILE)
+    monkeypatch.setattr(data_loader, 'SNAPSHOT_DIR', str(tmp_path))
+    monkeypatch.setattr(data_loader, 'SNAPSHOT_FILE', str(tmp_path / 'congress.parquet'))
+    monkeypatch.setattr(data_loader, 'SNAPSHOT_META', str(tmp_path / 'congress.meta.json'))
+    data_loader.write_snapshot(raw, {'ETag': '"old"'})
+    monkeypatch.setattr(data_loader, '_dataset', data_loader.build_dataset(
+        data_loader.modified_data(), data_loader.snapshot_version()))
+    return raw
+
+
+def upstream_update(raw):
+    # A fresh CSV: a corrected birthday and party in two sessions, the first session
+    # gone and a new one added at the end
+    new_raw = raw[raw['congress'] != raw['congress'].min()].copy()
+    corrected = new_raw.index[new_raw['congress'] == 117][:3]
+    new_raw.loc[corrected, 'age_years'] += 1.5
+    new_raw.loc[corrected, 'birthday'] = '1950-01-01'
+    new_raw.loc[new_raw.index[new_raw['congress'] == 100][0], 'party_code'] = 328
+    added = new_raw[new_raw['congress'] == new_raw['congress'].max()].copy()
+    added['congress'] += 1
+    added['age_years'] += 2
+    return pd.concat([new_raw, added], ignore_index=True)
+
+
+def assert_same_cube(refreshed, cold):
+    by = [dim for dim in CUBE_DIMENSIONS if dim in cold.columns]
+    got, want = (query_age_cube(cube, by).astype({dim: str for dim in by})
+                 .sort_values(by).reset_index(drop=True) for cube in (refreshed, cold))
+    assert got[by].values.tolist() == want[by].values.tolist()
+    assert got['row_count'].tolist() == want['row_count'].tolist()
+    np.testing.assert_allclose(got['age_sum'], want['age_sum'])
+
+
+def test_refresh_matches_a_cold_load(data_loader, snapshot, monkeypatch):
+    old = data_loader.current_dataset()
+    new_raw = upstream_update(snapshot)
+    assert data_loader.changed_sessions(old.congress, new_raw) == \
+        [snapshot['congress'].min(), 100, 117, snapshot['congress'].max() + 1]
+    monkeypatch.setattr(data_loader, 'refresh_snapshot',
+                        lambda: data_loader.write_snapshot(new_raw, {'ETag': '"new"'}))
+    assert data_loader.refresh_dataset()
+    refreshed = data_loader.current_dataset()
+    cold = data_loader.build_dataset(data_loader.modified_data(), data_loader.snapshot_version())
+
+    assert refreshed.version == cold.version != old.version
+    pd.testing.assert_frame_equal(refreshed.congress, cold.congress, check_categorical=False)
+    assert_same_cube(refreshed.age_cube, cold.age_cube)
+    for selection, age_range in [({}, [30, 40]), ({'congress': [100, 117], 'party_code': 328}, None),
+                                 ({'chamber': 'Senate'}, [60, 90])]:
+        np.testing.assert_array_equal(lookup_rows(refreshed.filter_index, selection, age_range),
+                                      lookup_rows(cold.filter_index, selection, age_range))
+    for bioguide_id in cold.career_index['bioguide_id']:
+        got = member_career(refreshed.career_index, bioguide_id)
+        want = member_career(cold.career_index, bioguide_id)
+        np.testing.assert_array_equal(got.pop('rows'), want.pop('rows'))
+        assert got == want
+    for query in ['last0562', 'first12', 'LAST1244, First1244']:
+        assert search_members(refreshed.member_index, query) == \
+            search_members(cold.member_index, query)
+
+
+def test_unchanged_snapshot_keeps_the_dataset(data_loader, snapshot, monkeypatch):
+    old = data_loader.current_dataset()
+    # upstream served the same rows with new validators
+    monkeypatch.setattr(data_loader, 'refresh_snapshot',
+                        lambda: data_loader.write_snapshot(snapshot, {'ETag': '"same"'}))
+    assert not data_loader.refresh_dataset()
+    current = data_loader.current_dataset()
+    assert current.congress is old.congress and current.version != old.version
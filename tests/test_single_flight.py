@@ -0,0 +1,161 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+from dash.exceptions import PreventUpdate
+
+
+@pytest.fixture
+def dataset_version(data_loader, monkeypatch):
+    version = SimpleNamespace(version='v1')
+    monkeypatch.setattr(data_loader, 'current_dataset', lambda: version)
+    return version
+
+
+@pytest.fixture
+def single_flight(dataset_version, monkeypatch):
+    from congress_dashboard import single_flight
+    monkeypatch.setattr(single_flight, 'SINGLE_FLIGHT', True)
+    return single_flight
+
+
+class Blocking:
+    # Stand-in callback: records its calls and holds the first one until released
+    def __init__(self, name):
+        self.__name__ = name
+        self.calls = []
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def __call__(self, *args):
+        self.calls.append(args)
+        self.started.set()
+        assert self.release.wait(5)
+        return f'result{len(self.calls)}'
+
+
+def counter(name, callback):
+    from congress_dashboard import metrics
+    return metrics._counters.get(name, {}).get((('callback', callback),), 0)
+
+
+def wait_for(condition):
+    deadline = time.monotonic() + 5
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+
+
+def run(wrapper, *args):
+    # Calls the wrapper on a thread; the outcome is the result or the raised exception
+    outcome = {}
+
+    def target():
+        try:
+            outcome['result'] = wrapper(*args)
+        except BaseException as err:
+            outcome['error'] = err
+    thread = threading.Thread(target=target)
+    thread.start()
+    return thread, outcome
+
+
+def test_freeze_keeps_list_order(single_flight):
+    freeze = single_flight.freeze
+    assert freeze([{'column_id': 'age', 'direction': 'asc'}, 'b']) == \
+        ((('column_id', 'age'), ('direction', 'asc')), 'b')
+    assert freeze(['a', 'b']) != freeze(['b', 'a'])
+    assert freeze({'b': [1], 'a': 2}) == freeze({'a': 2, 'b': [1]})
+
+
+def test_identical_requests_share_one_computation(single_flight):
+    func = Blocking('coalesce_callback')
+    wrapper = single_flight.single_flight(func)
+    leader = run(wrapper, 'House', [20, 100], 'tab-0')
+    assert func.started.wait(5)
+    # other tabs asking for the same arguments wait for the running computation
+    followers = [run(wrapper, 'House', [20, 100], f'tab-{i}') for i in range(1, 5)]
+    wait_for(lambda: counter('single_flight_coalesced_total', 'coalesce_callback') == 4)
+    func.release.set()
+    for thread, outcome in [leader] + followers:
+        thread.join(5)
+        assert outcome == {'result': 'result1'}
+    assert func.calls == [('House', [20, 100])]
+    assert not single_flight._flights and not single_flight._sessions
+
+
+def test_coalescing_is_per_dataset_version(single_flight, dataset_version):
+    func = Blocking('version_callback')
+    wrapper = single_flight.single_flight(func)
+    first = run(wrapper, 'House', 'tab-0')
+    assert func.started.wait(5)
+    dataset_version.version = 'v2'
+    func.release.set()
+    second = run(wrapper, 'House', 'tab-1')
+    for thread, _ in (first, second):
+        thread.join(5)
+    assert len(func.calls) == 2
+    assert counter('single_flight_coalesced_total', 'version_callback') == 0
+
+
+def test_newer_request_of_a_tab_supersedes_waiting_one(single_flight):
+    func = Blocking('supersede_callback')
+    wrapper = single_flight.single_flight(func)
+    running = run(wrapper, 1, 'tab')
+    assert func.started.wait(5)
+    slot = single_flight._sessions[('tab', 'supersede_callback')]
+    waiting = run(wrapper, 2, 'tab')
+    wait_for(lambda: slot['waiting'] == 2)
+    newest = run(wrapper, 3, 'tab')
+    wait_for(lambda: slot['waiting'] == 3)
+    func.release.set()
+    for thread, _ in (running, waiting, newest):
+        thread.join(5)
+    assert running[1] == {'result': 'result1'}
+    assert isinstance(waiting[1]['error'], PreventUpdate)
+    assert newest[1] == {'result': 'result2'}
+    # the superseded request never reached the callback
+    assert func.calls == [(1,), (3,)]
+    assert counter('single_flight_superseded_total', 'supersede_callback') == 1
+    assert ('tab', 'supersede_callback') not in single_flight._sessions
+
+
+def test_without_session_id_requests_only_coalesce(single_flight):
+    func = Blocking('no_session_callback')
+    func.release.set()
+    wrapper = single_flight.single_flight(func)
+    # before the browser has set the session-id store every request runs
+    assert wrapper('House', None) == 'result1'
+    assert wrapper('Senate', None) == 'result2'
+    assert func.calls == [('House',), ('Senate',)]
+    assert not single_flight._sessions
+
+
+def test_errors_reach_the_waiting_requests(single_flight):
+    release = threading.Event()
+    started = threading.Event()
+
+    def failing_callback(value):
+        started.set()
+        assert release.wait(5)
+        raise PreventUpdate
+    wrapper = single_flight.single_flight(failing_callback)
+    leader = run(wrapper, 1, 'tab-0')
+    assert started.wait(5)
+    follower = run(wrapper, 1, 'tab-1')
+    wait_for(lambda: counter('single_flight_coalesced_total', 'failing_callback') == 1)
+    release.set()
+    for thread, outcome in (leader, follower):
+        thread.join(5)
+        assert isinstance(outcome['error'], PreventUpdate)
+
+
+def test_disabled_passes_through(single_flight, monkeypatch):
+    monkeypatch.setattr(single_flight, 'SINGLE_FLIGHT', False)
+    func = Blocking('disabled_callback')
+    func.release.set()
+    wrapper = single_flight.single_flight(func)
+    assert wrapper('House', 'tab') == 'result1'
+    assert func.calls == [('House',)]
+    assert not single_flight._sessions
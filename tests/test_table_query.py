@@ -0,0 +1,89 @@
+import pandas as pd
+import pytest
+
+from congress_dashboard.table_query import _column_mask, apply_filter_query, split_filter_part
+
+
+@pytest.mark.parametrize('filter_part, expected', [
+    ('{age_years} ge 60', ('age_years', 'ge', 60.0)),
+    ('{age_years} >= 60', ('age_years', 'ge', 60.0)),
+    ('{congress} < 100', ('congress', 'lt', 100.0)),
+    ('{state_abbrev} = CA', ('state_abbrev', 'eq', 'CA')),
+    ('{state_abbrev} ne "NY"', ('state_abbrev', 'ne', 'NY')),
+    ('{bioname} contains "O\\"BRIEN"', ('bioname', 'contains', 'O"BRIEN')),
+    ("{bioname} contains 'O\\'ROURKE'", ('bioname', 'contains', "O'ROURKE")),
+    ('{start_date} datestartswith 2021', ('start_date', 'datestartswith', 2021.0)),
+    ('{bioname}', (None, None, None)),
+])
+def test_split_filter_part(filter_part, expected):
+    assert split_filter_part(filter_part) == expected
+
+
+def test_column_mask_numeric():
+    column = pd.Series([30.5, 45.0, 60.25, 71.0])
+    assert _column_mask(column, 'ge', 60.0).tolist() == [False, False, True, True]
+    assert _column_mask(column, 'eq', 45.0).tolist() == [False, True, False, False]
+    # text typed into a numeric column matches nothing, or everything for 'ne'
+    assert not _column_mask(column, 'lt', 'abc').any()
+    assert _column_mask(column, 'ne', 'abc').all()
+
+
+def test_column_mask_text():
+    column = pd.Series(['PELOSI, Nancy', "O'ROURKE, Robert", None, '117'])
+    assert _column_mask(column, 'contains', 'ROURKE').tolist() == [False, True, False, False]
+    assert _column_mask(column, 'datestartswith', 'PEL').tolist() == [True, False, False, False]
+    # a number typed into a text column is compared as its text
+    assert _column_mask(column, 'eq', 117.0).tolist() == [False, False, False, True]
+
+
+def test_column_mask_categorical():
+    column = pd.Series(['House', 'Senate', 'House', None], dtype='category')
+    assert _column_mask(column, 'eq', 'Senate').tolist() == [False, True, False, False]
+    assert _column_mask(column, 'contains', 'ous').tolist() == [True, False, True, False]
+    # != keeps missing values, as on other columns
+    assert _column_mask(column, 'ne', 'House').tolist() == [False, True, False, True]
+    assert _column_mask(pd.Series(['House', None]), 'ne', 'House').tolist() == [False, True]
+
+
+def test_apply_filter_query():
+    data = pd.DataFrame({'bioname': ['A, One', 'B, Two', 'A, Three'],
+                         'age_years': [40.0, 55.5, 61.25]})
+    filtered = apply_filter_query(data, '{bioname} contains A && {age_years} ge 50')
+    assert filtered['age_years'].tolist() == [61.25]
+    # unknown columns and clauses without an operator are ignored
+    assert len(apply_filter_query(data, '{party} eq 100 && {bioname}')) == 3
+    assert apply_filter_query(data, '') is data
+
+
+@pytest.fixture
+def dataset_with_missing_values(data_loader, monkeypatch):
+    # The loaded dataset with gaps in a categorical and a text column, on both backends
+    congress = data_loader.current_dataset().congress.copy()
+    congress.loc[congress.index[::7], 'generation'] = None
+    congress.loc[congress.index[::11], 'birthday'] = None
+    dataset = data_loader.build_dataset(congress, 'missing-values')
+    congress.to_parquet(data_loader.derived_snapshot_file(dataset.version), index=False)
+    monkeypatch.setattr(data_loader, 'current_dataset', lambda: dataset)
+    return dataset
+
+
+@pytest.mark.parametrize('filter_query', [
+    '{generation} ne Boomers',
+    '{generation} eq Boomers',
+    '{generation} contains er',
+    '{birthday} ne 1950-01-01',
+    '{birthday} datestartswith 1950-',
+    '{age_years} ge 60 && {generation} ne Silent',
+    '{party_code} ne abc',
+])
+def test_filters_match_across_backends(dataset_with_missing_values, filter_query):
+    pytest.importorskip('duckdb')
+    from congress_dashboard.query_backend import DuckDBBackend, PandasBackend
+    n_rows = len(dataset_with_missing_values.congress)
+    results = [backend.table_page({}, None, filter_query, [], 0, n_rows)
+               for backend in (PandasBackend(), DuckDBBackend())]
+    (pandas_page, _, pandas_count), (duckdb_page, _, duckdb_count) = results
+    assert pandas_count == duckdb_count > 0
+    keys = ['bioguide_id', 'congress']
+    assert pandas_page[keys].astype(str).values.tolist() == \
+        duckdb_page[keys].astype(str).values.tolist()
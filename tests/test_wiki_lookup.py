@@ -0,0 +1,122 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+
+from congress_dashboard import wiki_lookup
+
+NAME = 'PELOSI, Nancy'
+
+
+class RecordingBackend(wiki_lookup.StaticBackend):
+    # StaticBackend that records the titles asked for and can be made to fail
+    def __init__(self, pages=None):
+        super().__init__(pages)
+        self.titles = []
+        self.error = None
+
+    def summary(self, title):
+        self.titles.append(title)
+        if self.error is not None:
+            raise self.error
+        return super().summary(title)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    # wiki_lookup's time.time(), moved forward by the tests
+    clock = SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(wiki_lookup, 'time', SimpleNamespace(time=lambda: clock.now))
+    return clock
+
+
+@pytest.fixture
+def backend(monkeypatch, tmp_path, clock):
+    monkeypatch.setattr(wiki_lookup, 'WIKIPEDIA_CACHE_FILE', str(tmp_path / 'cache.sqlite'))
+    backend = RecordingBackend({'Nancy Pelosi': 'Speaker of the House.'})
+    wiki_lookup.set_backend(backend)
+    yield backend
+    wiki_lookup.set_backend(None)
+
+
+@pytest.fixture
+def busy_prefetch_pool(monkeypatch):
+    # A one-thread prefetch pool held by a task until release is set, so whatever the
+    # tests queue on it has not started yet
+    pool = ThreadPoolExecutor(max_workers=1)
+    release = threading.Event()
+    pool.submit(release.wait, 5)
+    monkeypatch.setattr(wiki_lookup, '_prefetch_executor', pool)
+    yield release
+    release.set()
+    pool.shutdown(wait=True)
+
+
+def test_results_are_cached_in_memory_and_on_disk(backend, clock):
+    assert wiki_lookup.cached_summary(NAME) is None
+    result = wiki_lookup.submit_lookup(NAME).result()
+    assert result == {'title': 'Nancy Pelosi', 'summary': 'Speaker of the House.'}
+    assert wiki_lookup.lookup_nowait(NAME) == result
+    # another process (an empty memory cache) reads it from disk
+    wiki_lookup._memory.clear()
+    assert wiki_lookup.cached_summary(' pelosi,  nancy') == result
+    assert backend.titles == ['Nancy Pelosi']
+
+
+def test_cached_results_expire_after_the_ttl(backend, clock):
+    wiki_lookup.submit_lookup(NAME).result()
+    clock.now += wiki_lookup.WIKIPEDIA_CACHE_TTL + 1
+    assert wiki_lookup.cached_summary(NAME) is None
+    wiki_lookup._memory.clear()
+    assert wiki_lookup.cached_summary(NAME) is None
+    wiki_lookup.submit_lookup(NAME).result()
+    assert backend.titles == ['Nancy Pelosi', 'Nancy Pelosi']
+
+
+def test_failed_lookups_are_retried_after_a_while(backend, clock):
+    backend.error = ConnectionError('offline')
+    result = wiki_lookup.submit_lookup(NAME).result()
+    assert result == {'title': 'Nancy Pelosi', 'summary': None, 'error': 'offline'}
+    # within the retry window the failure is the answer, without a new request
+    clock.now += wiki_lookup.WIKIPEDIA_RETRY_AFTER - 1
+    assert wiki_lookup.lookup_nowait(NAME) == result
+    assert backend.titles == ['Nancy Pelosi']
+    # failures are not written to disk
+    assert wiki_lookup._read_disk([wiki_lookup.normalize_bioname(NAME)]) == {}
+    backend.error = None
+    clock.now += 2
+    assert wiki_lookup.cached_summary(NAME) is None
+    assert wiki_lookup.submit_lookup(NAME).result()['summary'] == 'Speaker of the House.'
+    assert backend.titles == ['Nancy Pelosi', 'Nancy Pelosi']
+
+
+def test_direct_lookup_takes_over_a_queued_prefetch(backend, busy_prefetch_pool):
+    prefetch = wiki_lookup.submit_lookup(NAME, prefetch=True)
+    assert wiki_lookup.submit_lookup(NAME, prefetch=True) is prefetch
+    direct = wiki_lookup.submit_lookup(NAME)
+    assert prefetch.cancelled()
+    assert direct.result()['summary'] == 'Speaker of the House.'
+    assert not wiki_lookup._prefetching and not wiki_lookup._in_flight
+    busy_prefetch_pool.set()
+    assert backend.titles == ['Nancy Pelosi']
+
+
+def test_prefetch_driver_keeps_only_the_newest_page(backend, busy_prefetch_pool, monkeypatch):
+    pages = []
+    prefetch = wiki_lookup._prefetch
+    monkeypatch.setattr(wiki_lookup, '_prefetch',
+                        lambda bionames: pages.append(list(bionames)) or prefetch(bionames))
+    for page in range(5):
+        wiki_lookup.prefetch_summaries([f'LAST{page}{row}, First' for row in range(3)])
+    # one driver queued, however many pages came in
+    assert wiki_lookup._prefetch_executor._work_queue.qsize() == 1
+    busy_prefetch_pool.set()
+    deadline = time.monotonic() + 5
+    while wiki_lookup._prefetch_driver or wiki_lookup._in_flight:
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+    assert pages == [['last40, first', 'last41, first', 'last42, first']]
+    assert sorted(backend.titles) == ['First Last40', 'First Last41', 'First Last42']
+    assert not wiki_lookup._prefetch_driver and wiki_lookup._prefetch_page is None